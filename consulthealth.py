@@ -1,7 +1,24 @@
-import streamlit as st
+from __future__ import annotations
+
+import bisect
+import heapq
+import math
+import os
+import re
+import sys
+import threading
 import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import List, Dict, Set, Tuple, Optional
+from types import MappingProxyType
+from typing import List, Dict, Set, FrozenSet, Tuple, Optional, Iterable, Iterator, AsyncIterator, TextIO
+
+# Import-light by design: `import consulthealth` loads only the modules above,
+# so the knowledge base and engine are usable from batch workers, tests and
+# services without UI dependencies. Streamlit (UI), argparse (CLI), json,
+# hashlib and pickle are imported inside the functions that need them.
+# `python consulthealth.py importtime` reports the import cost.
 
 # -----------------------------------------------------------------------------
 # 1. CONFIGURATION & THEME
@@ -11,12 +28,77 @@ class AppConfig:
     APP_TITLE: str = "Consult Health"
     APP_ICON: str = "⚕️"
     VERSION: str = "2.5.0 (Massive DB)"
+    # Result cache in front of ClinicalEngine.analyze (TTL in seconds, 0 = none)
+    RESULT_CACHE_SIZE: int = 4096
+    RESULT_CACHE_TTL: float = 0.0
+    # Artificial pause before results render (UX pacing only); 0 in production
+    UX_DELAY_SECONDS: float = float(os.environ.get("CONSULTHEALTH_UX_DELAY", "0.5"))
+    # Keyword matching: "longest" (whole words, longest phrase wins),
+    # "overlap" (whole words, every phrase) or "substring" (legacy raw scan)
+    MATCH_MODE: str = os.environ.get("CONSULTHEALTH_MATCH_MODE", "longest")
+    # Etiology ranking products: "scipy", "python" or "auto" (SciPy for
+    # batches when installed; single notes are faster in pure Python)
+    RANK_BACKEND: str = os.environ.get("CONSULTHEALTH_RANK_BACKEND", "auto")
+    # Ranked etiologies shown per page ("Show more" adds another page)
+    ETIOLOGY_PAGE_SIZE: int = 15
+    # Precompiled KB written by `python consulthealth.py compile`; set the
+    # variable to an empty string to always build from source.
+    SNAPSHOT_PATH: str = os.environ.get(
+        "CONSULTHEALTH_SNAPSHOT",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "consulthealth.kb"),
+    )
+    # External KB file (JSON, or YAML with PyYAML) used instead of the
+    # built-in one; it is polled every KB_POLL_SECONDS and hot-reloaded.
+    KB_PATH: str = os.environ.get("CONSULTHEALTH_KB", "")
+    KB_POLL_SECONDS: float = float(os.environ.get("CONSULTHEALTH_KB_POLL", "2.0"))
+    # HTTP API (`python consulthealth.py serve`): limits per request and the
+    # idle time after which a keep-alive connection is closed
+    API_HOST: str = "127.0.0.1"
+    API_PORT: int = 8765
+    API_MAX_BODY: int = 1 << 20
+    API_MAX_HEADER: int = 16 << 10
+    API_KEEPALIVE_SECONDS: float = 5.0
+    # POST /analyze/bulk reads the NDJSON body this many bytes at a time and
+    # waits for the client to drain results past the same amount of buffer
+    API_STREAM_CHUNK: int = 64 << 10
+    # Section-scoped match indexes kept per engine (one per distinct set of
+    # sections asked for); the oldest is dropped past this many
+    SCOPE_CACHE_SIZE: int = 64
+    # Opt-in Prometheus metrics: GET /metrics on `serve --metrics`, and for
+    # the UI a local scrape endpoint on METRICS_PORT (0 = none; implies on)
+    METRICS: bool = os.environ.get("CONSULTHEALTH_METRICS", "") not in ("", "0")
+    METRICS_PORT: int = int(os.environ.get("CONSULTHEALTH_METRICS_PORT", "0"))
+    # Streamlit sends deltas of at least this many bytes to a browser once and
+    # as a short hash reference on later reruns (default 10 kB); applied by
+    # main() unless global.minCachedMessageSize is already configured
+    MIN_CACHED_MESSAGE_SIZE: int = int(os.environ.get("STREAMLIT_GLOBAL_MIN_CACHED_MESSAGE_SIZE", "2048"))
+
+def tune_message_cache():
+    """
+    Lowers Streamlit's global.minCachedMessageSize to
+    AppConfig.MIN_CACHED_MESSAGE_SIZE, so the stylesheet and large result
+    blocks are cached by the browser whatever directory the app is started
+    from. A value from a config file or the command line is left alone;
+    STREAMLIT_GLOBAL_MIN_CACHED_MESSAGE_SIZE also applies outside
+    `streamlit run` (AppTest, bench render).
+    """
+    from streamlit import config
+    from streamlit.config_option import ConfigOption
+
+    key = "global.minCachedMessageSize"
+    if config.get_where_defined(key) == ConfigOption.DEFAULT_DEFINITION:
+        config.set_option(key, AppConfig.MIN_CACHED_MESSAGE_SIZE, "consulthealth.AppConfig")
 
 def inject_css():
     """
     Injects CSS that is adaptable to both light and dark modes.
     Note: We use a standard string (not an f-string) to avoid conflicts with CSS curly braces.
+    Streamlit drops elements a rerun does not repeat, so this runs on every
+    rerun; tune_message_cache() lowers global.minCachedMessageSize below
+    the size of this block, so the browser receives it once per session and
+    a short cache reference on later reruns.
     """
+    import streamlit as st
     st.markdown("""
     <style>
         /* Main container typography */
@@ -131,1275 +213,1275 @@ class ClinicalData:
     SYMPTOMS: Dict[str, List[str]] = None
     ALERTS: Dict[str, str] = None
     MEDS: Dict[str, str] = None
+    ALIASES: Dict[str, List[str]] = None
+    # Symptom tables by section; SYMPTOMS is their merge in section order.
+    # Sections are the KB's compilation units (see KBCompiler).
+    SECTIONS: Dict[str, Dict[str, List[str]]] = None
 
     def __post_init__(self):
-        self.SYMPTOMS = {
-            # -----------------------------------------------------------------
-            # SECTION 1: GENERAL / CONSTITUTIONAL / SYSTEMIC
-            # -----------------------------------------------------------------
-            "fever": [
-                "Infectious Pathology (Viral/Bacterial)", 
-                "Systemic Inflammatory Response Syndrome (SIRS)", 
-                "Autoimmune Etiology (Lupus, RA)", 
-                "Malignancy (Lymphoma, Leukemia)", 
-                "Drug Fever (Antibiotics, Anticonvulsants)",
-                "Neuroleptic Malignant Syndrome",
-                "Thyroid Storm"
-            ],
-            "high fever": [
-                "Sepsis",
-                "Meningitis",
-                "Pyelonephritis",
-                "Influenza",
-                "Malaria"
-            ],
-            "low grade fever": [
-                "Tuberculosis",
-                "Lymphoma",
-                "Chronic Infection",
-                "Sinusitis"
-            ],
-            "chills": [
-                "Bacteremia", 
-                "Sepsis Alert", 
-                "Acute Febrile Illness", 
-                "Malaria", 
-                "Influenza",
-                "Pyelonephritis",
-                "Pneumonia"
-            ],
-            "rigors": [
-                "Severe Sepsis",
-                "Biliary Tract Infection",
-                "Malaria"
-            ],
-            "fatigue": [
-                "Anemia (Iron Deficiency, B12)", 
-                "Hypothyroidism", 
-                "Chronic Fatigue Syndrome", 
-                "Depression", 
-                "Diabetes Mellitus", 
-                "Sleep Apnea", 
-                "Mononucleosis",
-                "Adrenal Insufficiency",
-                "Congestive Heart Failure",
-                "Chronic Kidney Disease"
-            ],
-            "weight loss": [
-                "Hyperthyroidism (Graves')", 
-                "Type 1 Diabetes Mellitus", 
-                "Malignancy Screening Needed", 
-                "Malabsorption (Celiac, Crohn's)", 
-                "Chronic Infection (TB/HIV)",
-                "Anorexia Nervosa"
-            ],
-            "weight gain": [
-                "Hypothyroidism", 
-                "Cushing's Syndrome", 
-                "Heart Failure (Edema)", 
-                "Polycystic Ovary Syndrome (PCOS)", 
-                "Medication Side Effect (Steroids, Antipsychotics)",
-                "Liver Failure (Ascites)"
-            ],
-            "night sweats": [
-                "Tuberculosis", 
-                "Lymphoma (Hodgkin's)", 
-                "Menopause", 
-                "HIV/AIDS", 
-                "Brucellosis", 
-                "Infective Endocarditis",
-                "Osteomyelitis"
-            ],
-            "dehydration": [
-                "Gastroenteritis", 
-                "Heat Exhaustion", 
-                "Hyperglycemia (DKA/HHS)", 
-                "Diuretic Overuse", 
-                "Diabetes Insipidus"
-            ],
-            "weakness": [
-                "Electrolyte Imbalance (Hypokalemia)", 
-                "Stroke", 
-                "Guillain-Barre Syndrome", 
-                "Myasthenia Gravis", 
-                "Anemia",
-                "Polymyositis"
-            ],
-            "malaise": [
-                "Viral Prodrome", 
-                "Chronic Disease", 
-                "Depression", 
-                "Autoimmune Flares",
-                "Hepatitis"
-            ],
-            "swollen lymph nodes": [
-                "Infection (Local/Systemic)", 
-                "Lymphoma", 
-                "Leukemia", 
-                "Metastatic Cancer", 
-                "Sarcoidosis",
-                "Tuberculosis (Scrofula)"
-            ],
-            "pallor": [
-                "Anemia", 
-                "Shock", 
-                "Vasoconstriction", 
-                "Hypoglycemia",
-                "Internal Bleeding"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 2: RESPIRATORY SYSTEM
-            # -----------------------------------------------------------------
-            "cough": [
-                "Respiratory Infection (Viral/Bacterial)", 
-                "Bronchitis", 
-                "Pneumonia", 
-                "Asthma/COPD", 
-                "GERD (Reflux)", 
-                "ACE Inhibitor Induced", 
-                "Post-nasal Drip",
-                "Heart Failure"
-            ],
-            "dry cough": [
-                "Viral URI",
-                "Asthma",
-                "Interstitial Lung Disease",
-                "ACE Inhibitor side effect",
-                "COVID-19"
-            ],
-            "productive cough": [
-                "Pneumonia",
-                "Chronic Bronchitis",
-                "Bronchiectasis",
-                "Lung Abscess"
-            ],
-            "barking cough": [
-                "Croup",
-                "Tracheitis"
-            ],
-            "shortness of breath": [
-                "Dyspnea", 
-                "Congestive Heart Failure", 
-                "Pneumonia", 
-                "Pulmonary Embolism", 
-                "Anemia", 
-                "Anxiety/Panic Attack", 
-                "Pneumothorax",
-                "Pleural Effusion"
-            ],
-            "dyspnea on exertion": [
-                "Angina",
-                "COPD",
-                "Heart Failure",
-                "Pulmonary Hypertension"
-            ],
-            "orthopnea": [
-                "Congestive Heart Failure",
-                "Obesity Hypoventilation",
-                "Diaphragmatic Paralysis"
-            ],
-            "wheezing": [
-                "Asthma", 
-                "COPD Exacerbation", 
-                "Anaphylaxis", 
-                "Bronchiolitis", 
-                "Foreign Body Aspiration"
-            ],
-            "sore throat": [
-                "Pharyngitis (Viral)", 
-                "Tonsillitis", 
-                "Strep Throat (Group A Strep)", 
-                "Mononucleosis", 
-                "Epiglottitis", 
-                "Peritonsillar Abscess",
-                "Gonococcal Pharyngitis"
-            ],
-            "hoarseness": [
-                "Laryngitis", 
-                "Vocal Cord Nodules", 
-                "GERD", 
-                "Thyroid Malignancy", 
-                "Laryngeal Nerve Palsy (Recurrent)",
-                "Lung Cancer (Pancoast Tumor)"
-            ],
-            "coughing blood": [
-                "Tuberculosis", 
-                "Lung Cancer", 
-                "Pulmonary Embolism", 
-                "Bronchiectasis", 
-                "Severe Bronchitis", 
-                "Goodpasture Syndrome",
-                "Wegener's Granulomatosis"
-            ],
-            "nasal congestion": [
-                "Rhinitis (Allergic/Viral)", 
-                "Sinusitis", 
-                "Nasal Polyps", 
-                "Deviated Septum",
-                "Rhinitis Medicamentosa"
-            ],
-            "sneezing": [
-                "Allergic Rhinitis", 
-                "Viral URI", 
-                "Irritant Exposure"
-            ],
-            "stridor": [
-                "Croup", 
-                "Epiglottitis", 
-                "Foreign Body", 
-                "Laryngomalacia", 
-                "Anaphylaxis",
-                "Retropharyngeal Abscess"
-            ],
-            "pleuritic pain": [
-                "Pleurisy", 
-                "Pneumonia", 
-                "Pulmonary Embolism", 
-                "Pericarditis",
-                "Pneumothorax"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 3: CARDIOVASCULAR SYSTEM
-            # -----------------------------------------------------------------
-            "chest pain": [
-                "Acute Coronary Syndrome (MI)", 
-                "Stable/Unstable Angina", 
-                "GERD (Esophageal Spasm)", 
-                "Costochondritis (Musculoskeletal)", 
-                "Pericarditis", 
-                "Aortic Dissection", 
-                "Panic Attack", 
-                "Pneumothorax"
-            ],
-            "substernal chest pain": [
-                "Myocardial Infarction",
-                "Angina Pectoris",
-                "Esophageal Spasm"
-            ],
-            "tearing chest pain": [
-                "Aortic Dissection"
-            ],
-            "palpitations": [
-                "Sinus Tachycardia", 
-                "Atrial Fibrillation", 
-                "Anxiety", 
-                "Thyrotoxicosis", 
-                "Anemia", 
-                "PVCs/PACs", 
-                "Caffeine/Stimulant Use",
-                "Electrolyte Imbalance"
-            ],
-            "swollen legs": [
-                "Congestive Heart Failure", 
-                "Deep Vein Thrombosis (DVT)", 
-                "Chronic Venous Insufficiency", 
-                "Kidney Disease (Nephrotic Syndrome)", 
-                "Lymphedema", 
-                "Calcium Channel Blockers side effect",
-                "Liver Failure (Low Albumin)"
-            ],
-            "unilateral leg swelling": [
-                "Deep Vein Thrombosis (DVT)",
-                "Baker's Cyst Rupture",
-                "Cellulitis"
-            ],
-            "cyanosis": [
-                "Hypoxia", 
-                "Congenital Heart Defect", 
-                "Pulmonary Embolism", 
-                "Severe Asthma", 
-                "Methemoglobinemia"
-            ],
-            "claudication": [
-                "Peripheral Artery Disease", 
-                "Spinal Stenosis", 
-                "Deep Vein Thrombosis"
-            ],
-            "syncope": [
-                "Vasovagal Syncope", 
-                "Orthostatic Hypotension", 
-                "Arrhythmia (V-Tach/Heart Block)", 
-                "Aortic Stenosis", 
-                "Seizure",
-                "Pulmonary Embolism"
-            ],
-            "lightheadedness": [
-                "Dehydration",
-                "Hypotension",
-                "Anemia",
-                "Hypoglycemia"
-            ],
-            "irregular heartbeat": [
-                "Atrial Fibrillation", 
-                "Arrhythmia", 
-                "Electrolyte Imbalance (K/Mg)"
-            ],
-            "bradycardia": [
-                "Hypothyroidism",
-                "Sick Sinus Syndrome",
-                "Heart Block",
-                "Athlete's Heart",
-                "Beta-blocker overdose"
-            ],
-            "tachycardia": [
-                "Fever",
-                "Anemia",
-                "Hyperthyroidism",
-                "Dehydration",
-                "Shock",
-                "Anxiety"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 4: NEUROLOGICAL SYSTEM
-            # -----------------------------------------------------------------
-            "headache": [
-                "Migraine", 
-                "Tension Type Headache", 
-                "Intracranial Issue (Tumor/Bleed)", 
-                "Sinusitis", 
-                "Cluster Headache", 
-                "Temporal Arteritis", 
-                "Meningitis", 
-                "Subarachnoid Hemorrhage"
-            ],
-            "thunderclap headache": [
-                "Subarachnoid Hemorrhage",
-                "Reversible Cerebral Vasoconstriction Syndrome"
-            ],
-            "morning headache": [
-                "Sleep Apnea",
-                "Increased Intracranial Pressure",
-                "Hypertension"
-            ],
-            "dizziness": [
-                "Vertigo (BPPV)", 
-                "Orthostatic Hypotension", 
-                "Arrhythmia", 
-                "Anemia", 
-                "Inner Ear Infection (Labyrinthitis)", 
-                "Meniere's Disease", 
-                "Stroke (Posterior Circulation)"
-            ],
-            "room spinning": [
-                "Benign Paroxysmal Positional Vertigo (BPPV)",
-                "Meniere's Disease",
-                "Vestibular Neuritis"
-            ],
-            "numbness": [
-                "Peripheral Neuropathy (Diabetes)", 
-                "Stroke", 
-                "Multiple Sclerosis", 
-                "Radiculopathy (Pinched Nerve)", 
-                "Carpal Tunnel Syndrome", 
-                "Vitamin B12 Deficiency"
-            ],
-            "unilateral numbness": [
-                "Stroke",
-                "TIA",
-                "Multiple Sclerosis"
-            ],
-            "tremors": [
-                "Parkinson's Disease", 
-                "Essential Tremor", 
-                "Hyperthyroidism", 
-                "Anxiety", 
-                "Alcohol Withdrawal", 
-                "Lithium Toxicity"
-            ],
-            "confusion": [
-                "Delirium", 
-                "Dementia (Alzheimer's)", 
-                "Stroke", 
-                "Sepsis", 
-                "Hypoglycemia", 
-                "Electrolyte Imbalance (Na/Ca)", 
-                "Hepatic Encephalopathy", 
-                "Wernicke's Encephalopathy"
-            ],
-            "double vision": [
-                "Cranial Nerve Palsy", 
-                "Myasthenia Gravis", 
-                "Stroke", 
-                "Multiple Sclerosis", 
-                "Graves' Disease", 
-                "Orbital Cellulitis"
-            ],
-            "seizure": [
-                "Epilepsy", 
-                "Febrile Seizure (Pediatric)", 
-                "Alcohol Withdrawal", 
-                "Brain Tumor", 
-                "Hyponatremia", 
-                "Eclampsia",
-                "Trauma"
-            ],
-            "memory loss": [
-                "Alzheimer's Disease", 
-                "Dementia", 
-                "Hypothyroidism", 
-                "Vitamin B12 Deficiency", 
-                "Depression (Pseudodementia)"
-            ],
-            "slurred speech": [
-                "Stroke (CVA)", 
-                "TIA", 
-                "Alcohol Intoxication", 
-                "ALS", 
-                "Multiple Sclerosis",
-                "Sedative Overdose"
-            ],
-            "facial drooping": [
-                "Bell's Palsy", 
-                "Stroke", 
-                "Lyme Disease", 
-                "Parotid Tumor"
-            ],
-            "loss of balance": [
-                "Cerebellar Ataxia", 
-                "Vestibular Neuritis", 
-                "Stroke", 
-                "Parkinson's Disease", 
-                "Normal Pressure Hydrocephalus"
-            ],
-            "fainting": [
-                "Vasovagal Syncope",
-                "Orthostatic Hypotension",
-                "Cardiac Arrhythmia"
-            ],
-            "tingling": [
-                "Paresthesia",
-                "Neuropathy",
-                "Hyperventilation",
-                "Hypocalcemia"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 5: GASTROINTESTINAL SYSTEM
-            # -----------------------------------------------------------------
-            "abdominal pain": [
-                "Appendicitis", 
-                "Cholecystitis", 
-                "Gastritis", 
-                "Bowel Obstruction", 
-                "Pancreatitis", 
-                "Diverticulitis", 
-                "IBS", 
-                "Mesenteric Ischemia"
-            ],
-            "right lower quadrant pain": [
-                "Appendicitis",
-                "Crohn's Disease",
-                "Ectopic Pregnancy",
-                "Ovarian Torsion"
-            ],
-            "right upper quadrant pain": [
-                "Cholecystitis",
-                "Biliary Colic",
-                "Hepatitis",
-                "Liver Abscess"
-            ],
-            "left lower quadrant pain": [
-                "Diverticulitis",
-                "Ovarian Cyst",
-                "Ulcerative Colitis"
-            ],
-            "epigastric pain": [
-                "GERD",
-                "Peptic Ulcer Disease",
-                "Pancreatitis",
-                "Myocardial Infarction"
-            ],
-            "nausea": [
-                "Gastroenteritis", 
-                "Pregnancy", 
-                "Vestibular Neuritis", 
-                "Medication Side Effect", 
-                "Migraine", 
-                "Increased ICP"
-            ],
-            "vomiting": [
-                "Gastroenteritis", 
-                "Food Poisoning", 
-                "Gastritis", 
-                "Increased Intracranial Pressure", 
-                "Cyclic Vomiting Syndrome", 
-                "DKA",
-                "Bowel Obstruction"
-            ],
-            "projectile vomiting": [
-                "Pyloric Stenosis (Infants)",
-                "Increased Intracranial Pressure"
-            ],
-            "diarrhea": [
-                "Viral Gastroenteritis", 
-                "Food Poisoning", 
-                "IBS", 
-                "Inflammatory Bowel Disease (Crohn's/UC)", 
-                "Celiac Disease", 
-                "Malabsorption",
-                "Clostridium difficile"
-            ],
-            "bloody diarrhea": [
-                "Ulcerative Colitis",
-                "Crohn's Disease",
-                "Dysentery (Shigella/Campylobacter)",
-                "Ischemic Colitis"
-            ],
-            "constipation": [
-                "Functional Constipation", 
-                "IBS-C", 
-                "Hypothyroidism", 
-                "Opioid Use", 
-                "Hypercalcemia", 
-                "Colorectal Cancer",
-                "Dehydration"
-            ],
-            "heartburn": [
-                "GERD", 
-                "Hiatal Hernia", 
-                "Peptic Ulcer Disease", 
-                "Gastritis", 
-                "Esophagitis"
-            ],
-            "bloating": [
-                "IBS", 
-                "Lactose Intolerance", 
-                "Small Bowel Obstruction", 
-                "Ascites", 
-                "SIBO", 
-                "Ovarian Cancer"
-            ],
-            "difficulty swallowing": [
-                "Esophagitis", 
-                "Esophageal Stricture", 
-                "Stroke", 
-                "Achalasia", 
-                "Esophageal Cancer", 
-                "Zenker's Diverticulum"
-            ],
-            "rectal bleeding": [
-                "Hemorrhoids", 
-                "Anal Fissure", 
-                "Colorectal Cancer", 
-                "Diverticulosis", 
-                "IBD", 
-                "Angiodysplasia"
-            ],
-            "jaundice": [
-                "Hepatitis (A/B/C)", 
-                "Liver Cirrhosis", 
-                "Gallstones (Choledocholithiasis)", 
-                "Hemolytic Anemia", 
-                "Pancreatic Cancer", 
-                "Gilbert's Syndrome"
-            ],
-            "black stools": [
-                "Upper GI Bleed (Melena)", 
-                "Peptic Ulcer", 
-                "Gastritis", 
-                "Iron Supplements", 
-                "Bismuth Subsalicylate"
-            ],
-            "loss of appetite": [
-                "Malignancy", 
-                "Depression", 
-                "Chronic Infection", 
-                "Gastroparesis", 
-                "Liver Failure",
-                "Kidney Failure"
-            ],
-            "belching": [
-                "GERD",
-                "Aerophagia",
-                "Gastritis"
-            ],
-            "gas": [
-                "Lactose Intolerance",
-                "IBS",
-                "High Fiber Diet",
-                "Celiac Disease"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 6: MUSCULOSKELETAL / RHEUMATOLOGY
-            # -----------------------------------------------------------------
-            "back pain": [
-                "Muscle Strain", 
-                "Herniated Nucleus Pulposus", 
-                "Sciatica", 
-                "Renal Colic (Kidney Stone)", 
-                "Osteoporosis", 
-                "Spinal Stenosis", 
-                "Ankylosing Spondylitis", 
-                "Metastatic Disease"
-            ],
-            "low back pain": [
-                "Lumbar Strain",
-                "Degenerative Disc Disease",
-                "Spondylolisthesis"
-            ],
-            "joint pain": [
-                "Osteoarthritis", 
-                "Rheumatoid Arthritis", 
-                "Bursitis", 
-                "Gout", 
-                "Septic Arthritis", 
-                "Lupus (SLE)", 
-                "Psoriatic Arthritis"
-            ],
-            "knee pain": [
-                "Meniscal Tear",
-                "ACL Injury",
-                "Osteoarthritis",
-                "Patellofemoral Syndrome"
-            ],
-            "muscle weakness": [
-                "Myasthenia Gravis", 
-                "Polymyositis", 
-                "Hypokalemia", 
-                "Stroke", 
-                "ALS", 
-                "Muscular Dystrophy"
-            ],
-            "neck pain": [
-                "Cervical Spondylosis", 
-                "Muscle Strain", 
-                "Meningitis", 
-                "Whiplash", 
-                "Torticollis"
-            ],
-            "muscle cramps": [
-                "Dehydration", 
-                "Electrolyte Imbalance (Mg/K/Ca)", 
-                "Venous Insufficiency", 
-                "Statins side effect"
-            ],
-            "joint swelling": [
-                "Arthritis", 
-                "Gout", 
-                "Trauma", 
-                "Septic Arthritis", 
-                "Hemarthrosis"
-            ],
-            "shoulder pain": [
-                "Rotator Cuff Injury", 
-                "Frozen Shoulder (Adhesive Capsulitis)", 
-                "Bursitis", 
-                "Referred Pain (Gallbladder/Heart)"
-            ],
-            "wrist pain": [
-                "Carpal Tunnel Syndrome",
-                "De Quervain's Tenosynovitis",
-                "Ganglion Cyst",
-                "Fracture"
-            ],
-            "heel pain": [
-                "Plantar Fasciitis",
-                "Calcaneal Spur",
-                "Achilles Tendonitis"
-            ],
-            "hip pain": [
-                "Osteoarthritis",
-                "Trochanteric Bursitis",
-                "Hip Fracture",
-                "Labral Tear"
-            ],
-            "morning stiffness": [
-                "Rheumatoid Arthritis",
-                "Polymyalgia Rheumatica",
-                "Ankylosing Spondylitis"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 7: DERMATOLOGY
-            # -----------------------------------------------------------------
-            "rash": [
-                "Contact Dermatitis", 
-                "Viral Exanthem", 
-                "Drug Reaction", 
-                "Urticaria", 
-                "Psoriasis", 
-                "Scabies", 
-                "Lyme Disease (Erythema Migrans)",
-                "Syphilis (Secondary)"
-            ],
-            "petechiae": [
-                "Thrombocytopenia",
-                "Meningococcemia",
-                "Vasculitis",
-                "Leukemia"
-            ],
-            "itching": [
-                "Allergic Reaction", 
-                "Eczema (Atopic Dermatitis)", 
-                "Liver Disease (Cholestasis)", 
-                "Kidney Failure (Uremia)", 
-                "Lymphoma", 
-                "Scabies"
-            ],
-            "hair loss": [
-                "Alopecia Areata", 
-                "Telogen Effluvium", 
-                "Hypothyroidism", 
-                "Iron Deficiency", 
-                "PCOS", 
-                "Fungal Infection (Tinea Capitis)"
-            ],
-            "bruising": [
-                "Thrombocytopenia", 
-                "Trauma", 
-                "Vitamin K Deficiency", 
-                "Leukemia", 
-                "Cushing's Syndrome", 
-                "Von Willebrand Disease"
-            ],
-            "hives": [
-                "Allergic Reaction", 
-                "Stress", 
-                "Viral Infection", 
-                "Autoimmune Disease"
-            ],
-            "dry skin": [
-                "Xerosis", 
-                "Hypothyroidism", 
-                "Eczema", 
-                "Sjogren's Syndrome"
-            ],
-            "acne": [
-                "Acne Vulgaris", 
-                "Hormonal Imbalance", 
-                "Rosacea", 
-                "Folliculitis"
-            ],
-            "skin lesions": [
-                "Melanoma", 
-                "Basal Cell Carcinoma", 
-                "Squamous Cell Carcinoma", 
-                "Seborrheic Keratosis"
-            ],
-            "yellow skin": [
-                "Jaundice", 
-                "Carotenemia"
-            ],
-            "blisters": [
-                "Herpes Simplex",
-                "Shingles (Varicella Zoster)",
-                "Pemphigus Vulgaris",
-                "Bullous Pemphigoid",
-                "Burn"
-            ],
-            "nail changes": [
-                "Psoriasis",
-                "Fungal Infection (Onychomycosis)",
-                "Iron Deficiency (Koilonychia)",
-                "Lung Disease (Clubbing)"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 8: ENT / DENTAL
-            # -----------------------------------------------------------------
-            "ear pain": [
-                "Otitis Media", 
-                "Otitis Externa (Swimmer's Ear)", 
-                "Eustachian Tube Dysfunction", 
-                "TMJ Disorder", 
-                "Mastoiditis"
-            ],
-            "ear discharge": [
-                "Otitis Externa",
-                "Ruptured Eardrum",
-                "CSF Leak (Trauma)"
-            ],
-            "toothache": [
-                "Dental Caries", 
-                "Pulpitis", 
-                "Periapical Abscess", 
-                "Dental Trauma", 
-                "Sinusitis (referred pain)"
-            ],
-            "nosebleed": [
-                "Epistaxis", 
-                "Trauma", 
-                "Hypertension", 
-                "Coagulopathy", 
-                "Dry Mucosa", 
-                "Nasal Tumor"
-            ],
-            "ringing in ears": [
-                "Tinnitus", 
-                "Hearing Loss", 
-                "Meniere's Disease", 
-                "Acoustic Neuroma", 
-                "Salicylate Toxicity"
-            ],
-            "hearing loss": [
-                "Presbycusis", 
-                "Cerumen Impaction", 
-                "Noise Exposure", 
-                "Otosclerosis", 
-                "Sudden Sensorineural Hearing Loss"
-            ],
-            "mouth ulcers": [
-                "Aphthous Stomatitis (Canker Sore)", 
-                "Herpes Simplex (Cold Sore)", 
-                "Behcet's Disease", 
-                "Vitamin Deficiency (B12/Iron)", 
-                "Oral Cancer"
-            ],
-            "bad breath": [
-                "Halitosis", 
-                "Gingivitis", 
-                "GERD", 
-                "Sinusitis", 
-                "Tonsilloliths"
-            ],
-            "swollen glands": [
-                "Infection (Strep/Viral)", 
-                "Lymphoma", 
-                "Mononucleosis", 
-                "Dental Abscess"
-            ],
-            "white patches in mouth": [
-                "Thrush (Candidiasis)",
-                "Leukoplakia",
-                "Lichen Planus"
-            ],
-            "loss of smell": [
-                "COVID-19",
-                "Sinusitis",
-                "Nasal Polyps",
-                "Head Trauma"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 9: MENTAL HEALTH / PSYCHIATRY
-            # -----------------------------------------------------------------
-            "anxiety": [
-                "Generalized Anxiety Disorder", 
-                "Panic Attack", 
-                "Acute Stress Reaction", 
-                "Hyperthyroidism", 
-                "Caffeine Intoxication", 
-                "Pheochromocytoma"
-            ],
-            "insomnia": [
-                "Sleep Hygiene Issue", 
-                "Stress-related Insomnia", 
-                "Sleep Apnea", 
-                "Depression", 
-                "Restless Leg Syndrome", 
-                "Circadian Rhythm Disorder"
-            ],
-            "depression": [
-                "Major Depressive Disorder", 
-                "Bipolar Disorder", 
-                "Hypothyroidism", 
-                "Vitamin D Deficiency", 
-                "Anemia", 
-                "Chronic Pain"
-            ],
-            "hallucinations": [
-                "Schizophrenia", 
-                "Drug Toxicity", 
-                "Delirium", 
-                "Severe Depression", 
-                "Lewy Body Dementia"
-            ],
-            "mood swings": [
-                "Bipolar Disorder", 
-                "Borderline Personality Disorder", 
-                "PMS/PMDD", 
-                "Hormonal Imbalance",
-                "Substance Abuse"
-            ],
-            "suicidal thoughts": [
-                "Major Depression", 
-                "Crisis State", 
-                "Psychosis", 
-                "Substance Abuse"
-            ],
-            "panic": [
-                "Panic Disorder", 
-                "Phobia", 
-                "PTSD", 
-                "Hyperthyroidism"
-            ],
-            "irritability": [
-                "Depression",
-                "Anxiety",
-                "Bipolar Disorder",
-                "Sleep Deprivation",
-                "Graves' Disease"
-            ],
-            "social withdrawal": [
-                "Depression",
-                "Schizophrenia",
-                "Social Anxiety Disorder",
-                "Autism Spectrum Disorder"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 10: GENITOURINARY / NEPHROLOGY / MALE REPRODUCTIVE
-            # -----------------------------------------------------------------
-            "painful urination": [
-                "Urinary Tract Infection (UTI)", 
-                "STI (Chlamydia/Gonorrhea)", 
-                "Kidney Stones", 
-                "Prostatitis", 
-                "Interstitial Cystitis", 
-                "Urethritis"
-            ],
-            "blood in urine": [
-                "UTI", 
-                "Kidney Stones", 
-                "Bladder Cancer", 
-                "Glomerulonephritis", 
-                "Trauma", 
-                "Prostate Cancer", 
-                "Polycystic Kidney Disease"
-            ],
-            "frequent urination": [
-                "Diabetes Mellitus", 
-                "UTI", 
-                "Benign Prostatic Hyperplasia (BPH)", 
-                "Overactive Bladder", 
-                "Diuretics", 
-                "Diabetes Insipidus"
-            ],
-            "incontinence": [
-                "Stress Incontinence", 
-                "Urge Incontinence", 
-                "Neurogenic Bladder", 
-                "Overflow Incontinence (BPH)"
-            ],
-            "flank pain": [
-                "Kidney Stones (Renal Colic)", 
-                "Pyelonephritis", 
-                "Hydronephrosis", 
-                "Renal Infarction",
-                "Musculoskeletal Strain"
-            ],
-            "testicular pain": [
-                "Testicular Torsion", 
-                "Epididymitis", 
-                "Orchitis", 
-                "Inguinal Hernia", 
-                "Varicocele"
-            ],
-            "testicular lump": [
-                "Testicular Cancer",
-                "Hydrocele",
-                "Spermatocele",
-                "Varicocele"
-            ],
-            "erectile dysfunction": [
-                "Vascular Disease",
-                "Diabetes",
-                "Medication Side Effect",
-                "Psychogenic",
-                "Low Testosterone"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 11: REPRODUCTIVE HEALTH (FEMALE)
-            # -----------------------------------------------------------------
-            "pelvic pain": [
-                "Pelvic Inflammatory Disease (PID)", 
-                "Endometriosis", 
-                "Ovarian Cysts", 
-                "Ectopic Pregnancy", 
-                "Fibroids"
-            ],
-            "vaginal discharge": [
-                "Bacterial Vaginosis", 
-                "Candidiasis (Yeast)", 
-                "Trichomoniasis", 
-                "Chlamydia/Gonorrhea"
-            ],
-            "irregular periods": [
-                "PCOS", 
-                "Thyroid Dysfunction", 
-                "Menopause", 
-                "Stress", 
-                "Prolactinoma",
-                "Eating Disorders"
-            ],
-            "menstrual cramps": [
-                "Dysmenorrhea", 
-                "Endometriosis", 
-                "Adenomyosis", 
-                "Fibroids"
-            ],
-            "hot flashes": [
-                "Menopause", 
-                "Carcinoid Syndrome", 
-                "Medication Side Effect (Tamoxifen)"
-            ],
-            "breast lump": [
-                "Fibroadenoma", 
-                "Breast Cyst", 
-                "Breast Cancer", 
-                "Mastitis",
-                "Abscess"
-            ],
-            "nipple discharge": [
-                "Intraductal Papilloma",
-                "Galactorrhea (Prolactinoma)",
-                "Breast Cancer",
-                "Mammary Duct Ectasia"
-            ],
-            "vaginal itching": [
-                "Yeast Infection",
-                "Contact Dermatitis",
-                "Lichen Sclerosus",
-                "Pinworms"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 12: OPHTHALMOLOGY
-            # -----------------------------------------------------------------
-            "red eye": [
-                "Conjunctivitis (Pink Eye)", 
-                "Subconjunctival Hemorrhage", 
-                "Uveitis", 
-                "Glaucoma (Acute Angle Closure)", 
-                "Corneal Abrasion"
-            ],
-            "eye pain": [
-                "Corneal Abrasion", 
-                "Glaucoma", 
-                "Optic Neuritis", 
-                "Uveitis", 
-                "Scleritis",
-                "Foreign Body"
-            ],
-            "blurred vision": [
-                "Refractive Error", 
-                "Cataract", 
-                "Macular Degeneration", 
-                "Diabetic Retinopathy", 
-                "Glaucoma"
-            ],
-            "vision loss": [
-                "Retinal Detachment", 
-                "Central Retinal Artery Occlusion", 
-                "Stroke", 
-                "Glaucoma", 
-                "Temporal Arteritis"
-            ],
-            "floaters": [
-                "Posterior Vitreous Detachment", 
-                "Retinal Tear", 
-                "Uveitis"
-            ],
-            "dry eyes": [
-                "Dry Eye Syndrome", 
-                "Sjogren's Syndrome", 
-                "Blepharitis", 
-                "Medication Side Effect"
-            ],
-            "light sensitivity": [
-                "Migraine", 
-                "Meningitis", 
-                "Uveitis", 
-                "Corneal Abrasion"
-            ],
-            "excessive tearing": [
-                "Blocked Tear Duct",
-                "Allergies",
-                "Dry Eye (Reflex Tearing)",
-                "Conjunctivitis"
-            ],
-            "night blindness": [
-                "Vitamin A Deficiency",
-                "Retinitis Pigmentosa",
-                "Cataracts"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 13: ENDOCRINOLOGY / METABOLIC
-            # -----------------------------------------------------------------
-            "excessive thirst": [
-                "Diabetes Mellitus", 
-                "Diabetes Insipidus", 
-                "Psychogenic Polydipsia", 
-                "Dehydration", 
-                "Hypercalcemia"
-            ],
-            "heat intolerance": [
-                "Hyperthyroidism", 
-                "Menopause", 
-                "Dysautonomia"
-            ],
-            "cold intolerance": [
-                "Hypothyroidism", 
-                "Anorexia Nervosa", 
-                "Raynaud's Phenomenon"
-            ],
-            "excessive hair growth": [
-                "Hirsutism", 
-                "PCOS", 
-                "Cushing's Syndrome", 
-                "Adrenal Tumor"
-            ],
-            "moon face": [
-                "Cushing's Syndrome",
-                "Steroid Use"
-            ],
-            "salt craving": [
-                "Addison's Disease",
-                "Dehydration",
-                "Bartter Syndrome"
-            ],
-            
-            # -----------------------------------------------------------------
-            # SECTION 14: HEMATOLOGY / ONCOLOGY
-            # -----------------------------------------------------------------
-            "easy bleeding": [
-                "Thrombocytopenia", 
-                "Hemophilia", 
-                "Von Willebrand Disease", 
-                "Liver Disease", 
-                "Vitamin K Deficiency"
-            ],
-            "gum bleeding": [
-                "Gingivitis",
-                "Vitamin C Deficiency (Scurvy)",
-                "Leukemia",
-                "Thrombocytopenia"
-            ],
-            "enlarged spleen": [
-                "Mononucleosis",
-                "Leukemia",
-                "Lymphoma",
-                "Malaria",
-                "Liver Cirrhosis (Portal Hypertension)"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 15: PEDIATRICS SPECIFIC
-            # -----------------------------------------------------------------
-            "failure to thrive": [
-                "Malnutrition", 
-                "Celiac Disease", 
-                "Cystic Fibrosis", 
-                "Congenital Heart Defect",
-                "Metabolic Disorders"
-            ],
-            "bedwetting": [
-                "Enuresis", 
-                "UTI", 
-                "Diabetes", 
-                "Stress"
-            ],
-            "croup cough": [
-                "Croup (Laryngotracheobronchitis)", 
-                "Foreign Body"
-            ],
-            "colic": [
-                "Infant Colic", 
-                "Cow's Milk Protein Allergy", 
-                "Reflux"
-            ],
-            "floppy baby": [
-                "Botulism",
-                "Spinal Muscular Atrophy",
-                "Hypothyroidism",
-                "Down Syndrome"
-            ],
-            "delayed milestones": [
-                "Autism Spectrum Disorder",
-                "Cerebral Palsy",
-                "Global Developmental Delay",
-                "Hearing Loss"
-            ],
-            "rash in baby": [
-                "Diaper Dermatitis",
-                "Roseola",
-                "Fifth Disease",
-                "Hand Foot Mouth Disease"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 16: TRAUMA / INJURY / ENVIRONMENTAL
-            # -----------------------------------------------------------------
-            "burn": [
-                "Thermal Burn", 
-                "Chemical Burn", 
-                "Electrical Burn", 
-                "Sunburn"
-            ],
-            "laceration": [
-                "Cut", 
-                "Wound Infection", 
-                "Tetanus Risk"
-            ],
-            "head injury": [
-                "Concussion", 
-                "Subdural Hematoma", 
-                "Epidural Hematoma", 
-                "Skull Fracture"
-            ],
-            "fracture": [
-                "Bone Break", 
-                "Osteoporosis", 
-                "Stress Fracture", 
-                "Pathologic Fracture"
-            ],
-            "frostbite": [
-                "Cold Exposure",
-                "Vascular Compromise"
-            ],
-            "hypothermia": [
-                "Environmental Exposure",
-                "Sepsis",
-                "Hypothyroidism"
-            ],
-            "snake bite": [
-                "Venomous Envenomation",
-                "Local Tissue Necrosis",
-                "Anaphylaxis"
-            ],
-            "insect bite": [
-                "Local Reaction",
-                "Lyme Disease",
-                "West Nile Virus",
-                "Zika Virus",
-                "Anaphylaxis"
-            ],
-
-            # -----------------------------------------------------------------
-            # SECTION 17: RARE / MISCELLANEOUS
-            # -----------------------------------------------------------------
-            "blue urine": [
-                "Hartnup Disease",
-                "Medication (Methylene Blue)",
-                "Pseudomonas Infection"
-            ],
-            "green urine": [
-                "Propofol Infusion",
-                "Pseudomonas Infection"
-            ],
-            "copper ring in eye": [
-                "Wilson's Disease"
-            ],
-            "strawberry tongue": [
-                "Kawasaki Disease",
-                "Scarlet Fever",
-                "Toxic Shock Syndrome"
-            ],
-            "cafe au lait spots": [
-                "Neurofibromatosis",
-                "McCune-Albright Syndrome"
-            ],
-            "port wine stain": [
-                "Sturge-Weber Syndrome",
-                "Klippel-Trenaunay Syndrome"
-            ]
+        # A caller-supplied KB (synthetic, external file) is used as given;
+        # a flat SYMPTOMS table becomes a single section of that name.
+        if self.SYMPTOMS is not None or self.SECTIONS is not None:
+            if self.SECTIONS is None:
+                self.SECTIONS = {"SYMPTOMS": self.SYMPTOMS}
+            if self.SYMPTOMS is None:
+                self.SYMPTOMS = merge_sections(self.SECTIONS)
+            self.ALERTS = self.ALERTS if self.ALERTS is not None else {}
+            self.MEDS = self.MEDS if self.MEDS is not None else {}
+            self.ALIASES = self.ALIASES if self.ALIASES is not None else {}
+            return
+
+        self.SECTIONS = {
+            "SECTION 1: GENERAL / CONSTITUTIONAL / SYSTEMIC": {
+                "fever": [
+                    "Infectious Pathology (Viral/Bacterial)", 
+                    "Systemic Inflammatory Response Syndrome (SIRS)", 
+                    "Autoimmune Etiology (Lupus, RA)", 
+                    "Malignancy (Lymphoma, Leukemia)", 
+                    "Drug Fever (Antibiotics, Anticonvulsants)",
+                    "Neuroleptic Malignant Syndrome",
+                    "Thyroid Storm"
+                ],
+                "high fever": [
+                    "Sepsis",
+                    "Meningitis",
+                    "Pyelonephritis",
+                    "Influenza",
+                    "Malaria"
+                ],
+                "low grade fever": [
+                    "Tuberculosis",
+                    "Lymphoma",
+                    "Chronic Infection",
+                    "Sinusitis"
+                ],
+                "chills": [
+                    "Bacteremia", 
+                    "Sepsis Alert", 
+                    "Acute Febrile Illness", 
+                    "Malaria", 
+                    "Influenza",
+                    "Pyelonephritis",
+                    "Pneumonia"
+                ],
+                "rigors": [
+                    "Severe Sepsis",
+                    "Biliary Tract Infection",
+                    "Malaria"
+                ],
+                "fatigue": [
+                    "Anemia (Iron Deficiency, B12)", 
+                    "Hypothyroidism", 
+                    "Chronic Fatigue Syndrome", 
+                    "Depression", 
+                    "Diabetes Mellitus", 
+                    "Sleep Apnea", 
+                    "Mononucleosis",
+                    "Adrenal Insufficiency",
+                    "Congestive Heart Failure",
+                    "Chronic Kidney Disease"
+                ],
+                "weight loss": [
+                    "Hyperthyroidism (Graves')", 
+                    "Type 1 Diabetes Mellitus", 
+                    "Malignancy Screening Needed", 
+                    "Malabsorption (Celiac, Crohn's)", 
+                    "Chronic Infection (TB/HIV)",
+                    "Anorexia Nervosa"
+                ],
+                "weight gain": [
+                    "Hypothyroidism", 
+                    "Cushing's Syndrome", 
+                    "Heart Failure (Edema)", 
+                    "Polycystic Ovary Syndrome (PCOS)", 
+                    "Medication Side Effect (Steroids, Antipsychotics)",
+                    "Liver Failure (Ascites)"
+                ],
+                "night sweats": [
+                    "Tuberculosis", 
+                    "Lymphoma (Hodgkin's)", 
+                    "Menopause", 
+                    "HIV/AIDS", 
+                    "Brucellosis", 
+                    "Infective Endocarditis",
+                    "Osteomyelitis"
+                ],
+                "dehydration": [
+                    "Gastroenteritis", 
+                    "Heat Exhaustion", 
+                    "Hyperglycemia (DKA/HHS)", 
+                    "Diuretic Overuse", 
+                    "Diabetes Insipidus"
+                ],
+                "weakness": [
+                    "Electrolyte Imbalance (Hypokalemia)", 
+                    "Stroke", 
+                    "Guillain-Barre Syndrome", 
+                    "Myasthenia Gravis", 
+                    "Anemia",
+                    "Polymyositis"
+                ],
+                "malaise": [
+                    "Viral Prodrome", 
+                    "Chronic Disease", 
+                    "Depression", 
+                    "Autoimmune Flares",
+                    "Hepatitis"
+                ],
+                "swollen lymph nodes": [
+                    "Infection (Local/Systemic)", 
+                    "Lymphoma", 
+                    "Leukemia", 
+                    "Metastatic Cancer", 
+                    "Sarcoidosis",
+                    "Tuberculosis (Scrofula)"
+                ],
+                "pallor": [
+                    "Anemia", 
+                    "Shock", 
+                    "Vasoconstriction", 
+                    "Hypoglycemia",
+                    "Internal Bleeding"
+                ],
+            },
+
+            "SECTION 2: RESPIRATORY SYSTEM": {
+                "cough": [
+                    "Respiratory Infection (Viral/Bacterial)", 
+                    "Bronchitis", 
+                    "Pneumonia", 
+                    "Asthma/COPD", 
+                    "GERD (Reflux)", 
+                    "ACE Inhibitor Induced", 
+                    "Post-nasal Drip",
+                    "Heart Failure"
+                ],
+                "dry cough": [
+                    "Viral URI",
+                    "Asthma",
+                    "Interstitial Lung Disease",
+                    "ACE Inhibitor side effect",
+                    "COVID-19"
+                ],
+                "productive cough": [
+                    "Pneumonia",
+                    "Chronic Bronchitis",
+                    "Bronchiectasis",
+                    "Lung Abscess"
+                ],
+                "barking cough": [
+                    "Croup",
+                    "Tracheitis"
+                ],
+                "shortness of breath": [
+                    "Dyspnea", 
+                    "Congestive Heart Failure", 
+                    "Pneumonia", 
+                    "Pulmonary Embolism", 
+                    "Anemia", 
+                    "Anxiety/Panic Attack", 
+                    "Pneumothorax",
+                    "Pleural Effusion"
+                ],
+                "dyspnea on exertion": [
+                    "Angina",
+                    "COPD",
+                    "Heart Failure",
+                    "Pulmonary Hypertension"
+                ],
+                "orthopnea": [
+                    "Congestive Heart Failure",
+                    "Obesity Hypoventilation",
+                    "Diaphragmatic Paralysis"
+                ],
+                "wheezing": [
+                    "Asthma", 
+                    "COPD Exacerbation", 
+                    "Anaphylaxis", 
+                    "Bronchiolitis", 
+                    "Foreign Body Aspiration"
+                ],
+                "sore throat": [
+                    "Pharyngitis (Viral)", 
+                    "Tonsillitis", 
+                    "Strep Throat (Group A Strep)", 
+                    "Mononucleosis", 
+                    "Epiglottitis", 
+                    "Peritonsillar Abscess",
+                    "Gonococcal Pharyngitis"
+                ],
+                "hoarseness": [
+                    "Laryngitis", 
+                    "Vocal Cord Nodules", 
+                    "GERD", 
+                    "Thyroid Malignancy", 
+                    "Laryngeal Nerve Palsy (Recurrent)",
+                    "Lung Cancer (Pancoast Tumor)"
+                ],
+                "coughing blood": [
+                    "Tuberculosis", 
+                    "Lung Cancer", 
+                    "Pulmonary Embolism", 
+                    "Bronchiectasis", 
+                    "Severe Bronchitis", 
+                    "Goodpasture Syndrome",
+                    "Wegener's Granulomatosis"
+                ],
+                "nasal congestion": [
+                    "Rhinitis (Allergic/Viral)", 
+                    "Sinusitis", 
+                    "Nasal Polyps", 
+                    "Deviated Septum",
+                    "Rhinitis Medicamentosa"
+                ],
+                "sneezing": [
+                    "Allergic Rhinitis", 
+                    "Viral URI", 
+                    "Irritant Exposure"
+                ],
+                "stridor": [
+                    "Croup", 
+                    "Epiglottitis", 
+                    "Foreign Body", 
+                    "Laryngomalacia", 
+                    "Anaphylaxis",
+                    "Retropharyngeal Abscess"
+                ],
+                "pleuritic pain": [
+                    "Pleurisy", 
+                    "Pneumonia", 
+                    "Pulmonary Embolism", 
+                    "Pericarditis",
+                    "Pneumothorax"
+                ],
+            },
+
+            "SECTION 3: CARDIOVASCULAR SYSTEM": {
+                "chest pain": [
+                    "Acute Coronary Syndrome (MI)", 
+                    "Stable/Unstable Angina", 
+                    "GERD (Esophageal Spasm)", 
+                    "Costochondritis (Musculoskeletal)", 
+                    "Pericarditis", 
+                    "Aortic Dissection", 
+                    "Panic Attack", 
+                    "Pneumothorax"
+                ],
+                "substernal chest pain": [
+                    "Myocardial Infarction",
+                    "Angina Pectoris",
+                    "Esophageal Spasm"
+                ],
+                "tearing chest pain": [
+                    "Aortic Dissection"
+                ],
+                "palpitations": [
+                    "Sinus Tachycardia", 
+                    "Atrial Fibrillation", 
+                    "Anxiety", 
+                    "Thyrotoxicosis", 
+                    "Anemia", 
+                    "PVCs/PACs", 
+                    "Caffeine/Stimulant Use",
+                    "Electrolyte Imbalance"
+                ],
+                "swollen legs": [
+                    "Congestive Heart Failure", 
+                    "Deep Vein Thrombosis (DVT)", 
+                    "Chronic Venous Insufficiency", 
+                    "Kidney Disease (Nephrotic Syndrome)", 
+                    "Lymphedema", 
+                    "Calcium Channel Blockers side effect",
+                    "Liver Failure (Low Albumin)"
+                ],
+                "unilateral leg swelling": [
+                    "Deep Vein Thrombosis (DVT)",
+                    "Baker's Cyst Rupture",
+                    "Cellulitis"
+                ],
+                "cyanosis": [
+                    "Hypoxia", 
+                    "Congenital Heart Defect", 
+                    "Pulmonary Embolism", 
+                    "Severe Asthma", 
+                    "Methemoglobinemia"
+                ],
+                "claudication": [
+                    "Peripheral Artery Disease", 
+                    "Spinal Stenosis", 
+                    "Deep Vein Thrombosis"
+                ],
+                "syncope": [
+                    "Vasovagal Syncope", 
+                    "Orthostatic Hypotension", 
+                    "Arrhythmia (V-Tach/Heart Block)", 
+                    "Aortic Stenosis", 
+                    "Seizure",
+                    "Pulmonary Embolism"
+                ],
+                "lightheadedness": [
+                    "Dehydration",
+                    "Hypotension",
+                    "Anemia",
+                    "Hypoglycemia"
+                ],
+                "irregular heartbeat": [
+                    "Atrial Fibrillation", 
+                    "Arrhythmia", 
+                    "Electrolyte Imbalance (K/Mg)"
+                ],
+                "bradycardia": [
+                    "Hypothyroidism",
+                    "Sick Sinus Syndrome",
+                    "Heart Block",
+                    "Athlete's Heart",
+                    "Beta-blocker overdose"
+                ],
+                "tachycardia": [
+                    "Fever",
+                    "Anemia",
+                    "Hyperthyroidism",
+                    "Dehydration",
+                    "Shock",
+                    "Anxiety"
+                ],
+            },
+
+            "SECTION 4: NEUROLOGICAL SYSTEM": {
+                "headache": [
+                    "Migraine", 
+                    "Tension Type Headache", 
+                    "Intracranial Issue (Tumor/Bleed)", 
+                    "Sinusitis", 
+                    "Cluster Headache", 
+                    "Temporal Arteritis", 
+                    "Meningitis", 
+                    "Subarachnoid Hemorrhage"
+                ],
+                "thunderclap headache": [
+                    "Subarachnoid Hemorrhage",
+                    "Reversible Cerebral Vasoconstriction Syndrome"
+                ],
+                "morning headache": [
+                    "Sleep Apnea",
+                    "Increased Intracranial Pressure",
+                    "Hypertension"
+                ],
+                "dizziness": [
+                    "Vertigo (BPPV)", 
+                    "Orthostatic Hypotension", 
+                    "Arrhythmia", 
+                    "Anemia", 
+                    "Inner Ear Infection (Labyrinthitis)", 
+                    "Meniere's Disease", 
+                    "Stroke (Posterior Circulation)"
+                ],
+                "room spinning": [
+                    "Benign Paroxysmal Positional Vertigo (BPPV)",
+                    "Meniere's Disease",
+                    "Vestibular Neuritis"
+                ],
+                "numbness": [
+                    "Peripheral Neuropathy (Diabetes)", 
+                    "Stroke", 
+                    "Multiple Sclerosis", 
+                    "Radiculopathy (Pinched Nerve)", 
+                    "Carpal Tunnel Syndrome", 
+                    "Vitamin B12 Deficiency"
+                ],
+                "unilateral numbness": [
+                    "Stroke",
+                    "TIA",
+                    "Multiple Sclerosis"
+                ],
+                "tremors": [
+                    "Parkinson's Disease", 
+                    "Essential Tremor", 
+                    "Hyperthyroidism", 
+                    "Anxiety", 
+                    "Alcohol Withdrawal", 
+                    "Lithium Toxicity"
+                ],
+                "confusion": [
+                    "Delirium", 
+                    "Dementia (Alzheimer's)", 
+                    "Stroke", 
+                    "Sepsis", 
+                    "Hypoglycemia", 
+                    "Electrolyte Imbalance (Na/Ca)", 
+                    "Hepatic Encephalopathy", 
+                    "Wernicke's Encephalopathy"
+                ],
+                "double vision": [
+                    "Cranial Nerve Palsy", 
+                    "Myasthenia Gravis", 
+                    "Stroke", 
+                    "Multiple Sclerosis", 
+                    "Graves' Disease", 
+                    "Orbital Cellulitis"
+                ],
+                "seizure": [
+                    "Epilepsy", 
+                    "Febrile Seizure (Pediatric)", 
+                    "Alcohol Withdrawal", 
+                    "Brain Tumor", 
+                    "Hyponatremia", 
+                    "Eclampsia",
+                    "Trauma"
+                ],
+                "memory loss": [
+                    "Alzheimer's Disease", 
+                    "Dementia", 
+                    "Hypothyroidism", 
+                    "Vitamin B12 Deficiency", 
+                    "Depression (Pseudodementia)"
+                ],
+                "slurred speech": [
+                    "Stroke (CVA)", 
+                    "TIA", 
+                    "Alcohol Intoxication", 
+                    "ALS", 
+                    "Multiple Sclerosis",
+                    "Sedative Overdose"
+                ],
+                "facial drooping": [
+                    "Bell's Palsy", 
+                    "Stroke", 
+                    "Lyme Disease", 
+                    "Parotid Tumor"
+                ],
+                "loss of balance": [
+                    "Cerebellar Ataxia", 
+                    "Vestibular Neuritis", 
+                    "Stroke", 
+                    "Parkinson's Disease", 
+                    "Normal Pressure Hydrocephalus"
+                ],
+                "fainting": [
+                    "Vasovagal Syncope",
+                    "Orthostatic Hypotension",
+                    "Cardiac Arrhythmia"
+                ],
+                "tingling": [
+                    "Paresthesia",
+                    "Neuropathy",
+                    "Hyperventilation",
+                    "Hypocalcemia"
+                ],
+            },
+
+            "SECTION 5: GASTROINTESTINAL SYSTEM": {
+                "abdominal pain": [
+                    "Appendicitis", 
+                    "Cholecystitis", 
+                    "Gastritis", 
+                    "Bowel Obstruction", 
+                    "Pancreatitis", 
+                    "Diverticulitis", 
+                    "IBS", 
+                    "Mesenteric Ischemia"
+                ],
+                "right lower quadrant pain": [
+                    "Appendicitis",
+                    "Crohn's Disease",
+                    "Ectopic Pregnancy",
+                    "Ovarian Torsion"
+                ],
+                "right upper quadrant pain": [
+                    "Cholecystitis",
+                    "Biliary Colic",
+                    "Hepatitis",
+                    "Liver Abscess"
+                ],
+                "left lower quadrant pain": [
+                    "Diverticulitis",
+                    "Ovarian Cyst",
+                    "Ulcerative Colitis"
+                ],
+                "epigastric pain": [
+                    "GERD",
+                    "Peptic Ulcer Disease",
+                    "Pancreatitis",
+                    "Myocardial Infarction"
+                ],
+                "nausea": [
+                    "Gastroenteritis", 
+                    "Pregnancy", 
+                    "Vestibular Neuritis", 
+                    "Medication Side Effect", 
+                    "Migraine", 
+                    "Increased ICP"
+                ],
+                "vomiting": [
+                    "Gastroenteritis", 
+                    "Food Poisoning", 
+                    "Gastritis", 
+                    "Increased Intracranial Pressure", 
+                    "Cyclic Vomiting Syndrome", 
+                    "DKA",
+                    "Bowel Obstruction"
+                ],
+                "projectile vomiting": [
+                    "Pyloric Stenosis (Infants)",
+                    "Increased Intracranial Pressure"
+                ],
+                "diarrhea": [
+                    "Viral Gastroenteritis", 
+                    "Food Poisoning", 
+                    "IBS", 
+                    "Inflammatory Bowel Disease (Crohn's/UC)", 
+                    "Celiac Disease", 
+                    "Malabsorption",
+                    "Clostridium difficile"
+                ],
+                "bloody diarrhea": [
+                    "Ulcerative Colitis",
+                    "Crohn's Disease",
+                    "Dysentery (Shigella/Campylobacter)",
+                    "Ischemic Colitis"
+                ],
+                "constipation": [
+                    "Functional Constipation", 
+                    "IBS-C", 
+                    "Hypothyroidism", 
+                    "Opioid Use", 
+                    "Hypercalcemia", 
+                    "Colorectal Cancer",
+                    "Dehydration"
+                ],
+                "heartburn": [
+                    "GERD", 
+                    "Hiatal Hernia", 
+                    "Peptic Ulcer Disease", 
+                    "Gastritis", 
+                    "Esophagitis"
+                ],
+                "bloating": [
+                    "IBS", 
+                    "Lactose Intolerance", 
+                    "Small Bowel Obstruction", 
+                    "Ascites", 
+                    "SIBO", 
+                    "Ovarian Cancer"
+                ],
+                "difficulty swallowing": [
+                    "Esophagitis", 
+                    "Esophageal Stricture", 
+                    "Stroke", 
+                    "Achalasia", 
+                    "Esophageal Cancer", 
+                    "Zenker's Diverticulum"
+                ],
+                "rectal bleeding": [
+                    "Hemorrhoids", 
+                    "Anal Fissure", 
+                    "Colorectal Cancer", 
+                    "Diverticulosis", 
+                    "IBD", 
+                    "Angiodysplasia"
+                ],
+                "jaundice": [
+                    "Hepatitis (A/B/C)", 
+                    "Liver Cirrhosis", 
+                    "Gallstones (Choledocholithiasis)", 
+                    "Hemolytic Anemia", 
+                    "Pancreatic Cancer", 
+                    "Gilbert's Syndrome"
+                ],
+                "black stools": [
+                    "Upper GI Bleed (Melena)", 
+                    "Peptic Ulcer", 
+                    "Gastritis", 
+                    "Iron Supplements", 
+                    "Bismuth Subsalicylate"
+                ],
+                "loss of appetite": [
+                    "Malignancy", 
+                    "Depression", 
+                    "Chronic Infection", 
+                    "Gastroparesis", 
+                    "Liver Failure",
+                    "Kidney Failure"
+                ],
+                "belching": [
+                    "GERD",
+                    "Aerophagia",
+                    "Gastritis"
+                ],
+                "gas": [
+                    "Lactose Intolerance",
+                    "IBS",
+                    "High Fiber Diet",
+                    "Celiac Disease"
+                ],
+            },
+
+            "SECTION 6: MUSCULOSKELETAL / RHEUMATOLOGY": {
+                "back pain": [
+                    "Muscle Strain", 
+                    "Herniated Nucleus Pulposus", 
+                    "Sciatica", 
+                    "Renal Colic (Kidney Stone)", 
+                    "Osteoporosis", 
+                    "Spinal Stenosis", 
+                    "Ankylosing Spondylitis", 
+                    "Metastatic Disease"
+                ],
+                "low back pain": [
+                    "Lumbar Strain",
+                    "Degenerative Disc Disease",
+                    "Spondylolisthesis"
+                ],
+                "joint pain": [
+                    "Osteoarthritis", 
+                    "Rheumatoid Arthritis", 
+                    "Bursitis", 
+                    "Gout", 
+                    "Septic Arthritis", 
+                    "Lupus (SLE)", 
+                    "Psoriatic Arthritis"
+                ],
+                "knee pain": [
+                    "Meniscal Tear",
+                    "ACL Injury",
+                    "Osteoarthritis",
+                    "Patellofemoral Syndrome"
+                ],
+                "muscle weakness": [
+                    "Myasthenia Gravis", 
+                    "Polymyositis", 
+                    "Hypokalemia", 
+                    "Stroke", 
+                    "ALS", 
+                    "Muscular Dystrophy"
+                ],
+                "neck pain": [
+                    "Cervical Spondylosis", 
+                    "Muscle Strain", 
+                    "Meningitis", 
+                    "Whiplash", 
+                    "Torticollis"
+                ],
+                "muscle cramps": [
+                    "Dehydration", 
+                    "Electrolyte Imbalance (Mg/K/Ca)", 
+                    "Venous Insufficiency", 
+                    "Statins side effect"
+                ],
+                "joint swelling": [
+                    "Arthritis", 
+                    "Gout", 
+                    "Trauma", 
+                    "Septic Arthritis", 
+                    "Hemarthrosis"
+                ],
+                "shoulder pain": [
+                    "Rotator Cuff Injury", 
+                    "Frozen Shoulder (Adhesive Capsulitis)", 
+                    "Bursitis", 
+                    "Referred Pain (Gallbladder/Heart)"
+                ],
+                "wrist pain": [
+                    "Carpal Tunnel Syndrome",
+                    "De Quervain's Tenosynovitis",
+                    "Ganglion Cyst",
+                    "Fracture"
+                ],
+                "heel pain": [
+                    "Plantar Fasciitis",
+                    "Calcaneal Spur",
+                    "Achilles Tendonitis"
+                ],
+                "hip pain": [
+                    "Osteoarthritis",
+                    "Trochanteric Bursitis",
+                    "Hip Fracture",
+                    "Labral Tear"
+                ],
+                "morning stiffness": [
+                    "Rheumatoid Arthritis",
+                    "Polymyalgia Rheumatica",
+                    "Ankylosing Spondylitis"
+                ],
+            },
+
+            "SECTION 7: DERMATOLOGY": {
+                "rash": [
+                    "Contact Dermatitis", 
+                    "Viral Exanthem", 
+                    "Drug Reaction", 
+                    "Urticaria", 
+                    "Psoriasis", 
+                    "Scabies", 
+                    "Lyme Disease (Erythema Migrans)",
+                    "Syphilis (Secondary)"
+                ],
+                "petechiae": [
+                    "Thrombocytopenia",
+                    "Meningococcemia",
+                    "Vasculitis",
+                    "Leukemia"
+                ],
+                "itching": [
+                    "Allergic Reaction", 
+                    "Eczema (Atopic Dermatitis)", 
+                    "Liver Disease (Cholestasis)", 
+                    "Kidney Failure (Uremia)", 
+                    "Lymphoma", 
+                    "Scabies"
+                ],
+                "hair loss": [
+                    "Alopecia Areata", 
+                    "Telogen Effluvium", 
+                    "Hypothyroidism", 
+                    "Iron Deficiency", 
+                    "PCOS", 
+                    "Fungal Infection (Tinea Capitis)"
+                ],
+                "bruising": [
+                    "Thrombocytopenia", 
+                    "Trauma", 
+                    "Vitamin K Deficiency", 
+                    "Leukemia", 
+                    "Cushing's Syndrome", 
+                    "Von Willebrand Disease"
+                ],
+                "hives": [
+                    "Allergic Reaction", 
+                    "Stress", 
+                    "Viral Infection", 
+                    "Autoimmune Disease"
+                ],
+                "dry skin": [
+                    "Xerosis", 
+                    "Hypothyroidism", 
+                    "Eczema", 
+                    "Sjogren's Syndrome"
+                ],
+                "acne": [
+                    "Acne Vulgaris", 
+                    "Hormonal Imbalance", 
+                    "Rosacea", 
+                    "Folliculitis"
+                ],
+                "skin lesions": [
+                    "Melanoma", 
+                    "Basal Cell Carcinoma", 
+                    "Squamous Cell Carcinoma", 
+                    "Seborrheic Keratosis"
+                ],
+                "yellow skin": [
+                    "Jaundice", 
+                    "Carotenemia"
+                ],
+                "blisters": [
+                    "Herpes Simplex",
+                    "Shingles (Varicella Zoster)",
+                    "Pemphigus Vulgaris",
+                    "Bullous Pemphigoid",
+                    "Burn"
+                ],
+                "nail changes": [
+                    "Psoriasis",
+                    "Fungal Infection (Onychomycosis)",
+                    "Iron Deficiency (Koilonychia)",
+                    "Lung Disease (Clubbing)"
+                ],
+            },
+
+            "SECTION 8: ENT / DENTAL": {
+                "ear pain": [
+                    "Otitis Media", 
+                    "Otitis Externa (Swimmer's Ear)", 
+                    "Eustachian Tube Dysfunction", 
+                    "TMJ Disorder", 
+                    "Mastoiditis"
+                ],
+                "ear discharge": [
+                    "Otitis Externa",
+                    "Ruptured Eardrum",
+                    "CSF Leak (Trauma)"
+                ],
+                "toothache": [
+                    "Dental Caries", 
+                    "Pulpitis", 
+                    "Periapical Abscess", 
+                    "Dental Trauma", 
+                    "Sinusitis (referred pain)"
+                ],
+                "nosebleed": [
+                    "Epistaxis", 
+                    "Trauma", 
+                    "Hypertension", 
+                    "Coagulopathy", 
+                    "Dry Mucosa", 
+                    "Nasal Tumor"
+                ],
+                "ringing in ears": [
+                    "Tinnitus", 
+                    "Hearing Loss", 
+                    "Meniere's Disease", 
+                    "Acoustic Neuroma", 
+                    "Salicylate Toxicity"
+                ],
+                "hearing loss": [
+                    "Presbycusis", 
+                    "Cerumen Impaction", 
+                    "Noise Exposure", 
+                    "Otosclerosis", 
+                    "Sudden Sensorineural Hearing Loss"
+                ],
+                "mouth ulcers": [
+                    "Aphthous Stomatitis (Canker Sore)", 
+                    "Herpes Simplex (Cold Sore)", 
+                    "Behcet's Disease", 
+                    "Vitamin Deficiency (B12/Iron)", 
+                    "Oral Cancer"
+                ],
+                "bad breath": [
+                    "Halitosis", 
+                    "Gingivitis", 
+                    "GERD", 
+                    "Sinusitis", 
+                    "Tonsilloliths"
+                ],
+                "swollen glands": [
+                    "Infection (Strep/Viral)", 
+                    "Lymphoma", 
+                    "Mononucleosis", 
+                    "Dental Abscess"
+                ],
+                "white patches in mouth": [
+                    "Thrush (Candidiasis)",
+                    "Leukoplakia",
+                    "Lichen Planus"
+                ],
+                "loss of smell": [
+                    "COVID-19",
+                    "Sinusitis",
+                    "Nasal Polyps",
+                    "Head Trauma"
+                ],
+            },
+
+            "SECTION 9: MENTAL HEALTH / PSYCHIATRY": {
+                "anxiety": [
+                    "Generalized Anxiety Disorder", 
+                    "Panic Attack", 
+                    "Acute Stress Reaction", 
+                    "Hyperthyroidism", 
+                    "Caffeine Intoxication", 
+                    "Pheochromocytoma"
+                ],
+                "insomnia": [
+                    "Sleep Hygiene Issue", 
+                    "Stress-related Insomnia", 
+                    "Sleep Apnea", 
+                    "Depression", 
+                    "Restless Leg Syndrome", 
+                    "Circadian Rhythm Disorder"
+                ],
+                "depression": [
+                    "Major Depressive Disorder", 
+                    "Bipolar Disorder", 
+                    "Hypothyroidism", 
+                    "Vitamin D Deficiency", 
+                    "Anemia", 
+                    "Chronic Pain"
+                ],
+                "hallucinations": [
+                    "Schizophrenia", 
+                    "Drug Toxicity", 
+                    "Delirium", 
+                    "Severe Depression", 
+                    "Lewy Body Dementia"
+                ],
+                "mood swings": [
+                    "Bipolar Disorder", 
+                    "Borderline Personality Disorder", 
+                    "PMS/PMDD", 
+                    "Hormonal Imbalance",
+                    "Substance Abuse"
+                ],
+                "suicidal thoughts": [
+                    "Major Depression", 
+                    "Crisis State", 
+                    "Psychosis", 
+                    "Substance Abuse"
+                ],
+                "panic": [
+                    "Panic Disorder", 
+                    "Phobia", 
+                    "PTSD", 
+                    "Hyperthyroidism"
+                ],
+                "irritability": [
+                    "Depression",
+                    "Anxiety",
+                    "Bipolar Disorder",
+                    "Sleep Deprivation",
+                    "Graves' Disease"
+                ],
+                "social withdrawal": [
+                    "Depression",
+                    "Schizophrenia",
+                    "Social Anxiety Disorder",
+                    "Autism Spectrum Disorder"
+                ],
+            },
+
+            "SECTION 10: GENITOURINARY / NEPHROLOGY / MALE REPRODUCTIVE": {
+                "painful urination": [
+                    "Urinary Tract Infection (UTI)", 
+                    "STI (Chlamydia/Gonorrhea)", 
+                    "Kidney Stones", 
+                    "Prostatitis", 
+                    "Interstitial Cystitis", 
+                    "Urethritis"
+                ],
+                "blood in urine": [
+                    "UTI", 
+                    "Kidney Stones", 
+                    "Bladder Cancer", 
+                    "Glomerulonephritis", 
+                    "Trauma", 
+                    "Prostate Cancer", 
+                    "Polycystic Kidney Disease"
+                ],
+                "frequent urination": [
+                    "Diabetes Mellitus", 
+                    "UTI", 
+                    "Benign Prostatic Hyperplasia (BPH)", 
+                    "Overactive Bladder", 
+                    "Diuretics", 
+                    "Diabetes Insipidus"
+                ],
+                "incontinence": [
+                    "Stress Incontinence", 
+                    "Urge Incontinence", 
+                    "Neurogenic Bladder", 
+                    "Overflow Incontinence (BPH)"
+                ],
+                "flank pain": [
+                    "Kidney Stones (Renal Colic)", 
+                    "Pyelonephritis", 
+                    "Hydronephrosis", 
+                    "Renal Infarction",
+                    "Musculoskeletal Strain"
+                ],
+                "testicular pain": [
+                    "Testicular Torsion", 
+                    "Epididymitis", 
+                    "Orchitis", 
+                    "Inguinal Hernia", 
+                    "Varicocele"
+                ],
+                "testicular lump": [
+                    "Testicular Cancer",
+                    "Hydrocele",
+                    "Spermatocele",
+                    "Varicocele"
+                ],
+                "erectile dysfunction": [
+                    "Vascular Disease",
+                    "Diabetes",
+                    "Medication Side Effect",
+                    "Psychogenic",
+                    "Low Testosterone"
+                ],
+            },
+
+            "SECTION 11: REPRODUCTIVE HEALTH (FEMALE)": {
+                "pelvic pain": [
+                    "Pelvic Inflammatory Disease (PID)", 
+                    "Endometriosis", 
+                    "Ovarian Cysts", 
+                    "Ectopic Pregnancy", 
+                    "Fibroids"
+                ],
+                "vaginal discharge": [
+                    "Bacterial Vaginosis", 
+                    "Candidiasis (Yeast)", 
+                    "Trichomoniasis", 
+                    "Chlamydia/Gonorrhea"
+                ],
+                "irregular periods": [
+                    "PCOS", 
+                    "Thyroid Dysfunction", 
+                    "Menopause", 
+                    "Stress", 
+                    "Prolactinoma",
+                    "Eating Disorders"
+                ],
+                "menstrual cramps": [
+                    "Dysmenorrhea", 
+                    "Endometriosis", 
+                    "Adenomyosis", 
+                    "Fibroids"
+                ],
+                "hot flashes": [
+                    "Menopause", 
+                    "Carcinoid Syndrome", 
+                    "Medication Side Effect (Tamoxifen)"
+                ],
+                "breast lump": [
+                    "Fibroadenoma", 
+                    "Breast Cyst", 
+                    "Breast Cancer", 
+                    "Mastitis",
+                    "Abscess"
+                ],
+                "nipple discharge": [
+                    "Intraductal Papilloma",
+                    "Galactorrhea (Prolactinoma)",
+                    "Breast Cancer",
+                    "Mammary Duct Ectasia"
+                ],
+                "vaginal itching": [
+                    "Yeast Infection",
+                    "Contact Dermatitis",
+                    "Lichen Sclerosus",
+                    "Pinworms"
+                ],
+            },
+
+            "SECTION 12: OPHTHALMOLOGY": {
+                "red eye": [
+                    "Conjunctivitis (Pink Eye)", 
+                    "Subconjunctival Hemorrhage", 
+                    "Uveitis", 
+                    "Glaucoma (Acute Angle Closure)", 
+                    "Corneal Abrasion"
+                ],
+                "eye pain": [
+                    "Corneal Abrasion", 
+                    "Glaucoma", 
+                    "Optic Neuritis", 
+                    "Uveitis", 
+                    "Scleritis",
+                    "Foreign Body"
+                ],
+                "blurred vision": [
+                    "Refractive Error", 
+                    "Cataract", 
+                    "Macular Degeneration", 
+                    "Diabetic Retinopathy", 
+                    "Glaucoma"
+                ],
+                "vision loss": [
+                    "Retinal Detachment", 
+                    "Central Retinal Artery Occlusion", 
+                    "Stroke", 
+                    "Glaucoma", 
+                    "Temporal Arteritis"
+                ],
+                "floaters": [
+                    "Posterior Vitreous Detachment", 
+                    "Retinal Tear", 
+                    "Uveitis"
+                ],
+                "dry eyes": [
+                    "Dry Eye Syndrome", 
+                    "Sjogren's Syndrome", 
+                    "Blepharitis", 
+                    "Medication Side Effect"
+                ],
+                "light sensitivity": [
+                    "Migraine", 
+                    "Meningitis", 
+                    "Uveitis", 
+                    "Corneal Abrasion"
+                ],
+                "excessive tearing": [
+                    "Blocked Tear Duct",
+                    "Allergies",
+                    "Dry Eye (Reflex Tearing)",
+                    "Conjunctivitis"
+                ],
+                "night blindness": [
+                    "Vitamin A Deficiency",
+                    "Retinitis Pigmentosa",
+                    "Cataracts"
+                ],
+            },
+
+            "SECTION 13: ENDOCRINOLOGY / METABOLIC": {
+                "excessive thirst": [
+                    "Diabetes Mellitus", 
+                    "Diabetes Insipidus", 
+                    "Psychogenic Polydipsia", 
+                    "Dehydration", 
+                    "Hypercalcemia"
+                ],
+                "heat intolerance": [
+                    "Hyperthyroidism", 
+                    "Menopause", 
+                    "Dysautonomia"
+                ],
+                "cold intolerance": [
+                    "Hypothyroidism", 
+                    "Anorexia Nervosa", 
+                    "Raynaud's Phenomenon"
+                ],
+                "excessive hair growth": [
+                    "Hirsutism", 
+                    "PCOS", 
+                    "Cushing's Syndrome", 
+                    "Adrenal Tumor"
+                ],
+                "moon face": [
+                    "Cushing's Syndrome",
+                    "Steroid Use"
+                ],
+                "salt craving": [
+                    "Addison's Disease",
+                    "Dehydration",
+                    "Bartter Syndrome"
+                ],
+            },
+
+            "SECTION 14: HEMATOLOGY / ONCOLOGY": {
+                "easy bleeding": [
+                    "Thrombocytopenia", 
+                    "Hemophilia", 
+                    "Von Willebrand Disease", 
+                    "Liver Disease", 
+                    "Vitamin K Deficiency"
+                ],
+                "gum bleeding": [
+                    "Gingivitis",
+                    "Vitamin C Deficiency (Scurvy)",
+                    "Leukemia",
+                    "Thrombocytopenia"
+                ],
+                "enlarged spleen": [
+                    "Mononucleosis",
+                    "Leukemia",
+                    "Lymphoma",
+                    "Malaria",
+                    "Liver Cirrhosis (Portal Hypertension)"
+                ],
+            },
+
+            "SECTION 15: PEDIATRICS SPECIFIC": {
+                "failure to thrive": [
+                    "Malnutrition", 
+                    "Celiac Disease", 
+                    "Cystic Fibrosis", 
+                    "Congenital Heart Defect",
+                    "Metabolic Disorders"
+                ],
+                "bedwetting": [
+                    "Enuresis", 
+                    "UTI", 
+                    "Diabetes", 
+                    "Stress"
+                ],
+                "croup cough": [
+                    "Croup (Laryngotracheobronchitis)", 
+                    "Foreign Body"
+                ],
+                "colic": [
+                    "Infant Colic", 
+                    "Cow's Milk Protein Allergy", 
+                    "Reflux"
+                ],
+                "floppy baby": [
+                    "Botulism",
+                    "Spinal Muscular Atrophy",
+                    "Hypothyroidism",
+                    "Down Syndrome"
+                ],
+                "delayed milestones": [
+                    "Autism Spectrum Disorder",
+                    "Cerebral Palsy",
+                    "Global Developmental Delay",
+                    "Hearing Loss"
+                ],
+                "rash in baby": [
+                    "Diaper Dermatitis",
+                    "Roseola",
+                    "Fifth Disease",
+                    "Hand Foot Mouth Disease"
+                ],
+            },
+
+            "SECTION 16: TRAUMA / INJURY / ENVIRONMENTAL": {
+                "burn": [
+                    "Thermal Burn", 
+                    "Chemical Burn", 
+                    "Electrical Burn", 
+                    "Sunburn"
+                ],
+                "laceration": [
+                    "Cut", 
+                    "Wound Infection", 
+                    "Tetanus Risk"
+                ],
+                "head injury": [
+                    "Concussion", 
+                    "Subdural Hematoma", 
+                    "Epidural Hematoma", 
+                    "Skull Fracture"
+                ],
+                "fracture": [
+                    "Bone Break", 
+                    "Osteoporosis", 
+                    "Stress Fracture", 
+                    "Pathologic Fracture"
+                ],
+                "frostbite": [
+                    "Cold Exposure",
+                    "Vascular Compromise"
+                ],
+                "hypothermia": [
+                    "Environmental Exposure",
+                    "Sepsis",
+                    "Hypothyroidism"
+                ],
+                "snake bite": [
+                    "Venomous Envenomation",
+                    "Local Tissue Necrosis",
+                    "Anaphylaxis"
+                ],
+                "insect bite": [
+                    "Local Reaction",
+                    "Lyme Disease",
+                    "West Nile Virus",
+                    "Zika Virus",
+                    "Anaphylaxis"
+                ],
+            },
+
+            "SECTION 17: RARE / MISCELLANEOUS": {
+                "blue urine": [
+                    "Hartnup Disease",
+                    "Medication (Methylene Blue)",
+                    "Pseudomonas Infection"
+                ],
+                "green urine": [
+                    "Propofol Infusion",
+                    "Pseudomonas Infection"
+                ],
+                "copper ring in eye": [
+                    "Wilson's Disease"
+                ],
+                "strawberry tongue": [
+                    "Kawasaki Disease",
+                    "Scarlet Fever",
+                    "Toxic Shock Syndrome"
+                ],
+                "cafe au lait spots": [
+                    "Neurofibromatosis",
+                    "McCune-Albright Syndrome"
+                ],
+                "port wine stain": [
+                    "Sturge-Weber Syndrome",
+                    "Klippel-Trenaunay Syndrome"
+                ]
+            },
         }
+        self.SYMPTOMS = merge_sections(self.SECTIONS)
         
         self.ALERTS = {
             "chest pain": "CRITICAL: Rule out Cardiac Ischemia/MI/Dissection immediately.",
@@ -1530,45 +1612,1748 @@ class ClinicalData:
             "sprain": "RICE (Rest, Ice, Compression, Elevation)",
             "strain": "RICE, NSAIDs"
         }
+        
+        # Surface forms (abbreviations, lay terms, plurals) -> canonical
+        # SYMPTOMS keys. Compiled into the same token index as the keys; an
+        # alias adds the symptom only and never raises the key's alert.
+        self.ALIASES = {
+            # Respiratory
+            "sob": ["shortness of breath"],
+            "short of breath": ["shortness of breath"],
+            "can't breathe": ["shortness of breath"],
+            "cannot breathe": ["shortness of breath"],
+            "difficulty breathing": ["shortness of breath"],
+            "trouble breathing": ["shortness of breath"],
+            "hemoptysis": ["coughing blood"],
+            "runny nose": ["nasal congestion"],
+            "stuffy nose": ["nasal congestion"],
+            
+            # Cardiovascular
+            "cp": ["chest pain"],
+            "chest pains": ["chest pain"],
+            "heart racing": ["palpitations"],
+            "racing heart": ["palpitations"],
+            "palpitation": ["palpitations"],
+            "leg swelling": ["swollen legs"],
+            "swollen ankles": ["swollen legs"],
+            "passed out": ["fainting"],
+            "lightheaded": ["lightheadedness"],
+            
+            # Neurological
+            "h/a": ["headache"],
+            "headaches": ["headache"],
+            "sz": ["seizure"],
+            "seizures": ["seizure"],
+            "ams": ["confusion"],
+            "altered mental status": ["confusion"],
+            "dizzy": ["dizziness"],
+            "face drooping": ["facial drooping"],
+            "slurring": ["slurred speech"],
+            
+            # Gastrointestinal
+            "n/v": ["nausea", "vomiting"],
+            "n/v/d": ["nausea", "vomiting", "diarrhea"],
+            "nauseous": ["nausea"],
+            "nauseated": ["nausea"],
+            "throwing up": ["vomiting"],
+            "threw up": ["vomiting"],
+            "abd pain": ["abdominal pain"],
+            "belly pain": ["abdominal pain"],
+            "stomach ache": ["abdominal pain"],
+            "stomachache": ["abdominal pain"],
+            "ruq pain": ["right upper quadrant pain"],
+            "rlq pain": ["right lower quadrant pain"],
+            "llq pain": ["left lower quadrant pain"],
+            "melena": ["black stools"],
+            "brbpr": ["rectal bleeding"],
+            "hematochezia": ["rectal bleeding"],
+            "dysphagia": ["difficulty swallowing"],
+            
+            # Musculoskeletal / Dermatology
+            "lbp": ["low back pain"],
+            "rashes": ["rash"],
+            "itchy": ["itching"],
+            
+            # General / GU / Mental Health
+            "f/c": ["fever", "chills"],
+            "fevers": ["fever"],
+            "tired": ["fatigue"],
+            "wt loss": ["weight loss"],
+            "dysuria": ["painful urination"],
+            "hematuria": ["blood in urine"],
+            "suicidal ideation": ["suicidal thoughts"],
+            "can't sleep": ["insomnia"],
+            "pink eye": ["red eye"],
+        }
+
+    @classmethod
+    def from_file(cls, path: str) -> "ClinicalData":
+        """
+        Loads a KB file holding the SECTIONS (or a flat SYMPTOMS), ALERTS,
+        MEDS and ALIASES tables (the layout `python consulthealth.py generate
+        kb` writes). Files ending in .yaml/.yml need PyYAML; anything else is
+        read as JSON. Symptom and alert keys, and alias targets, must be
+        lowercase: the matcher only indexes lowercase keys, so a capitalized
+        one would otherwise load and never match.
+        """
+        import json
+
+        with open(path, encoding="utf-8") as f:
+            if path.lower().endswith((".yaml", ".yml")):
+                try:
+                    import yaml
+                except ImportError:
+                    raise RuntimeError(f"{path}: YAML knowledge bases require PyYAML") from None
+                tables = yaml.safe_load(f)
+            else:
+                tables = json.load(f)
+
+        def lowercase(name: str, keys: Iterable[str]) -> None:
+            for key in keys:
+                if key != key.lower():
+                    raise ValueError(f"{path}: {name} {key!r} must be lowercase")
+
+        def table(name: str, lists: bool, required: bool = False, value: object = None) -> Dict[str, object]:
+            value = tables.get(name) if value is None else value
+            if value is None and not required:
+                return {}
+            ok = isinstance(value, dict) and all(
+                isinstance(k, str) and (
+                    isinstance(v, list) and all(isinstance(x, str) for x in v) if lists else isinstance(v, str)
+                )
+                for k, v in value.items()
+            )
+            if not ok:
+                kind = "lists of strings" if lists else "strings"
+                raise ValueError(f"{path}: {name} must map strings to {kind}")
+            return value
+
+        if not isinstance(tables, dict):
+            raise ValueError(f"{path}: expected a mapping with SECTIONS, ALERTS, MEDS and ALIASES")
+        sections = tables.get("SECTIONS")
+        if sections is not None:
+            if not isinstance(sections, dict) or not sections:
+                raise ValueError(f"{path}: SECTIONS must map section names to symptom tables")
+            sections = {name: table(f"SECTIONS[{name!r}]", lists=True, required=True, value=symptoms)
+                        for name, symptoms in sections.items()}
+            for name, symptoms in sections.items():
+                lowercase(f"SECTIONS[{name!r}] key", symptoms)
+        symptoms = None if sections is not None else table("SYMPTOMS", lists=True, required=True)
+        lowercase("SYMPTOMS key", symptoms or ())
+        alerts = table("ALERTS", lists=False)
+        lowercase("ALERTS key", alerts)
+        aliases = table("ALIASES", lists=True)
+        for surface, targets in aliases.items():
+            lowercase(f"ALIASES[{surface!r}] target", targets)
+        return cls(
+            SYMPTOMS=symptoms,
+            SECTIONS=sections,
+            ALERTS=alerts,
+            MEDS=table("MEDS", lists=False),
+            ALIASES=aliases,
+        )
+
+    def version(self, digests: Optional[Dict[str, str]] = None) -> str:
+        """
+        Short content hash of the knowledge base, stable across processes.
+        Sections enter through their section_digest(); pass `digests` when
+        they are already known (a compiled engine has them).
+        """
+        import hashlib
+        import json
+
+        if digests is None:
+            digests = {name: section_digest(symptoms) for name, symptoms in self.SECTIONS.items()}
+        sections = [[name, digests[name]] for name in self.SECTIONS]
+        payload = json.dumps([sections, self.ALERTS, self.MEDS, self.ALIASES or {}], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+def merge_sections(sections: Dict[str, Dict[str, List[str]]]) -> Dict[str, List[str]]:
+    """One symptom table from per-section tables; a key in two sections keeps the later entry."""
+    merged: Dict[str, List[str]] = {}
+    for symptoms in sections.values():
+        merged.update(symptoms)
+    return merged
 
 # -----------------------------------------------------------------------------
 # 3. LOGIC ENGINE
 # -----------------------------------------------------------------------------
+@dataclass(frozen=True)
+class NoteResult:
+    """Compact per-note result of a batch run; every field holds integer IDs."""
+    symptoms: Tuple[int, ...]
+    etiologies: Tuple[int, ...]
+    treatments: Tuple[int, ...]
+    alerts: Tuple[int, ...]
+
+@dataclass
+class BatchReport:
+    """Output of ClinicalEngine.analyze_batch plus its throughput."""
+    notes: int
+    seconds: float
+    results: Optional[List[NoteResult]] = None
+    counts: Optional[Dict[str, List[int]]] = None
+
+    @property
+    def notes_per_second(self) -> float:
+        return self.notes / self.seconds if self.seconds > 0 else float("inf")
+
+class LatencyHistogram:
+    """
+    Fixed-size latency histogram with log-spaced buckets (1 us .. ~100 s).
+    Memory stays constant however many samples are observed.
+    """
+
+    BOUNDS: Tuple[float, ...] = tuple(1e-6 * 2 ** (i / 4) for i in range(108))
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        # Binary search over the bounds runs in C: about half the cost of
+        # computing the bucket with math.log2, which matters for EngineMetrics.
+        self.buckets[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "LatencyHistogram"):
+        for idx, n in enumerate(other.buckets):
+            self.buckets[idx] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (0-100)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for idx, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(self.BOUNDS[idx], self.max) if idx < len(self.BOUNDS) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+def normalize_note(text: str) -> str:
+    """Canonical form used for matching; its digest keys the result cache."""
+    return " ".join(text.lower().replace("\u2019", "'").split())
+
+def note_digest(normalized: str) -> str:
+    """Fixed-size (128-bit) digest of a normalized note, so cache keys never hold note text."""
+    import hashlib
+
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+class ResultCache:
+    """
+    Bounded, thread-safe LRU cache of analysis results keyed on a digest of
+    the normalized note (see note_digest()), so each entry costs the same
+    however long the note. Entries belong to one KB version; asking with a
+    different version drops everything first.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version: Optional[str] = None
+        self._entries: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, version: str, key: str) -> Optional[object]:
+        with self._lock:
+            if version != self.version:
+                self._reset(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires and expires < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, version: str, key: str, value: object):
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl > 0 else 0.0
+        with self._lock:
+            if version != self.version:
+                self._reset(version)
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _reset(self, version: str):
+        if self.version is not None:
+            self.invalidations += 1
+        self._entries.clear()
+        self.version = version
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+def decode_bits(mask: int) -> Tuple[int, ...]:
+    """Positions of the set bits in mask, ascending."""
+    # bin() and str.find run in C, so cost scales with the set bits found
+    # rather than with per-bit Python arithmetic.
+    bits = bin(mask)[:1:-1]
+    ids = []
+    i = bits.find("1")
+    while i >= 0:
+        ids.append(i)
+        i = bits.find("1", i + 1)
+    return tuple(ids)
+
+class StageTimings:
+    """
+    Per-stage latency histograms for one process (normalize, cache, match,
+    assemble, rank, spelling, render, ux_delay, request, etiology_lookup).
+    Safe to share between threads.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """{stage: {count, mean, p50, p95, p99, max}} with times in seconds."""
+        with self._lock:
+            return {stage: h.summary() for stage, h in self._histograms.items()}
+
+class EngineMetrics:
+    """
+    Opt-in operational counters for one engine (AppConfig.METRICS): analyzed
+    notes with their latency, and hits per symptom and per alert key indexed
+    by the engine's interned IDs. Recording is one histogram observe plus a
+    list increment per matched key, without a lock (a racing increment can
+    rarely be lost), so each stays under a microsecond; key names are only
+    attached when the metrics are rendered.
+
+    Built with the engine it replaces (`previous`), it shares that
+    engine's latency histogram and keeps reading its counters, so totals
+    stay monotonic across KB hot reloads. Counters from older versions
+    are summed by key name.
+    """
+
+    def __init__(self, symptom_keys: Tuple[str, ...], alert_keys: Tuple[str, ...],
+                 previous: Optional["EngineMetrics"] = None):
+        self.symptom_keys = symptom_keys
+        self.alert_keys = alert_keys
+        self.symptom_hits = [0] * len(symptom_keys)
+        self.alert_hits = [0] * len(alert_keys)
+        self.latency = previous.latency if previous is not None else LatencyHistogram()
+        # The previous engine may still finish requests, so its lists stay
+        # live; anything older is folded into `_carried` and let go.
+        self._previous = previous
+        self._carried: Tuple[Dict[str, int], Dict[str, int]] = ({}, {})
+        if previous is not None:
+            self._carried = previous.totals(own=False)
+            previous._carried, previous._previous = self._carried, None
+
+    def observe(self, result: "NoteResult", seconds: float):
+        self.latency.observe(seconds)
+        hits = self.symptom_hits
+        for sid in result.symptoms:
+            hits[sid] += 1
+        hits = self.alert_hits
+        for aid in result.alerts:
+            hits[aid] += 1
+
+    def totals(self, own: bool = True) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """(symptom hits, alert hits) by key name, across KB versions."""
+        symptoms, alerts = dict(self._carried[0]), dict(self._carried[1])
+        for metrics in (self._previous, self if own else None):
+            if metrics is None:
+                continue
+            for out, keys, hits in ((symptoms, metrics.symptom_keys, metrics.symptom_hits),
+                                    (alerts, metrics.alert_keys, metrics.alert_hits)):
+                for key, n in zip(keys, hits):
+                    if n:
+                        out[key] = out.get(key, 0) + n
+        return symptoms, alerts
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of lowercase keywords.
+    Built once, then finds every keyword occurring anywhere in a text
+    (same semantics as `key in text`) in a single left-to-right pass.
+    """
+
+    def __init__(self, keywords: List[str]):
+        self.keywords: List[str] = list(keywords)
+        # State 0 is the root; goto[s] maps a character to the next state.
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[Tuple[int, ...]] = [()]
+
+        terminals: Dict[int, List[int]] = {}
+        for idx, word in enumerate(self.keywords):
+            state = 0
+            for ch in word:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                state = nxt
+            terminals.setdefault(state, []).append(idx)
+        for state, ids in terminals.items():
+            self.output[state] = tuple(ids)
+
+        # Breadth-first pass to wire failure links and merge outputs.
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                if self.output[self.fail[nxt]]:
+                    self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def find(self, text: str) -> Set[int]:
+        """Returns the indices (into `keywords`) of every keyword found in text."""
+        goto, fail, output = self.goto, self.fail, self.output
+        found: Set[int] = set()
+        state = 0
+        for ch in text:
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            # Child states are never 0, so a miss at the root falls back to it.
+            state = nxt or 0
+            if output[state]:
+                found.update(output[state])
+        return found
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+def tokenize(text: str) -> List[str]:
+    """Word tokens of lowercased text; punctuation and spacing are boundaries."""
+    return TOKEN_PATTERN.findall(text)
+
+class TokenTrie:
+    """
+    Trie keyed on token IDs. Keywords only match as whole-word sequences, and
+    a scan walks each start position at most as deep as the longest keyword,
+    so cost is linear in the number of note tokens.
+
+    In longest mode a match of a `covers` keyword hides the matches of
+    `coverable` keywords strictly inside it (both default to every keyword),
+    so callers can keep some kinds of keyword from ever hiding or being
+    hidden.
+    """
+
+    def __init__(self, keywords: List[str], tokenized: Optional[Dict[str, Tuple[str, ...]]] = None,
+                 covers: Optional[List[bool]] = None, coverable: Optional[List[bool]] = None):
+        self.keywords: List[str] = list(keywords)
+        self.vocab: Dict[str, int] = {}
+        self.children: List[Dict[int, int]] = [{}]
+        self.terminal: List[Tuple[int, ...]] = [()]
+        tokenized = tokenized or {}
+        covers = covers if covers is not None else [True] * len(self.keywords)
+        coverable = coverable if coverable is not None else [True] * len(self.keywords)
+
+        for idx, word in enumerate(self.keywords):
+            state = 0
+            tokens = tokenized.get(word)
+            for token in tokenize(word) if tokens is None else tokens:
+                tid = self.vocab.setdefault(token, len(self.vocab))
+                nxt = self.children[state].get(tid)
+                if nxt is None:
+                    nxt = len(self.children)
+                    self.children[state][tid] = nxt
+                    self.children.append({})
+                    self.terminal.append(())
+                state = nxt
+            if state:
+                self.terminal[state] = self.terminal[state] + (idx,)
+        # Per state: whether its match hides nested ones, and which of its
+        # keywords survive when it is itself hidden
+        self.covering: List[bool] = [any(covers[i] for i in t) for t in self.terminal]
+        self.uncovered: List[Tuple[int, ...]] = [tuple(i for i in t if not coverable[i]) for t in self.terminal]
+
+    def encode(self, text: str) -> List[int]:
+        """Token IDs of text; words outside the keyword vocabulary become -1."""
+        vocab = self.vocab
+        return [vocab.get(token, -1) for token in tokenize(text)]
+
+    def scan(self, ids: List[int], longest: bool = True) -> List[Tuple[int, int, Tuple[int, ...]]]:
+        """
+        Returns (start, end, keyword indices) token spans in note order. With
+        longest=True a keyword strictly inside a longer covering match is
+        dropped ("high fever" hides "fever"); everything else is kept, even
+        where spans overlap.
+        """
+        children, terminal = self.children, self.terminal
+        covering, uncovered = self.covering, self.uncovered
+        spans = []
+        reach = 0  # furthest end of a covering match that started earlier
+        for i in range(len(ids)):
+            state = children[0].get(ids[i])
+            if state is None:
+                continue
+            j = i + 1
+            found = []
+            widest = 0  # end of the longest covering match starting here
+            while True:
+                if terminal[state]:
+                    found.append((j, state))
+                    if covering[state]:
+                        widest = j
+                state = children[state].get(ids[j]) if j < len(ids) else None
+                if state is None:
+                    break
+                j += 1
+            for end, state in found:
+                idxs = terminal[state]
+                if longest and (reach >= end or widest > end):
+                    idxs = uncovered[state]
+                    if not idxs:
+                        continue
+                spans.append((i, end, idxs))
+            if widest > reach:
+                reach = widest
+        return spans
+
+    def find(self, text: str, longest: bool = True) -> Set[int]:
+        """Indices (into `keywords`) of every keyword matched in text."""
+        found: Set[int] = set()
+        for _, _, idxs in self.scan(self.encode(text), longest):
+            found.update(idxs)
+        return found
+
+def osa_distance(a: str, b: str) -> int:
+    """Optimal string alignment distance (Levenshtein plus adjacent swaps)."""
+    # Typos rarely touch both ends; trimming the shared prefix and suffix
+    # leaves a tiny table for the quadratic part.
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not a or not b:
+        return len(a) + len(b)
+    prev2: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[-1]
+
+class SpellingIndex:
+    """
+    SymSpell-style deletion index over the keyword vocabulary. Every word's
+    deletions (up to max_distance) are precomputed, so correcting a token only
+    generates the token's own deletions and verifies the few candidates they
+    hit: constant time per token regardless of vocabulary size.
+    """
+
+    # Everyday words one or two edits away from a vocabulary word
+    # ("never"/fever, "less"/legs, "heart"/heat, "like"/life ...).
+    COMMON_WORDS = frozenset("""
+        also back bring cause days does done down each even ever fall feel feels fell felt fine
+        food from gold good hand have hear heard heart hold hour into just kind know last less
+        lift like line lose lost lots made make many mine more most much near need never next
+        none note once only over past rest ring said same seen sent side since site some soon
+        spent spot still such sure take tell than that them then they this told took tree very
+        wake want well went were what when will wine wish with word work year your
+    """.split())
+
+    def __init__(self, words: Iterable[str], max_distance: int = 2, min_length: int = 4,
+                 known: Iterable[Dict[str, Tuple[str, ...]]] = ()):
+        """
+        `known` holds precomputed {word: deletion variants} parts, built with
+        word_variants() and the same max_distance; their words are merged
+        instead of having their deletions generated again.
+        """
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.words: Tuple[str, ...] = tuple(sorted({w for w in words if self.indexable(w, min_length)}))
+        wid = {word: i for i, word in enumerate(self.words)}
+        buckets: Dict[str, List[int]] = {}
+        done: Set[str] = set()
+        for part in known:
+            for word, variants in part.items():
+                if word in done or word not in wid:
+                    continue
+                done.add(word)
+                i = wid[word]
+                for variant in variants:
+                    bucket = buckets.get(variant)
+                    if bucket is None:
+                        buckets[variant] = [i]
+                    else:
+                        bucket.append(i)
+        rest = [w for w in self.words if w not in done]
+        for word, variants in self.word_variants(rest, max_distance).items():
+            i = wid[word]
+            for variant in variants:
+                buckets.setdefault(variant, []).append(i)
+        self.deletes: Dict[str, Tuple[int, ...]] = {k: tuple(v) for k, v in buckets.items()}
+        # Token -> correction memo; note vocabulary repeats heavily across notes
+        self._memo: Dict[str, Optional[Tuple[str, int]]] = {}
+
+    @classmethod
+    def word_variants(cls, words: Iterable[str], max_distance: int = 2) -> Dict[str, Tuple[str, ...]]:
+        """{word: its deletion variants} for already-filtered words."""
+        return {word: tuple(cls._variants(word, max_distance)) for word in words}
+
+    @staticmethod
+    def indexable(word: str, min_length: int = 4) -> bool:
+        """Whether a vocabulary word is indexed: long enough and letters only."""
+        return len(word) >= min_length and word.isalpha()
+
+    @staticmethod
+    def _variants(word: str, depth: int) -> Set[str]:
+        """word plus every string reachable by deleting up to `depth` letters."""
+        found = {word}
+        frontier = {word}
+        for _ in range(depth):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w)) if len(w) > 1}
+            found |= frontier
+        return found
+
+    def allowed_distance(self, token: str) -> int:
+        """Edits tolerated for a token: none below min_length, 1 up to 5 letters, then 2."""
+        if len(token) < self.min_length:
+            return 0
+        return min(self.max_distance, 1 if len(token) <= 5 else 2)
+
+    def correct(self, token: str) -> Optional[Tuple[str, int]]:
+        """Closest vocabulary word and its distance, or None (ties: alphabetical)."""
+        try:
+            return self._memo[token]
+        except KeyError:
+            pass
+        if len(self._memo) >= 65536:
+            self._memo.clear()
+        hit = self._memo[token] = self._correct(token)
+        return hit
+
+    def _correct(self, token: str) -> Optional[Tuple[str, int]]:
+        limit = self.allowed_distance(token)
+        if not limit or not token.isalpha() or token in self.COMMON_WORDS:
+            return None
+        candidates: Set[int] = set()
+        for variant in self._variants(token, limit):
+            candidates.update(self.deletes.get(variant, ()))
+        best: Optional[Tuple[int, str]] = None
+        for wid in candidates:
+            word = self.words[wid]
+            if abs(len(word) - len(token)) > limit:
+                continue
+            distance = osa_distance(token, word)
+            if 0 < distance <= limit and (best is None or (distance, word) < best):
+                best = (distance, word)
+        return (best[1], best[0]) if best else None
+
+@dataclass(frozen=True)
+class TermMatch:
+    """A canonical SYMPTOMS/ALERTS key and the text in the note that matched it."""
+    key: str
+    surface: str
+
+@dataclass(frozen=True)
+class CorrectedMatch:
+    """A keyword found only after spelling correction, with the text that was typed."""
+    key: str
+    surface: str
+    distance: int
+
+@dataclass(frozen=True)
+class EtiologyProfile:
+    """Reverse-index view of one etiology: what presents with it, what treats it."""
+    name: str
+    symptoms: Tuple[str, ...]
+    alerts: Tuple[str, ...]
+    treatments: Tuple[str, ...]
+
+@dataclass(frozen=True)
+class RankedEtiology:
+    """An etiology scored by the (weighted) count of matched symptoms pointing to it."""
+    name: str
+    score: float
+    symptoms: Tuple[str, ...]
+
+class NameSearchIndex:
+    """
+    Word-prefix search over a fixed list of names. Each word maps to a bitset
+    of name IDs; a query ORs the masks of words sharing each prefix and ANDs
+    across query words. Masks for 1-2 letter prefixes are precomputed so
+    short queries never OR thousands of words at request time.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        word_mask: Dict[str, int] = {}
+        for nid, name in enumerate(names):
+            for word in set(tokenize(name.lower())):
+                word_mask[word] = word_mask.get(word, 0) | (1 << nid)
+        self.words: List[str] = sorted(word_mask)
+        self.masks: List[int] = [word_mask[w] for w in self.words]
+        self.short: Dict[str, int] = {}
+        for word, mask in zip(self.words, self.masks):
+            for n in (1, 2):
+                if len(word) >= n:
+                    self.short[word[:n]] = self.short.get(word[:n], 0) | mask
+
+    def prefix_mask(self, prefix: str) -> int:
+        if len(prefix) <= 2:
+            return self.short.get(prefix, 0)
+        lo = bisect.bisect_left(self.words, prefix)
+        hi = bisect.bisect_left(self.words, prefix + "\uffff", lo)
+        mask = 0
+        for i in range(lo, hi):
+            mask |= self.masks[i]
+        return mask
+
+    def search(self, query: str) -> int:
+        """Bitset of names having a word starting with every query word."""
+        words = tokenize(query.lower())
+        if not words:
+            return 0
+        mask = -1
+        for word in words:
+            mask &= self.prefix_mask(word)
+            if not mask:
+                break
+        return mask
+
+class IncidenceMatrix:
+    """
+    Sparse symptom x etiology incidence matrix in CSR form: row s holds the
+    etiology IDs caused by symptom s. Stored as plain lists so it pickles
+    into the KB snapshot. The SciPy copy is built on first use only (SciPy
+    takes ~0.3 s to import); without SciPy the products run in Python.
+    """
+
+    def __init__(self, rows: Iterable[Iterable[int]], n_cols: int):
+        self.indptr: List[int] = [0]
+        self.indices: List[int] = []
+        for row in rows:
+            self.indices.extend(row)
+            self.indptr.append(len(self.indices))
+        self.shape = (len(self.indptr) - 1, n_cols)
+        self._csr = None
+
+    def __getstate__(self) -> Dict[str, object]:
+        state = dict(self.__dict__)
+        state["_csr"] = None
+        return state
+
+    def row(self, i: int) -> List[int]:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def csr(self):
+        """scipy.sparse CSR copy, or None when NumPy/SciPy are not installed."""
+        if self._csr is None:
+            try:
+                import numpy as np
+                from scipy import sparse
+            except ImportError:
+                self._csr = False
+            else:
+                data = np.ones(len(self.indices), dtype=np.float64)
+                self._csr = sparse.csr_matrix(
+                    (data, np.asarray(self.indices, dtype=np.int32), np.asarray(self.indptr, dtype=np.int32)),
+                    shape=self.shape,
+                )
+        return self._csr if self._csr is not False else None
+
+    def products(self, notes: List[Dict[int, float]], backend: str = "auto") -> List[Dict[int, float]]:
+        """
+        Rows of W @ A, where row n of W maps symptom ID -> weight for note n:
+        one {etiology ID: score} dict per note, nonzero scores only. The
+        SciPy backend does the whole batch as a single sparse product.
+        """
+        if backend not in ("auto", "scipy", "python"):
+            raise ValueError(f"unknown rank backend {backend!r}; expected auto, scipy or python")
+        csr = None
+        if backend == "scipy" or (backend == "auto" and len(notes) > 1):
+            csr = self.csr()
+            if csr is None and backend == "scipy":
+                raise RuntimeError("rank backend 'scipy' requires numpy and scipy")
+        if csr is not None:
+            import numpy as np
+            from scipy import sparse
+
+            indptr = np.zeros(len(notes) + 1, dtype=np.int64)
+            indptr[1:] = np.cumsum([len(n) for n in notes])
+            cols = np.fromiter((s for n in notes for s in n), dtype=np.int32, count=int(indptr[-1]))
+            vals = np.fromiter((w for n in notes for w in n.values()), dtype=np.float64, count=int(indptr[-1]))
+            weights = sparse.csr_matrix((vals, cols, indptr), shape=(len(notes), self.shape[0]))
+            scores = (weights @ csr).tocsr()
+            out = []
+            for i in range(len(notes)):
+                lo, hi = scores.indptr[i], scores.indptr[i + 1]
+                out.append(dict(zip(scores.indices[lo:hi].tolist(), scores.data[lo:hi].tolist())))
+            return out
+
+        indptr, indices = self.indptr, self.indices
+        out = []
+        for note in notes:
+            scores: Dict[int, float] = {}
+            for sid, weight in note.items():
+                for eid in indices[indptr[sid]:indptr[sid + 1]]:
+                    scores[eid] = scores.get(eid, 0.0) + weight
+            out.append(scores)
+        return out
+
+@dataclass(frozen=True)
+class CompiledSection:
+    """
+    One KB section compiled on its own: its tokenized keys and the spelling
+    deletion variants of their words. Reused as long as `digest` (a hash of the
+    section's symptom table) is unchanged.
+    """
+    name: str
+    digest: str
+    keys: Tuple[str, ...]
+    tokens: Tuple[Tuple[str, ...], ...]
+    variants: Dict[str, Tuple[str, ...]]
+    seconds: float
+
+def section_digest(symptoms: Dict[str, List[str]]) -> str:
+    """Content hash of one section's symptom table (order-sensitive, like the matcher)."""
+    import hashlib
+    import json
+
+    return hashlib.sha256(json.dumps(symptoms).encode("utf-8")).hexdigest()[:16]
+
+def compile_section(name: str, symptoms: Dict[str, List[str]], digest: Optional[str] = None) -> CompiledSection:
+    """Builds the section-local parts of the match index for one section."""
+    started = time.perf_counter()
+    keys = tuple(k for k in symptoms if k == k.lower())
+    tokens = tuple(tuple(tokenize(k)) for k in keys)
+    words = sorted({t for ts in tokens for t in ts if SpellingIndex.indexable(t)})
+    return CompiledSection(
+        name=name,
+        digest=digest or section_digest(symptoms),
+        keys=keys,
+        tokens=tokens,
+        variants=SpellingIndex.word_variants(words),
+        seconds=time.perf_counter() - started,
+    )
+
+class ScopedIndex:
+    """
+    Match index over a subset of KB sections plus every alert key (alerts are
+    always on, but add no symptoms from outside the sections). Trie entries
+    point back at the engine's own entries, so a scoped scan yields the
+    same IDs as a full one and the engine's decode, rank and caching apply
+    unchanged. The substring automaton is built on first use, as in the
+    full engine.
+    """
+
+    def __init__(self, sections: Tuple[str, ...], keywords: List[str], entries: List[str],
+                 entry_ids: List[int], tokenized: Dict[str, Tuple[str, ...]], symptoms: FrozenSet[int],
+                 nesting: Tuple[List[bool], List[bool]]):
+        started = time.perf_counter()
+        self.sections = sections
+        self.key = "|".join(sections)
+        # Engine symptom IDs of the chosen sections. Alert keys that are also
+        # symptoms elsewhere match for their alert only.
+        self.symptoms = symptoms
+        # Engine entry per scoped entry; `entries` start with `keywords`, and
+        # engine entries likewise start with its keywords, so the first
+        # len(keywords) IDs also translate substring matches.
+        self.entry_ids = entry_ids
+        self.keyword_ids = entry_ids[:len(keywords)]
+        self._keywords = keywords
+        self._substring_matcher: Optional[KeywordMatcher] = None
+        self.trie = TokenTrie(entries, tokenized, *nesting)
+        self.build_seconds = time.perf_counter() - started
+
+    @property
+    def matcher(self) -> KeywordMatcher:
+        if self._substring_matcher is None:
+            self._substring_matcher = KeywordMatcher(self._keywords)
+        return self._substring_matcher
+
+    def match(self, normalized: str, mode: str) -> Set[int]:
+        """Engine entry indices matched in a normalized note."""
+        if mode == "substring":
+            ids = self.keyword_ids
+            return {ids[i] for i in self.matcher.find(normalized)}
+        ids = self.entry_ids
+        return {ids[i] for i in self.trie.find(normalized, longest=mode == "longest")}
+
+MATCH_MODES = ("longest", "overlap", "substring")
+
 class ClinicalEngine:
-    """Handles logic for symptom analysis and triage."""
+    """
+    Handles logic for symptom analysis and triage.
+    Read-only after construction (the result cache locks internally), so one
+    instance can be shared by every session and thread in the process.
+    """
     
-    def __init__(self, data: ClinicalData):
+    def __init__(self, data: ClinicalData, cache: Optional[ResultCache] = None,
+                 sections: Optional[List[CompiledSection]] = None):
+        """
+        `sections` are data.SECTIONS already compiled (see KBCompiler); any
+        missing are compiled here. The combined index is merged from them.
+        """
+        started = time.perf_counter()
         self.data = data
+        compiled = {c.name: c for c in sections or ()}
+        self.sections: Tuple[CompiledSection, ...] = tuple(
+            compiled.get(name) or compile_section(name, table) for name, table in data.SECTIONS.items()
+        )
+        self.kb_version = data.version({c.name: c.digest for c in self.sections})
+        self.cache = cache if cache is not None else ResultCache(AppConfig.RESULT_CACHE_SIZE, AppConfig.RESULT_CACHE_TTL)
+        self.timings = StageTimings()
+        tokenized = {k: t for c in self.sections for k, t in zip(c.keys, c.tokens)}
 
-    def analyze(self, text: str) -> Tuple[List[str], List[str], List[str], List[str]]:
-        text_lower = text.lower()
-        
-        detected_symptoms = []
-        etiologies = set()
-        alerts = []
-        treatments = []
-
-        # Check for Critical Alerts
-        for key, msg in self.data.ALERTS.items():
-            if key in text_lower:
-                alerts.append(msg)
-
-        # Check for General Symptoms & Etiologies
-        for symptom, causes in self.data.SYMPTOMS.items():
-            if symptom in text_lower:
-                detected_symptoms.append(symptom)
-                etiologies.update(causes)
-                
-                # Check for Meds
-                if symptom in self.data.MEDS:
-                    treatments.append(f"**{symptom.title()}**: {self.data.MEDS[symptom]}")
-
-        return (detected_symptoms, sorted(list(etiologies)), treatments, alerts)
+        # Keys are matched against lowercased text, so keys with capitals
+        # could never match. The legacy substring automaton is built on first
+        # use only: it cannot be merged per section and is the slowest part.
+        self._alert_keys = [k for k in data.ALERTS if k == k.lower()]
+        self._symptom_keys = [k for k in data.SYMPTOMS if k == k.lower()]
+        keywords = list(dict.fromkeys(self._alert_keys + self._symptom_keys))
+        self._keywords = keywords
+        self._substring_matcher: Optional[KeywordMatcher] = None
+        # Section-scoped indexes, built per distinct section set on first use
+        self._scopes: Dict[Tuple[str, ...], ScopedIndex] = {}
+
+        # Aliases become extra trie entries pointing at their canonical key,
+        # so any number of them costs no extra pass over the note. The raw
+        # substring matcher keeps canonical keys only: short abbreviations
+        # ("cp", "sob") would fire inside ordinary words there. Aliases only
+        # ever stand for symptoms; alerts need the key itself to be written.
+        keyword_pos = {k: i for i, k in enumerate(keywords)}
+        symptom_set = set(self._symptom_keys)
+        entries = list(keywords)
+        self._canonical = list(range(len(keywords)))
+        for surface, targets in (data.ALIASES or {}).items():
+            for target in targets:
+                if target in symptom_set and tokenize(normalize_note(surface)):
+                    entries.append(normalize_note(surface))
+                    self._canonical.append(keyword_pos[target])
+
+        # Per trie entry: dict-order position among alerts / symptoms (or -1).
+        alert_pos = {k: i for i, k in enumerate(self._alert_keys)}
+        symptom_pos = {k: i for i, k in enumerate(self._symptom_keys)}
+        self._alert_slot = [alert_pos.get(keywords[c], -1) if i < len(keywords) else -1
+                            for i, c in enumerate(self._canonical)]
+        self._symptom_slot = [symptom_pos.get(keywords[c], -1) for c in self._canonical]
+
+        self._token_trie = TokenTrie(entries, tokenized, *self._nesting(range(len(entries))))
+        self._spelling = SpellingIndex(self._token_trie.vocab, known=(c.variants for c in self.sections))
+
+        # Read-only views of the KB
+        self._alerts = MappingProxyType(dict(data.ALERTS))
+        self._meds = MappingProxyType(dict(data.MEDS))
+
+        # Intern symptoms, alerts, treatments and etiologies to dense integer
+        # IDs. Etiology IDs follow alphabetical order, so ascending IDs decode
+        # straight into sorted names without any string sorting per call.
+        self.alert_keys: Tuple[str, ...] = tuple(self._alert_keys)
+        self.symptom_keys: Tuple[str, ...] = tuple(self._symptom_keys)
+        self.etiology_names: Tuple[str, ...] = tuple(
+            sorted({c for k in self._symptom_keys for c in data.SYMPTOMS[k]})
+        )
+        self.treatment_keys: Tuple[str, ...] = tuple(k for k in self._symptom_keys if k in data.MEDS)
+        etiology_id = {name: i for i, name in enumerate(self.etiology_names)}
+        treatment_id = {k: i for i, k in enumerate(self.treatment_keys)}
+        self._symptom_treatment = [treatment_id.get(k, -1) for k in self._symptom_keys]
+
+        # Each symptom's causes as a bitset (bit i = etiology ID i); a note's
+        # differential is the OR of its symptoms' masks.
+        self._symptom_cause_mask = [
+            sum(1 << etiology_id[c] for c in set(data.SYMPTOMS[k])) for k in self._symptom_keys
+        ]
+
+        # Display strings assembled once instead of per result
+        self._alert_text = tuple(self._alerts[k] for k in self.alert_keys)
+        self._treatment_text = tuple(f"**{k.title()}**: {self._meds[k]}" for k in self.treatment_keys)
+
+        # Reverse indexes: etiology -> presenting symptoms / treatments
+        etiology_symptoms: List[List[int]] = [[] for _ in self.etiology_names]
+        for sid, key in enumerate(self._symptom_keys):
+            for name in dict.fromkeys(data.SYMPTOMS[key]):
+                etiology_symptoms[etiology_id[name]].append(sid)
+        self._etiology_symptoms = [tuple(sids) for sids in etiology_symptoms]
+        self._etiology_treatments = [
+            tuple(self._symptom_treatment[sid] for sid in sids if self._symptom_treatment[sid] >= 0)
+            for sids in self._etiology_symptoms
+        ]
+        self._etiology_id = {name.lower(): i for i, name in enumerate(self.etiology_names)}
+        self._etiology_search = NameSearchIndex(self.etiology_names)
+
+        # Symptom x etiology incidence for ranking: scores = weights @ A
+        self._incidence = IncidenceMatrix(
+            (sorted({etiology_id[c] for c in data.SYMPTOMS[k]}) for k in self._symptom_keys),
+            len(self.etiology_names),
+        )
+
+        self.metrics = EngineMetrics(self.symptom_keys, self.alert_keys) if AppConfig.METRICS else None
+        self.origin = "source"
+        self.built_at = time.time()
+        self.build_seconds = time.perf_counter() - started
+
+    @property
+    def _matcher(self) -> KeywordMatcher:
+        """Aho-Corasick automaton for substring mode (racing builds are identical)."""
+        if self._substring_matcher is None:
+            self._substring_matcher = KeywordMatcher(self._keywords)
+        return self._substring_matcher
+
+    def __getstate__(self) -> Dict[str, object]:
+        # Read-only views cannot be pickled; store their dicts and re-wrap.
+        # The result cache and timings are per process and never persisted.
+        state = dict(self.__dict__)
+        state["cache"] = None
+        state["timings"] = None
+        state["_scopes"] = {}
+        state["metrics"] = None
+        state["_proxies"] = [k for k, v in state.items() if isinstance(v, MappingProxyType)]
+        for key in state["_proxies"]:
+            state[key] = dict(state[key])
+        return state
+
+    def __setstate__(self, state: Dict[str, object]):
+        for key in state.pop("_proxies", ()):
+            state[key] = MappingProxyType(state[key])
+        self.__dict__.update(state)
+        self.cache = ResultCache(AppConfig.RESULT_CACHE_SIZE, AppConfig.RESULT_CACHE_TTL)
+        self.timings = StageTimings()
+        self.metrics = EngineMetrics(self.symptom_keys, self.alert_keys) if AppConfig.METRICS else None
+
+    def scope(self, sections: Optional[Iterable[str]]) -> Optional[ScopedIndex]:
+        """
+        The index for a set of section names (case-insensitive), or None for
+        the whole KB. An empty set still matches alerts. Each distinct set is
+        compiled once per engine and kept; unknown names raise ValueError.
+        """
+        if sections is None:
+            return None
+        if isinstance(sections, str):
+            sections = [sections]
+        names = {c.name.lower(): c.name for c in self.sections}
+        wanted = {names.get(str(name).strip().lower(), str(name)) for name in sections}
+        unknown = sorted(name for name in wanted if name not in self.data.SECTIONS)
+        if unknown:
+            raise ValueError(f"unknown section(s): {', '.join(unknown)}")
+        key = tuple(c.name for c in self.sections if c.name in wanted)
+        index = self._scopes.get(key)
+        if index is None:
+            index = self._build_scope(key)
+            if len(self._scopes) >= AppConfig.SCOPE_CACHE_SIZE:
+                self._scopes.pop(next(iter(self._scopes), None), None)
+            self._scopes[key] = index
+        return index
+
+    def _nesting(self, entry_ids: Iterable[int],
+                 symptoms: Optional[FrozenSet[int]] = None) -> Tuple[List[bool], List[bool]]:
+        """
+        TokenTrie `covers` / `coverable` flags for engine entries: in longest
+        mode a symptom phrase (of `symptoms`, if given) hides symptoms nested
+        in it ("high fever" / "fever"), but an alert key is never hidden and
+        an alert-only phrase ("worst headache of life") hides nothing.
+        """
+        alert_slot, symptom_slot = self._alert_slot, self._symptom_slot
+        entry_ids = list(entry_ids)
+        covers = [symptom_slot[i] >= 0 and (symptoms is None or symptom_slot[i] in symptoms) for i in entry_ids]
+        return covers, [symptom_slot[i] >= 0 and alert_slot[i] < 0 for i in entry_ids]
+
+    def _build_scope(self, key: Tuple[str, ...]) -> ScopedIndex:
+        # Reuses the sections' compiled tokens; alert keys and aliases of
+        # in-scope keys are the only entries tokenized here.
+        chosen = [c for c in self.sections if c.name in key]
+        tokenized = {k: t for c in chosen for k, t in zip(c.keys, c.tokens)}
+        keep = set(self._alert_keys).union(tokenized)
+        keywords, canonical = self._keywords, self._canonical
+        keyword_ids = [i for i, k in enumerate(keywords) if k in keep]
+        alias_ids = [i for i in range(len(keywords), len(canonical)) if keywords[canonical[i]] in keep]
+        entries = self._token_trie.keywords
+        entry_ids = keyword_ids + alias_ids
+        symptoms = frozenset(sid for sid, k in enumerate(self._symptom_keys) if k in tokenized)
+        return ScopedIndex(
+            key, [keywords[i] for i in keyword_ids], [entries[i] for i in entry_ids],
+            entry_ids, tokenized, symptoms, self._nesting(entry_ids, symptoms),
+        )
+
+    def analyze(self, text: str, mode: Optional[str] = None, top_k: Optional[int] = None,
+                sections: Optional[Iterable[str]] = None) -> Tuple[List[str], List[str], List[str], List[str]]:
+        """
+        Symptoms, etiologies, treatments and alerts for a note. Etiologies are
+        the alphabetical union, or with `top_k` only the k highest-ranked
+        names in rank order (see rank_etiologies()). `sections` limits the
+        symptom scan to those KB sections; alerts are always checked.
+        """
+        result = self.lookup(text, mode, sections)
+        started = time.perf_counter()
+        symptoms, etiologies, treatments, alerts = self.decode(result, etiologies=top_k is None)
+        if top_k is not None:
+            etiologies = [r.name for r in self.rank_results([result], limit=top_k)[0]]
+        self.timings.record("assemble", time.perf_counter() - started)
+        return symptoms, etiologies, treatments, alerts
+
+    def lookup(self, text: str, mode: Optional[str] = None,
+               sections: Optional[Iterable[str]] = None) -> NoteResult:
+        """Cached analyze_ids() on the normalized note, timed per stage."""
+        mode = mode or AppConfig.MATCH_MODE
+        scope = self.scope(sections)
+        record = self.timings.record
+        t0 = time.perf_counter()
+        normalized = normalize_note(text)
+        digest = note_digest(normalized)
+        key = f"{mode}:{digest}" if scope is None else f"{mode}:{scope.key}:{digest}"
+        t1 = time.perf_counter()
+        result = self.cache.get(self.kb_version, key)
+        t2 = time.perf_counter()
+        record("normalize", t1 - t0)
+        record("cache", t2 - t1)
+        if result is None:
+            result = self.analyze_ids(normalized, mode, scope)
+            self.cache.put(self.kb_version, key, result)
+            record("match", time.perf_counter() - t2)
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.observe(result, time.perf_counter() - t0)
+        return result
+
+    def match(self, normalized: str, mode: Optional[str] = None, scope: Optional[ScopedIndex] = None) -> Set[int]:
+        """Keyword indices found in a normalized note using the given match mode."""
+        mode = mode or AppConfig.MATCH_MODE
+        if scope is not None and mode in MATCH_MODES:
+            return scope.match(normalized, mode)
+        if mode == "substring":
+            return self._matcher.find(normalized)
+        if mode in ("longest", "overlap"):
+            return self._token_trie.find(normalized, longest=mode == "longest")
+        raise ValueError(f"unknown match mode {mode!r}; expected one of {', '.join(MATCH_MODES)}")
+
+    def analyze_ids(self, normalized: str, mode: Optional[str] = None,
+                    scope: Optional[ScopedIndex] = None) -> NoteResult:
+        """
+        Matches one already-normalized note and returns integer IDs; `scope`
+        (from scope()) scans only its sections' keys plus the alerts.
+        """
+        found = self.match(normalized, mode, scope)
+        alert_slot, symptom_slot = self._alert_slot, self._symptom_slot
+        cause_mask, symptom_treatment = self._symptom_cause_mask, self._symptom_treatment
+
+        # Sets: several trie entries (a key and its aliases) share one slot
+        alert_ids = tuple(sorted({alert_slot[i] for i in found if alert_slot[i] >= 0}))
+        symptom_ids = tuple(sorted({symptom_slot[i] for i in found if symptom_slot[i] >= 0}))
+        if scope is not None:
+            symptom_ids = tuple(sid for sid in symptom_ids if sid in scope.symptoms)
+        mask = 0
+        for sid in symptom_ids:
+            mask |= cause_mask[sid]
+        return NoteResult(
+            symptoms=symptom_ids,
+            etiologies=decode_bits(mask),
+            treatments=tuple(symptom_treatment[sid] for sid in symptom_ids if symptom_treatment[sid] >= 0),
+            alerts=alert_ids,
+        )
+
+    def analyze_batch(self, texts: Iterable[str], aggregate: bool = False, mode: Optional[str] = None,
+                      sections: Optional[Iterable[str]] = None, dedupe: int = 0) -> BatchReport:
+        """
+        Analyzes many notes with the shared matcher and returns integer IDs
+        (see `symptom_keys`, `etiology_names`, `treatment_keys`, `alert_keys`).
+        With aggregate=True only per-ID hit counts across the batch are kept,
+        so memory does not grow with the input. `dedupe` > 0 remembers that
+        many recent distinct notes (LRU), so repeats such as templates and
+        re-submissions are analyzed once.
+        """
+        started = time.perf_counter()
+        scope = self.scope(sections)
+        analyze_ids = self.analyze_ids
+        results: List[NoteResult] = []
+        counts = {
+            "symptoms": [0] * len(self.symptom_keys),
+            "etiologies": [0] * len(self.etiology_names),
+            "treatments": [0] * len(self.treatment_keys),
+            "alerts": [0] * len(self.alert_keys),
+        }
+        seen = ResultCache(dedupe) if dedupe > 0 else None
+        notes = 0
+
+        for text in texts:
+            notes += 1
+            normalized = normalize_note(text)
+            key = note_digest(normalized) if seen is not None else ""
+            result = seen.get(self.kb_version, key) if seen is not None else None
+            if result is None:
+                result = analyze_ids(normalized, mode, scope)
+                if seen is not None:
+                    seen.put(self.kb_version, key, result)
+
+            if aggregate:
+                for field, tally in counts.items():
+                    for i in getattr(result, field):
+                        tally[i] += 1
+            else:
+                results.append(result)
+
+        return BatchReport(
+            notes=notes,
+            seconds=time.perf_counter() - started,
+            results=None if aggregate else results,
+            counts=counts if aggregate else None,
+        )
+
+    def terms(self, text: str, mode: Optional[str] = None,
+              sections: Optional[Iterable[str]] = None) -> List[TermMatch]:
+        """
+        Every match in note order as (canonical key, surface form), so aliases
+        such as "SOB" are reported next to "shortness of breath".
+        """
+        mode = mode or AppConfig.MATCH_MODE
+        scope = self.scope(sections)
+        normalized = normalize_note(text)
+        keywords = self._token_trie.keywords
+        if mode == "substring":
+            return [TermMatch(keywords[i], keywords[i]) for i in sorted(self.match(normalized, mode, scope))]
+        if mode not in MATCH_MODES:
+            raise ValueError(f"unknown match mode {mode!r}; expected one of {', '.join(MATCH_MODES)}")
+
+        trie = self._token_trie if scope is None else scope.trie
+        entry = range(len(keywords)) if scope is None else scope.entry_ids
+        tokens = list(TOKEN_PATTERN.finditer(normalized))
+        vocab = trie.vocab
+        ids = [vocab.get(m.group(), -1) for m in tokens]
+        out = []
+        for start, end, idxs in trie.scan(ids, longest=mode == "longest"):
+            surface = normalized[tokens[start].start():tokens[end - 1].end()]
+            for idx in idxs:
+                out.append(TermMatch(keywords[self._canonical[entry[idx]]], surface))
+        return out
+
+    def corrections(self, text: str, mode: Optional[str] = None,
+                    sections: Optional[Iterable[str]] = None) -> List[CorrectedMatch]:
+        """
+        Keywords that match only once misspelled words are corrected (edit
+        distance 1-2). Exact matches are never repeated here, and analyze()
+        results are unaffected; callers decide how to present these.
+        """
+        mode = mode or AppConfig.MATCH_MODE
+        scope = self.scope(sections)
+        normalized = normalize_note(text)
+        trie, spelling = self._token_trie, self._spelling
+        keywords = trie.keywords
+        entry = range(len(keywords)) if scope is None else scope.entry_ids
+        if scope is not None:
+            trie = scope.trie
+        tokens = list(TOKEN_PATTERN.finditer(normalized))
+        ids = [trie.vocab.get(m.group(), -1) for m in tokens]
+
+        fixed = list(ids)
+        distance: Dict[int, int] = {}
+        for pos, tid in enumerate(ids):
+            if tid >= 0:
+                continue
+            # Corrections use the whole vocabulary; words outside the scope are dropped
+            hit = spelling.correct(tokens[pos].group())
+            if hit is not None and hit[0] in trie.vocab:
+                fixed[pos] = trie.vocab[hit[0]]
+                distance[pos] = hit[1]
+        if not distance:
+            return []
+
+        longest = mode == "longest"
+        exact = {self._canonical[i] for i in self.match(normalized, mode, scope)}
+        seen: Set[int] = set()
+        out: List[CorrectedMatch] = []
+        for start, end, idxs in trie.scan(fixed, longest):
+            edits = sum(distance.get(p, 0) for p in range(start, end))
+            if not edits:
+                continue
+            surface = normalized[tokens[start].start():tokens[end - 1].end()]
+            for idx in idxs:
+                canonical = self._canonical[entry[idx]]
+                if canonical not in exact and canonical not in seen:
+                    seen.add(canonical)
+                    out.append(CorrectedMatch(key=keywords[canonical], surface=surface, distance=edits))
+        return out
+
+    def etiology_profile(self, name: str) -> Optional[EtiologyProfile]:
+        """Presenting symptoms, linked alerts and treatments for an etiology (case-insensitive)."""
+        eid = self._etiology_id.get(name.strip().lower())
+        if eid is None:
+            return None
+        symptoms = tuple(self.symptom_keys[sid] for sid in self._etiology_symptoms[eid])
+        return EtiologyProfile(
+            name=self.etiology_names[eid],
+            symptoms=symptoms,
+            alerts=tuple(s for s in symptoms if s in self._alerts),
+            treatments=tuple(self._treatment_text[tid] for tid in self._etiology_treatments[eid]),
+        )
+
+    def search_etiologies(self, query: str, limit: int = 20) -> List[str]:
+        """Etiology names (alphabetical) with a word starting with each query word."""
+        mask = self._etiology_search.search(query)
+        names = []
+        while mask and len(names) < limit:
+            low = mask & -mask
+            names.append(self.etiology_names[low.bit_length() - 1])
+            mask ^= low
+        return names
+
+    def rank_etiologies(self, text: str, weights: Optional[Dict[str, float]] = None, mode: Optional[str] = None,
+                        limit: Optional[int] = None, sections: Optional[Iterable[str]] = None) -> List[RankedEtiology]:
+        """
+        Differential ranked by the number of matched symptoms behind each
+        etiology. `weights` maps symptom keys to positive weights (default
+        1.0 each); ties are broken alphabetically. `limit` keeps the top k.
+        """
+        return self.rank_results([self.lookup(text, mode, sections)], weights, limit=limit)[0]
+
+    def rank_batch(self, texts: Iterable[str], weights: Optional[Dict[str, float]] = None,
+                   mode: Optional[str] = None, limit: Optional[int] = None) -> List[List[RankedEtiology]]:
+        """rank_etiologies() for many notes, scored with one sparse matrix product."""
+        return self.rank_results(self.analyze_batch(texts, mode=mode).results, weights, limit=limit)
+
+    def rank_results(self, results: List[NoteResult], weights: Optional[Dict[str, float]] = None,
+                     backend: Optional[str] = None, limit: Optional[int] = None) -> List[List[RankedEtiology]]:
+        """
+        Ranks already-analyzed notes; see rank_etiologies(). With `limit`
+        the top k are picked with a heap (O(n log k)) rather than sorting
+        every candidate, and only those k are materialized.
+        """
+        weights = weights or {}
+        if any(w <= 0 for w in weights.values()):
+            raise ValueError("symptom weights must be positive")
+        if limit is not None and limit < 0:
+            raise ValueError("limit must be non-negative")
+        keys, names = self.symptom_keys, self.etiology_names
+        notes = [{sid: float(weights.get(keys[sid], 1.0)) for sid in r.symptoms} for r in results]
+        scored = self._incidence.products(notes, backend or AppConfig.RANK_BACKEND)
+
+        ranked = []
+        for note, scores in zip(notes, scored):
+            if limit is None or limit >= len(scores):
+                order = sorted(scores, key=lambda eid: (-scores[eid], eid))
+            else:
+                order = heapq.nsmallest(limit, scores, key=lambda eid: (-scores[eid], eid))
+            ranked.append([
+                RankedEtiology(names[eid], scores[eid],
+                               tuple(keys[sid] for sid in self._etiology_symptoms[eid] if sid in note))
+                for eid in order
+            ])
+        return ranked
+
+    def decode(self, result: NoteResult,
+               etiologies: bool = True) -> Tuple[List[str], List[str], List[str], List[str]]:
+        """Expands a NoteResult into the same shape analyze() returns."""
+        return (
+            [self.symptom_keys[i] for i in result.symptoms],
+            [self.etiology_names[i] for i in result.etiologies] if etiologies else [],
+            [self._treatment_text[i] for i in result.treatments],
+            [self._alert_text[i] for i in result.alerts],
+        )
+
+@dataclass(frozen=True)
+class SectionReport:
+    """Compile time of one section in a KBCompiler run, and whether it was rebuilt."""
+    name: str
+    keys: int
+    seconds: float
+    rebuilt: bool
+
+class KBCompiler:
+    """
+    Compiles ClinicalData into engines section by section, keeping each
+    section's CompiledSection between runs. Sections whose content hash is
+    unchanged are reused; only changed or new ones are compiled before
+    everything is merged into the combined index. `report` and
+    `merge_seconds` describe the last run.
+    """
+
+    def __init__(self, sections: Iterable[CompiledSection] = ()):
+        self._sections: Dict[str, CompiledSection] = {c.name: c for c in sections}
+        self.report: List[SectionReport] = []
+        self.merge_seconds = 0.0
+
+    def compile(self, data: ClinicalData, cache: Optional[ResultCache] = None) -> ClinicalEngine:
+        units: List[CompiledSection] = []
+        report: List[SectionReport] = []
+        for name, table in data.SECTIONS.items():
+            started = time.perf_counter()
+            digest = section_digest(table)
+            unit = self._sections.get(name)
+            rebuilt = unit is None or unit.digest != digest
+            if rebuilt:
+                unit = compile_section(name, table, digest)
+            units.append(unit)
+            report.append(SectionReport(name, len(unit.keys), time.perf_counter() - started, rebuilt))
+        started = time.perf_counter()
+        engine = ClinicalEngine(data, cache=cache, sections=units)
+        self.merge_seconds = time.perf_counter() - started
+        self._sections = {c.name: c for c in units}
+        self.report = report
+        return engine
+
+    def summary(self) -> str:
+        """One line: rebuilt sections with their times, and the merge time."""
+        rebuilt = [r for r in self.report if r.rebuilt]
+        names = ", ".join(f"{r.name} {r.seconds * 1000:.1f} ms" for r in rebuilt[:3])
+        more = f" +{len(rebuilt) - 3} more" if len(rebuilt) > 3 else ""
+        return (f"{len(rebuilt)}/{len(self.report)} sections rebuilt"
+                f"{' (' + names + more + ')' if rebuilt else ''}, merged in {self.merge_seconds * 1000:.1f} ms")
+
+# -----------------------------------------------------------------------------
+# KB SNAPSHOT: header (magic, format, source fingerprint) + pickled engine
+# -----------------------------------------------------------------------------
+SNAPSHOT_MAGIC = b"CHKB"
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_HEADER = ">4sH32s"
+# The only globals a snapshot may reference: the classes a pickled engine holds
+SNAPSHOT_CLASSES = frozenset({
+    "ClinicalEngine", "ClinicalData", "CompiledSection", "KeywordMatcher", "TokenTrie",
+    "SpellingIndex", "NameSearchIndex", "IncidenceMatrix",
+})
+
+def source_fingerprint() -> bytes:
+    """Hash of this module's source; any edit to the KB literals changes it."""
+    import hashlib
+
+    with open(os.path.abspath(__file__), "rb") as f:
+        return hashlib.sha256(f.read()).digest()
+
+def write_snapshot(engine: ClinicalEngine, path: str):
+    """Writes the compiled engine atomically (temp file + rename)."""
+    import pickle
+    import struct
+
+    header = struct.pack(SNAPSHOT_HEADER, SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, source_fingerprint())
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        pickle.dump(engine, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+def load_snapshot(path: str) -> Optional[ClinicalEngine]:
+    """
+    Loads a compiled engine, unpickling straight from the file. Returns None
+    when the file is missing, damaged, or was compiled from a different
+    source or format version.
+    """
+    import pickle
+    import struct
+
+    class SnapshotUnpickler(pickle.Unpickler):
+        """
+        Resolves only the classes in SNAPSHOT_CLASSES (under whatever name
+        this module was run), never other functions or modules: the header
+        fingerprint can be computed by anyone from the public source.
+        """
+
+        def find_class(self, module: str, name: str):
+            if module in ("__main__", "__mp_main__", __name__) and name in SNAPSHOT_CLASSES:
+                obj = globals().get(name)
+                if isinstance(obj, type):
+                    return obj
+            if module == "builtins" and name in ("set", "frozenset"):
+                return super().find_class(module, name)
+            raise pickle.UnpicklingError(f"snapshot references unexpected type {module}.{name}")
+
+    started = time.perf_counter()
+    header_size = struct.calcsize(SNAPSHOT_HEADER)
+    try:
+        with open(path, "rb") as f:
+            magic, fmt, fingerprint = struct.unpack(SNAPSHOT_HEADER, f.read(header_size))
+            if magic != SNAPSHOT_MAGIC or fmt != SNAPSHOT_FORMAT or fingerprint != source_fingerprint():
+                return None
+            engine = SnapshotUnpickler(f).load()
+    except (OSError, ValueError, struct.error, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    if not isinstance(engine, ClinicalEngine):
+        return None
+    engine.origin = "snapshot"
+    engine.built_at = time.time()
+    engine.build_seconds = time.perf_counter() - started
+    return engine
+
+def load_engine() -> ClinicalEngine:
+    """
+    Loads the precompiled snapshot when it is current, otherwise builds the
+    knowledge base and engine from source, or from AppConfig.KB_PATH when
+    an external KB is configured. The UI and the HTTP API hold the result
+    in an EngineReloader, built once per server process.
+    """
+    if AppConfig.KB_PATH:
+        engine = ClinicalEngine(ClinicalData.from_file(AppConfig.KB_PATH))
+        engine.origin = os.path.basename(AppConfig.KB_PATH)
+        return engine
+    if AppConfig.SNAPSHOT_PATH:
+        engine = load_snapshot(AppConfig.SNAPSHOT_PATH)
+        if engine is not None:
+            return engine
+    return ClinicalEngine(ClinicalData())
+
+class EngineReloader:
+    """
+    Holds the engine a process shares and swaps in a new one when the
+    external KB file changes. A daemon thread polls the file's stat; on a
+    change it recompiles the changed sections (KBCompiler) into a fresh
+    ClinicalEngine off the request path and rebinds `engine` in one
+    assignment. Callers read `engine` once per request, so requests
+    already running finish on the version they started with. The result
+    cache, stage timings and metrics carry over (the cache drops entries
+    of the old KB version itself). A file that fails to load leaves the
+    current engine in place and is retried on its next change.
+    """
+
+    def __init__(self, engine: ClinicalEngine, path: str = "", interval: float = AppConfig.KB_POLL_SECONDS):
+        self.engine = engine
+        self.path = path
+        self.interval = interval
+        self.reloads = 0
+        self.last_reload_seconds = 0.0
+        self.last_error: Optional[str] = None
+        self.compiler = KBCompiler(engine.sections)
+        self._signature = self._stat()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        if not self.path:
+            return None
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        # Inode too, so a replace-by-rename with the same mtime still counts
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def check(self) -> bool:
+        """Reloads if the file changed since the last look; True when swapped."""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        return self.reload()
+
+    def reload(self) -> bool:
+        """Compiles the KB file into a new engine and swaps it in; False on error."""
+        with self._lock:
+            current = self.engine
+            started = time.perf_counter()
+            try:
+                engine = self.compiler.compile(ClinicalData.from_file(self.path), cache=current.cache)
+            except (OSError, ValueError, RuntimeError) as exc:
+                self.last_error = str(exc)
+                print(f"kb reload: kept {current.kb_version}: {exc}", file=sys.stderr, flush=True)
+                return False
+            engine.timings = current.timings
+            if current.metrics is not None:
+                engine.metrics = EngineMetrics(engine.symptom_keys, engine.alert_keys, current.metrics)
+            engine.origin = os.path.basename(self.path)
+            seconds = time.perf_counter() - started
+            self.engine = engine
+            self.reloads += 1
+            self.last_reload_seconds = seconds
+            self.last_error = None
+            engine.timings.record("kb_reload", seconds)
+            for section in self.compiler.report:
+                if section.rebuilt:
+                    engine.timings.record("kb_section", section.seconds)
+            print(f"kb reload: {current.kb_version} -> {engine.kb_version} in {seconds * 1000:.1f} ms; "
+                  f"{self.compiler.summary()}", file=sys.stderr, flush=True)
+            return True
+
+    def start(self) -> "EngineReloader":
+        """Starts the polling thread (no-op without a KB file)."""
+        if self.path and self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="kb-reloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as exc:  # the watcher must outlive any single bad reload
+                self.last_error = f"{type(exc).__name__}: {exc}"
+
+def load_reloader() -> EngineReloader:
+    """
+    load_engine() behind an EngineReloader watching AppConfig.KB_PATH, if
+    set, plus the metrics scrape endpoint when AppConfig.METRICS_PORT is.
+    """
+    if AppConfig.METRICS_PORT:
+        AppConfig.METRICS = True
+    reloader = EngineReloader(load_engine(), AppConfig.KB_PATH).start()
+    if AppConfig.METRICS_PORT:
+        start_metrics_server(reloader, AppConfig.API_HOST, AppConfig.METRICS_PORT)
+    return reloader
+
+# -----------------------------------------------------------------------------
+# METRICS: Prometheus text exposition of EngineMetrics and cache statistics
+# -----------------------------------------------------------------------------
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Histogram bucket bounds exported: every 4th LatencyHistogram bound, i.e.
+# powers of two from 1 us to ~16 s (cumulative counts stay exact there)
+METRICS_BUCKETS = tuple(range(0, 100, 4))
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def metrics_text(engine: ClinicalEngine, reloader: Optional[EngineReloader] = None,
+                 requests: Optional[int] = None) -> str:
+    """
+    The engine's metrics in the Prometheus text format (version 0.0.4).
+    Per-key counters list only keys hit at least once, so a large KB does not
+    produce a series per key.
+    """
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples: Iterable[Tuple[str, float]]):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, value in samples:
+            lines.append(f"{name}{suffix} {value!r}")
+
+    metrics = engine.metrics
+    if metrics is not None:
+        latency = metrics.latency
+        cumulative, seen = [], 0
+        for idx, n in enumerate(latency.buckets):
+            seen += n
+            if idx in METRICS_BUCKETS:
+                cumulative.append((f'_bucket{{le="{2 ** (idx // 4) / 1e6!r}"}}', seen))
+        metric("consulthealth_analyze_total", "counter",
+               "Notes analyzed (ClinicalEngine lookups, analyze() and streamed bulk/batch notes).",
+               [("", latency.count)])
+        metric("consulthealth_analyze_seconds", "histogram", "Analysis latency per note, result cache included.",
+               cumulative + [('_bucket{le="+Inf"}', latency.count), ("_sum", latency.total),
+                             ("_count", latency.count)])
+        symptoms, alerts = metrics.totals()
+        metric("consulthealth_symptom_matches_total", "counter", "Analyzed notes matching each symptom key.",
+               [(f'{{key="{_label(k)}"}}', n) for k, n in sorted(symptoms.items())])
+        metric("consulthealth_alert_hits_total", "counter", "Analyzed notes raising each ALERTS key.",
+               [(f'{{key="{_label(k)}"}}', n) for k, n in sorted(alerts.items())])
+
+    cache = engine.cache.stats()
+    for field in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        metric(f"consulthealth_cache_{field}_total", "counter", f"Result cache {field}.", [("", cache[field])])
+    metric("consulthealth_cache_entries", "gauge", "Results currently cached.", [("", cache["size"])])
+    metric("consulthealth_cache_capacity", "gauge", "Result cache capacity.", [("", cache["maxsize"])])
+
+    metric("consulthealth_kb_info", "gauge", "Knowledge base version being served.",
+           [(f'{{version="{_label(engine.kb_version)}",origin="{_label(engine.origin)}"}}', 1)])
+    metric("consulthealth_kb_symptom_keys", "gauge", "Symptom keys in the KB.", [("", len(engine.symptom_keys))])
+    metric("consulthealth_kb_alert_keys", "gauge", "ALERTS keys in the KB.", [("", len(engine.alert_keys))])
+    if reloader is not None:
+        metric("consulthealth_kb_reloads_total", "counter", "Successful KB hot reloads.", [("", reloader.reloads)])
+        metric("consulthealth_kb_reload_seconds", "gauge", "Duration of the last KB reload.",
+               [("", float(reloader.last_reload_seconds))])
+    if requests is not None:
+        metric("consulthealth_api_requests_total", "counter", "HTTP API requests served.", [("", requests)])
+    return "\n".join(lines) + "\n"
+
+def start_metrics_server(reloader: EngineReloader, host: str, port: int):
+    """
+    Serves GET /metrics for the reloader's current engine from a daemon
+    thread (standard library http.server), for processes such as the
+    Streamlit UI that have no API server of their own.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics_text(reloader.engine, reloader).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
 
 # -----------------------------------------------------------------------------
 # 4. UI COMPONENTS
 # -----------------------------------------------------------------------------
-def render_sidebar():
+def render_sidebar(engine: ClinicalEngine, reloader: Optional[EngineReloader] = None) -> Optional[List[str]]:
+    """Draws the sidebar; returns the selected KB sections, or None for all."""
+    import streamlit as st
+
     with st.sidebar:
         # Use standard markdown for theme-adaptive text colors
         st.markdown(f"### {AppConfig.APP_ICON} {AppConfig.APP_TITLE}")
@@ -1578,53 +3363,154 @@ def render_sidebar():
         st.markdown("##### 📋 Triage Mode")
         st.info("System is ready for input.\nDatabase updated: current.")
         
+        built = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(engine.built_at))
+        st.caption(
+            f"KB version: `{engine.kb_version}`  \n"
+            f"Engine built: {built} ({engine.build_seconds * 1000:.1f} ms from {engine.origin})"
+        )
+        if reloader is not None and reloader.path:
+            st.caption(
+                f"Watching `{reloader.path}`: {reloader.reloads} reload(s)"
+                + (f", last {reloader.last_reload_seconds * 1000:.1f} ms" if reloader.reloads else "")
+            )
+            if reloader.last_error:
+                st.warning(f"KB file not loaded, still serving `{engine.kb_version}`: {reloader.last_error}")
+
+        # Specialty scope: notes are matched against the chosen sections only
+        st.markdown("##### 🩻 Specialties")
+        sections = st.multiselect(
+            "Sections", [c.name for c in engine.sections], key="sections",
+            placeholder="All sections", label_visibility="collapsed"
+        )
+        if sections:
+            st.caption("Critical alerts are always checked.")
+        
         # REMOVED: Settings section as requested
+        return sections or None
         
+def render_etiology_lookup(engine: ClinicalEngine):
+    import streamlit as st
+
+    with st.sidebar:
+        st.markdown("---")
+        st.markdown("##### 🔎 Etiology Lookup")
+        query = st.text_input(
+            "Etiology", key="etiology_query", placeholder="e.g. pulmonary embolism",
+            label_visibility="collapsed"
+        )
+        if not query.strip():
+            return
+        with engine.timings.span("etiology_lookup"):
+            names = engine.search_etiologies(query, limit=10)
+            profiles = [engine.etiology_profile(name) for name in names[:3]]
+        if not names:
+            st.caption("No matching etiology in local DB.")
+            return
+        for profile in profiles:
+            lines = [f"**{profile.name}**", f"Presents with: {', '.join(profile.symptoms)}"]
+            if profile.alerts:
+                lines.append(f"Red flags: {', '.join(profile.alerts)}")
+            if profile.treatments:
+                lines.append("Treatments: " + "; ".join(t.replace("**", "") for t in profile.treatments))
+            st.markdown("  \n".join(lines))
+        if len(names) > len(profiles):
+            st.caption("Also: " + ", ".join(names[len(profiles):]))
+
+def render_diagnostics(engine: ClinicalEngine):
+    import streamlit as st
+
+    with st.sidebar:
+        if not st.checkbox("Show diagnostics", key="show_diagnostics"):
+            return
+        stages = engine.timings.summary()
+        if stages:
+            rows = ["| Stage | n | p50 ms | p95 ms | p99 ms |", "|---|---:|---:|---:|---:|"]
+            order = ("normalize", "cache", "match", "assemble", "rank", "spelling", "render", "ux_delay",
+                     "request", "etiology_lookup", "kb_reload", "kb_section")
+            # Stages missing from the usual order are listed after it, not dropped
+            for stage in [*(name for name in order if name in stages), *sorted(set(stages) - set(order))]:
+                h = stages[stage]
+                rows.append(
+                    f"| {stage} | {h['count']} | {h['p50'] * 1000:.3f} | "
+                    f"{h['p95'] * 1000:.3f} | {h['p99'] * 1000:.3f} |"
+                )
+            st.markdown("\n".join(rows))
+        else:
+            st.caption("No analyses recorded yet.")
+        cache = engine.cache.stats()
+        st.caption(
+            f"Result cache: {cache['size']}/{cache['maxsize']} entries, "
+            f"hit rate {cache['hit_rate']:.0%} ({cache['hits']} hits, {cache['misses']} misses, "
+            f"{cache['evictions']} evictions)  \nUX delay: {AppConfig.UX_DELAY_SECONDS:.2f}s"
+        )
+
 def render_header():
+    import streamlit as st
+
     # Use standard elements that adapt to the theme
     st.title(AppConfig.APP_TITLE)
     st.markdown("Differential Diagnosis & Triage Protocol")
 
-def render_results(symptoms, etiologies, treatments, alerts):
+def _show_more_etiologies():
+    import streamlit as st
+
+    st.session_state.etiology_limit += AppConfig.ETIOLOGY_PAGE_SIZE
+
+def _card(title: str, lines: List[str] = ()) -> str:
+    """
+    A section card header followed by its markdown lines, as one block. The
+    block is rendered with HTML allowed, so callers escape KB text in `lines`.
+    """
+    header = f'<div class="medical-card"><h4>{title}</h4></div>'
+    return f"{header}\n\n" + "  \n".join(lines) if lines else header
+
+def render_results(symptoms, etiologies, treatments, alerts, corrections=(), terms=(), etiology_total=0):
+    import html
+    import streamlit as st
+
+    # Every section is assembled into as few markdown blocks as possible:
+    # each st.* call is one delta to the browser, so per-item calls made
+    # large results cost hundreds of deltas per rerun.
+
     # 1. Critical Alerts Section
     if alerts:
         st.subheader("🚨 Critical Notifications")
-        for alert in alerts:
-            st.markdown(f"""
-            <div class="alert-box">
-                <strong>ACTION REQUIRED</strong><br>
-                {alert}
-            </div>
-            """, unsafe_allow_html=True)
+        st.markdown("".join(
+            f'<div class="alert-box"><strong>ACTION REQUIRED</strong><br>{html.escape(alert)}</div>'
+            for alert in alerts
+        ), unsafe_allow_html=True)
+
+    # Abbreviations and lay terms that were mapped to a canonical symptom
+    aliased = list(dict.fromkeys(f"{t.surface} → {t.key}" for t in terms if t.surface != t.key))
+    if aliased:
+        st.caption("Interpreted: " + "; ".join(aliased))
+
+    # Spelling-corrected matches are suggestions only, kept out of the results
+    if corrections:
+        suggestions = ", ".join(f"**{c.key}** (typed \"{c.surface}\")" for c in corrections)
+        st.info(f"Possible misspellings, not included below: {suggestions}. Correct the note to include them.")
             
     # 2. Main Grid
     if symptoms:
         col1, col2 = st.columns(2)
         
         with col1:
-            st.markdown("""
-            <div class="medical-card">
-                <h4>🔍 Differential Diagnosis</h4>
-            </div>
-            """, unsafe_allow_html=True)
-            
+            # Ranked by how many of the matched symptoms point to each cause;
+            # the card and one page of causes go out as a single block
+            st.markdown(_card("🔍 Differential Diagnosis", [
+                f"• {html.escape(item.name)} · _{html.escape(', '.join(item.symptoms))}_" for item in etiologies
+            ]), unsafe_allow_html=True)
             if etiologies:
-                for item in etiologies:
-                    st.markdown(f"• {item}")
+                if etiology_total > len(etiologies):
+                    st.caption(f"Showing {len(etiologies)} of {etiology_total} possible causes")
+                    st.button("Show more", key="show_more_etiologies", on_click=_show_more_etiologies)
             else:
                 st.caption("No specific etiology match found in local DB.")
 
         with col2:
-            st.markdown("""
-            <div class="medical-card">
-                <h4>💊 Pharmacological Guide</h4>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            if treatments:
-                for item in treatments:
-                    st.markdown(f"• {item}")
-            else:
+            st.markdown(_card("💊 Pharmacological Guide", [f"• {html.escape(item)}" for item in treatments]),
+                        unsafe_allow_html=True)
+            if not treatments:
                 st.caption("No specific protocol available.")
             
     elif not alerts:
@@ -1634,6 +3520,9 @@ def render_results(symptoms, etiologies, treatments, alerts):
 # 5. MAIN APPLICATION
 # -----------------------------------------------------------------------------
 def main():
+    import streamlit as st
+
+    tune_message_cache()
     st.set_page_config(
         page_title=AppConfig.APP_TITLE,
         page_icon=AppConfig.APP_ICON,
@@ -1644,12 +3533,14 @@ def main():
     # Inject theme-adaptive CSS
     inject_css()
     
-    # Initialize Engine
-    kb = ClinicalData()
-    engine = ClinicalEngine(kb)
+    # Shared Engine (built on first run, reused by every rerun and session).
+    # Read once per rerun: a KB reload mid-run does not mix two versions.
+    reloader = st.cache_resource(show_spinner=False)(load_reloader)()
+    engine = reloader.engine
     
     # Render Layout
-    render_sidebar()
+    sections = render_sidebar(engine, reloader)
+    render_etiology_lookup(engine)
     render_header()
     
     # Session State for Clear Functionality
@@ -1676,24 +3567,45 @@ def main():
     with action_col2:
         if st.button("Reset Form", type="secondary"):
             st.session_state.clinical_note = ""
+            st.session_state.analyzed_note = None
             st.rerun()
 
     st.markdown("---")
 
-    # Processing Logic
+    # Processing Logic. The analyzed note stays in session state so that
+    # "Show more" reruns redraw the results (from the result cache) until
+    # the note is edited or the form is reset.
     if analyze_btn and user_text:
-        with st.spinner("Processing clinical tokens..."):
-            time.sleep(0.5) # UX: Simulate computation time
+        st.session_state.analyzed_note = user_text
+        st.session_state.etiology_limit = AppConfig.ETIOLOGY_PAGE_SIZE
+    if user_text and st.session_state.get("analyzed_note") == user_text:
+        with st.spinner("Processing clinical tokens..."), engine.timings.span("request"):
+            # UX: Optional pacing delay, measured apart from real work
+            if analyze_btn and AppConfig.UX_DELAY_SECONDS > 0:
+                with engine.timings.span("ux_delay"):
+                    time.sleep(AppConfig.UX_DELAY_SECONDS)
             
-            # Logic
-            symptoms, causes, meds, alerts = engine.analyze(user_text)
+            # Logic: only the page of etiologies on screen is ranked out
+            result = engine.lookup(user_text, sections=sections)
+            with engine.timings.span("assemble"):
+                symptoms, _, meds, alerts = engine.decode(result, etiologies=False)
+            with engine.timings.span("rank"):
+                causes = engine.rank_results([result], limit=st.session_state.etiology_limit)[0]
+            with engine.timings.span("spelling"):
+                corrections = engine.corrections(user_text, sections=sections)
+            terms = engine.terms(user_text, sections=sections)
             
             # Render
-            render_results(symptoms, causes, meds, alerts)
+            with engine.timings.span("render"):
+                render_results(symptoms, causes, meds, alerts, corrections, terms,
+                               etiology_total=len(result.etiologies))
             
             # Update state to keep text
             st.session_state.clinical_note = user_text
 
+    # Diagnostics reflect this run, so they are drawn after processing
+    render_diagnostics(engine)
+
     # Professional Footer
     st.markdown("""
     <div class="footer">
@@ -1703,5 +3615,1356 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
+# -----------------------------------------------------------------------------
+# 6. HEADLESS BATCH PIPELINE
+# -----------------------------------------------------------------------------
+def parse_note(lineno: int, line: str, field: str = "text") -> Optional[Tuple[object, Optional[str], Optional[str]]]:
+    """
+    Parses one JSONL line into (note_id, text, error), or None for a blank
+    line. A line may be a JSON object carrying `field` (and optionally "id")
+    or a bare JSON string.
+    """
+    import json
+
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError as exc:
+        return lineno, None, f"invalid JSON: {exc}"
+    if isinstance(record, str):
+        return lineno, record, None
+    if isinstance(record, dict) and isinstance(record.get(field), str):
+        return record.get("id", lineno), record[field], None
+    return lineno, None, f"expected a string or an object with a '{field}' string"
+
+def read_notes(stream: TextIO, field: str = "text") -> Iterator[Tuple[object, Optional[str], Optional[str]]]:
+    """Yields (note_id, text, error) per non-blank JSONL line."""
+    for lineno, line in enumerate(stream, 1):
+        note = parse_note(lineno, line, field)
+        if note is not None:
+            yield note
+
+def analyze_stream(engine: ClinicalEngine, notes: Iterable[Tuple[object, Optional[str], Optional[str]]],
+                   histogram: LatencyHistogram, ids: bool = False,
+                   scope: Optional[ScopedIndex] = None) -> Iterator[Dict[str, object]]:
+    """Analyzes notes one at a time, yielding one result record per note."""
+    for note_id, text, error in notes:
+        if error is not None:
+            yield {"id": note_id, "error": error}
+            continue
+        started = time.perf_counter()
+        # Archives rarely repeat verbatim, so skip the shared result cache.
+        result = engine.analyze_ids(normalize_note(text), scope=scope)
+        elapsed = time.perf_counter() - started
+        histogram.observe(elapsed)
+        if engine.metrics is not None:
+            engine.metrics.observe(result, elapsed)
+        if ids:
+            yield {"id": note_id, "symptoms": result.symptoms, "etiologies": result.etiologies,
+                   "treatments": result.treatments, "alerts": result.alerts}
+        else:
+            symptoms, etiologies, treatments, alerts = engine.decode(result)
+            yield {"id": note_id, "symptoms": symptoms, "etiologies": etiologies,
+                   "treatments": treatments, "alerts": alerts}
+
+def read_chunks(stream: TextIO, size: int) -> Iterator[List[Tuple[int, str]]]:
+    """Groups raw (lineno, line) pairs into lists of at most `size`."""
+    chunk: List[Tuple[int, str]] = []
+    for lineno, line in enumerate(stream, 1):
+        chunk.append((lineno, line))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# Engine used by analyze_chunk. The parent sets it before forking workers so
+# they inherit the compiled KB copy-on-write instead of unpickling it per task.
+_WORKER_ENGINE: Optional[ClinicalEngine] = None
+
+def _init_worker():
+    """Pool initializer; only builds an engine where fork is unavailable."""
+    global _WORKER_ENGINE
+    if _WORKER_ENGINE is None:
+        _WORKER_ENGINE = load_engine()
+
+def analyze_chunk(chunk: List[Tuple[int, str]], field: str, ids: bool) -> Tuple[str, LatencyHistogram, int]:
+    """
+    Parses, analyzes and serializes one chunk of raw JSONL lines.
+    Returns (output text, latency histogram, error count).
+    """
+    import json
+
+    histogram = LatencyHistogram()
+    notes = (n for n in (parse_note(lineno, line, field) for lineno, line in chunk) if n is not None)
+    lines = []
+    errors = 0
+    for record in analyze_stream(_WORKER_ENGINE, notes, histogram, ids=ids):
+        if "error" in record:
+            errors += 1
+        lines.append(json.dumps(record, separators=(",", ":")) + "\n")
+    return "".join(lines), histogram, errors
+
+def process_chunks(chunks: Iterable[List[Tuple[int, str]]], field: str, ids: bool,
+                   workers: int) -> Iterator[Tuple[str, LatencyHistogram, int]]:
+    """
+    Yields analyze_chunk results in input order. With workers > 1 the chunks
+    are spread over a process pool, keeping at most 2 chunks per worker in
+    flight so memory stays bounded regardless of input size.
+    """
+    global _WORKER_ENGINE
+    if _WORKER_ENGINE is None:
+        _WORKER_ENGINE = load_engine()
+
+    if workers <= 1:
+        for chunk in chunks:
+            yield analyze_chunk(chunk, field, ids)
+        return
+
+    import gc
+    import multiprocessing
+
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    # Keep the KB out of the collector's way so forked workers do not dirty
+    # (and thereby copy) the shared pages while scanning it.
+    gc.freeze()
+    try:
+        with ctx.Pool(workers, initializer=_init_worker) as pool:
+            pending: deque = deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(analyze_chunk, (chunk, field, ids)))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+    finally:
+        gc.unfreeze()
+
+def _run_pipeline(path: str, field: str, ids: bool, workers: int, chunk_size: int,
+                  out: Optional[TextIO]) -> Tuple[int, int, float, LatencyHistogram]:
+    """Streams one file through the pipeline; returns (notes, errors, seconds, latency)."""
+    started = time.perf_counter()
+    histogram = LatencyHistogram()
+    errors = 0
+    source = open(path, encoding="utf-8") if path != "-" else sys.stdin
+    try:
+        for text, chunk_hist, chunk_errors in process_chunks(read_chunks(source, chunk_size), field, ids, workers):
+            if out is not None:
+                out.write(text)
+            histogram.merge(chunk_hist)
+            errors += chunk_errors
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    if out is not None:
+        out.flush()
+    return histogram.count + errors, errors, time.perf_counter() - started, histogram
+
+def set_match_mode(mode: str):
+    """Sets the process-wide default match mode (inherited by worker processes)."""
+    AppConfig.MATCH_MODE = mode
+    os.environ["CONSULTHEALTH_MATCH_MODE"] = mode
+
+def run_batch(args: argparse.Namespace) -> int:
+    set_match_mode(args.mode)
+    notes, errors, elapsed, histogram = _run_pipeline(
+        args.input, args.field, args.ids, args.workers, args.chunk_size, sys.stdout
+    )
+    lat = histogram.summary()
+    print(
+        f"batch: {notes} notes ({errors} errors) in {elapsed:.2f}s "
+        f"= {notes / elapsed if elapsed else 0:.0f} notes/s with {args.workers} worker(s) | latency "
+        f"p50 {lat['p50'] * 1e6:.0f}us p95 {lat['p95'] * 1e6:.0f}us "
+        f"p99 {lat['p99'] * 1e6:.0f}us max {lat['max'] * 1e6:.0f}us | kb {_WORKER_ENGINE.kb_version}",
+        file=sys.stderr,
+    )
+    return 0
+
+def run_scale(args: argparse.Namespace) -> int:
+    """Re-runs the pipeline over one file with 1..N workers and prints speedups."""
+    max_workers = args.max_workers or os.cpu_count() or 1
+    print(f"{'workers':>7} {'seconds':>8} {'notes/s':>9} {'speedup':>8} {'efficiency':>10}")
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        notes, _, elapsed, _ = _run_pipeline(args.input, args.field, False, workers, args.chunk_size, None)
+        rate = notes / elapsed if elapsed else 0.0
+        baseline = baseline or rate
+        speedup = rate / baseline if baseline else 0.0
+        print(f"{workers:>7} {elapsed:>8.2f} {rate:>9.0f} {speedup:>7.2f}x {speedup / workers:>9.0%}")
+    return 0
+
+def run_compile(args: argparse.Namespace) -> int:
+    started = time.perf_counter()
+    compiler = KBCompiler()
+    engine = compiler.compile(ClinicalData())
+    write_snapshot(engine, args.output)
+    for section in compiler.report:
+        print(f"{section.seconds * 1000:>9.2f} ms {section.keys:>6} keys  {section.name}", file=sys.stderr)
+    print(
+        f"compile: kb {engine.kb_version} -> {args.output} "
+        f"({os.path.getsize(args.output) / 1024:.0f} KiB) in {(time.perf_counter() - started) * 1000:.1f} ms "
+        f"(merge {compiler.merge_seconds * 1000:.1f} ms)",
+        file=sys.stderr,
+    )
+    return 0
+
+def run_coldstart(args: argparse.Namespace) -> int:
+    """Times fresh interpreters from start to a ready engine, with and without the snapshot."""
+    import subprocess
+
+    probe = (
+        "import time; t0 = time.perf_counter(); import consulthealth as c; t1 = time.perf_counter(); "
+        "e = c.load_engine(); print(e.origin, t1 - t0, time.perf_counter() - t1)"
+    )
+    here = os.path.dirname(os.path.abspath(__file__))
+    modes = [("source", "")]
+    if os.path.exists(args.snapshot):
+        modes.append(("snapshot", os.path.abspath(args.snapshot)))
+    else:
+        print(f"coldstart: no snapshot at {args.snapshot}; run `compile` first", file=sys.stderr)
+
+    def median(values: List[float]) -> float:
+        return sorted(values)[len(values) // 2] * 1000
+
+    print(f"{'mode':>8} {'import ms':>10} {'engine ms':>10} {'process ms':>11}  (medians of {args.runs} runs)")
+    for label, snapshot in modes:
+        env = dict(os.environ, CONSULTHEALTH_SNAPSHOT=snapshot)
+        imports, engines, wall = [], [], []
+        for _ in range(args.runs):
+            t = time.perf_counter()
+            out = subprocess.run([sys.executable, "-c", probe], cwd=here, env=env,
+                                 capture_output=True, text=True, check=True).stdout.split()
+            wall.append(time.perf_counter() - t)
+            if out[0] != label:
+                print(f"coldstart: expected {label} engine, got {out[0]}", file=sys.stderr)
+            imports.append(float(out[1]))
+            engines.append(float(out[2]))
+        print(f"{label:>8} {median(imports):>10.1f} {median(engines):>10.1f} {median(wall):>11.1f}")
+    return 0
+
+def run_importtime(args: argparse.Namespace) -> int:
+    """Breaks down `import consulthealth` with -X importtime in a fresh interpreter."""
+    import subprocess
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    # Production imports from cached bytecode, so allow .pyc writes and warm up once.
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    probe = [sys.executable, "-X", "importtime", "-c",
+             "import sys, consulthealth; print(int('streamlit' in sys.modules))"]
+    subprocess.run(probe, cwd=here, env=env, capture_output=True, check=True)
+
+    def parse(stderr: str) -> List[Tuple[int, int, int, str]]:
+        # "import time: <self us> | <cumulative us> | <2 spaces per depth><module>"
+        rows = []
+        for line in stderr.splitlines():
+            fields = line.partition("import time:")[2].split("|")
+            if len(fields) != 3 or not fields[0].strip().isdigit():
+                continue
+            name = fields[2].rstrip()
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            rows.append((int(fields[0]), int(fields[1]), depth, name.strip()))
+        return rows
+
+    runs = []
+    for _ in range(args.runs):
+        proc = subprocess.run(probe, cwd=here, env=env, capture_output=True, text=True, check=True)
+        rows = parse(proc.stderr)
+        end = next(i for i, r in enumerate(rows) if r[2] == 0 and r[3] == "consulthealth")
+        start = max([i + 1 for i, r in enumerate(rows[:end]) if r[2] == 0], default=0)
+        runs.append((rows[end][1], rows[start:end], proc.stdout.strip() == "1"))
+
+    total, children, loaded_streamlit = sorted(runs, key=lambda r: r[0])[len(runs) // 2]
+    print(f"import consulthealth: {total / 1000:.2f} ms (median of {args.runs}; "
+          f"streamlit loaded: {'yes' if loaded_streamlit else 'no'})")
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    direct = sorted((r for r in children if r[2] == 1), key=lambda r: r[1], reverse=True)
+    for self_us, cumulative_us, _, name in direct[:args.top]:
+        print(f"{cumulative_us / 1000:>14.2f} {self_us / 1000:>8.2f}  {name}")
+    return 1 if loaded_streamlit else 0
+
+# -----------------------------------------------------------------------------
+# 7. BENCHMARKS
+# -----------------------------------------------------------------------------
+# SYNTHETIC WORKLOADS: seeded KBs and notes shared by the benchmarks, load
+# tests and `python consulthealth.py generate`. Same seed, same output.
+class NoteGenerator:
+    """
+    Synthetic clinical notes built from a KB's real keys and short clinical
+    filler phrases. `density` is the share of phrases that are KB keys and
+    `overlap` the share of key mentions drawn from keys that contain another
+    key ("high fever" contains "fever"), where match modes disagree.
+    """
+
+    FILLER = (
+        "patient reports", "pt states", "denies", "since yesterday", "for 3 days", "x2 weeks", "mild",
+        "moderate", "intermittent", "worse at night", "no recent travel", "history of", "on exam",
+        "vitals stable", "per family", "after meals", "no known allergies", "took ibuprofen", "improving",
+        "otherwise well",
+    )
+
+    def __init__(self, kb: ClinicalData, seed: int = 0):
+        import random
+
+        self.rnd = random.Random(seed)
+        self.keys = [k for k in dict.fromkeys([*kb.SYMPTOMS, *kb.ALERTS]) if k == k.lower()]
+        self._nested: Optional[List[str]] = None
+
+    @property
+    def nested(self) -> List[str]:
+        """Keys with another key as a contiguous run of their words."""
+        if self._nested is None:
+            keys = set(self.keys)
+            self._nested = []
+            for key in self.keys:
+                words = key.split()
+                if any(" ".join(words[i:j]) in keys
+                       for i in range(len(words)) for j in range(i + 1, len(words) + 1) if j - i < len(words)):
+                    self._nested.append(key)
+        return self._nested
+
+    def note(self, length: int, density: float = 0.15, overlap: float = 0.0) -> str:
+        """One note of exactly `length` characters (the last phrase is cut)."""
+        rnd = self.rnd
+        parts: List[str] = []
+        size = 0
+        until_stop = rnd.randint(3, 8)
+        while size < length:
+            if rnd.random() < density:
+                pool = self.nested if overlap and rnd.random() < overlap and self.nested else self.keys
+                phrase = rnd.choice(pool)
+            else:
+                phrase = rnd.choice(self.FILLER)
+            until_stop -= 1
+            if until_stop == 0:
+                phrase += "."
+                until_stop = rnd.randint(3, 8)
+            else:
+                phrase += rnd.choice((",", ",", "", " and"))
+            parts.append(phrase)
+            size += len(phrase) + 1
+        return " ".join(parts)[:length]
+
+def synthetic_note(kb: ClinicalData, length: int, seed: int = 0,
+                   density: float = 0.15, overlap: float = 0.0) -> str:
+    """A single NoteGenerator note; use a NoteGenerator directly for many."""
+    return NoteGenerator(kb, seed).note(length, density, overlap)
+
+def synthetic_kb(keys: int, seed: int = 0) -> ClinicalData:
+    """
+    The shipped KB expanded to `keys` symptom keys. New keys are 2-3 word
+    phrases over the KB's own vocabulary, spread evenly over its sections;
+    etiology counts per key and the share of keys with an alert or a
+    treatment follow the shipped KB, and
+    alert/treatment texts are reused from it. Aliases are kept as shipped.
+    """
+    import random
+
+    base = ClinicalData()
+    if keys <= len(base.SYMPTOMS):
+        return base
+    rnd = random.Random(seed)
+    vocab = sorted({w for k, v in base.SYMPTOMS.items() for t in [k, *v] for w in tokenize(t.lower()) if len(w) > 2})
+    names = sorted({n for v in base.SYMPTOMS.values() for n in v})
+    names += [f"{rnd.choice(vocab).title()} {rnd.choice(vocab).title()} Syndrome {i}"
+              for i in range(keys // 3)]
+    cause_counts = [len(v) for v in base.SYMPTOMS.values()]
+    alert_texts, med_texts = list(base.ALERTS.values()), list(base.MEDS.values())
+    alert_rate, med_rate = len(base.ALERTS) / len(base.SYMPTOMS), len(base.MEDS) / len(base.SYMPTOMS)
+
+    sections = {name: {k: list(v) for k, v in table.items()} for name, table in base.SECTIONS.items()}
+    section_names = list(sections)
+    symptoms = set(base.SYMPTOMS)
+    alerts, meds = dict(base.ALERTS), dict(base.MEDS)
+    while len(symptoms) < keys:
+        key = " ".join(rnd.choice(vocab) for _ in range(rnd.randint(2, 3)))
+        if key in symptoms or key in alerts:
+            continue
+        symptoms.add(key)
+        sections[section_names[len(symptoms) % len(section_names)]][key] = rnd.sample(names, rnd.choice(cause_counts))
+        if rnd.random() < alert_rate:
+            alerts[key] = rnd.choice(alert_texts)
+        if rnd.random() < med_rate:
+            meds[key] = rnd.choice(med_texts)
+    return ClinicalData(SECTIONS=sections, ALERTS=alerts, MEDS=meds, ALIASES=base.ALIASES)
+
+def run_generate(args: argparse.Namespace) -> int:
+    """Writes a synthetic KB as JSON, or synthetic notes as batch-ready JSONL."""
+    import json
+
+    kb = synthetic_kb(args.keys, args.seed)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        if args.what == "kb":
+            json.dump({"SECTIONS": kb.SECTIONS, "ALERTS": kb.ALERTS, "MEDS": kb.MEDS, "ALIASES": kb.ALIASES},
+                      out, ensure_ascii=False, indent=1)
+            out.write("\n")
+        else:
+            generator = NoteGenerator(kb, args.seed)
+            for i in range(args.count):
+                text = generator.note(args.length, args.density, args.overlap)
+                out.write(json.dumps({"id": i, "text": text}, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    count = len(kb.SYMPTOMS) if args.what == "kb" else args.count
+    print(f"generate: {count} {'symptom keys' if args.what == 'kb' else 'notes'} "
+          f"(kb {kb.version()}, seed {args.seed}) -> {args.output}", file=sys.stderr)
+    return 0
+
+BENCH_LENGTHS = [1_000, 10_000, 100_000]
+ENGINE_LENGTHS = [50, 1_000, 10_000, 100_000, 1_000_000]
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def bench_matchers(args: argparse.Namespace) -> List[Dict[str, object]]:
+    """Per-key substring scan (original analyze) vs Aho-Corasick vs token trie."""
+    kb = ClinicalData()
+    engine = ClinicalEngine(kb)
+    keys = list(dict.fromkeys(list(kb.ALERTS) + list(kb.SYMPTOMS)))
+    trie = engine._token_trie
+    rows = []
+    for length in args.lengths or BENCH_LENGTHS:
+        note = normalize_note(synthetic_note(kb, length, args.seed))
+        candidates = {
+            "per-key scan": lambda: {k for k in keys if k in note},
+            "aho-corasick": lambda: engine._matcher.find(note),
+            "trie overlap": lambda: trie.find(note, longest=False),
+            "trie longest": lambda: trie.find(note, longest=True),
+        }
+        for name, fn in candidates.items():
+            rows.append({
+                "bench": "matchers", "length": length, "matcher": name,
+                "ms": _best_of(fn, args.repeat) * 1000, "keys_found": len(fn()),
+            })
+    return rows
+
+def bench_spelling(args: argparse.Namespace) -> List[Dict[str, object]]:
+    """Exact matching alone vs exact matching plus spelling correction."""
+    import random
+
+    kb = ClinicalData()
+    engine = ClinicalEngine(kb)
+    rnd = random.Random(args.seed)
+    rows = []
+    for length in args.lengths or BENCH_LENGTHS:
+        # Misspell ~1 in 5 words with one random edit
+        words = normalize_note(synthetic_note(kb, length, args.seed)).split()
+        for i, word in enumerate(words):
+            if len(word) > 4 and rnd.random() < 0.2:
+                j = rnd.randrange(len(word) - 1)
+                words[i] = word[:j] + word[j + 1] + word[j] + word[j + 2:]
+        note = " ".join(words)
+        exact = _best_of(lambda: engine.analyze_ids(note), args.repeat)
+        fuzzy = _best_of(lambda: (engine.analyze_ids(note), engine.corrections(note)), args.repeat)
+        rows.append({
+            "bench": "spelling", "length": length, "exact_ms": exact * 1000, "with_fuzzy_ms": fuzzy * 1000,
+            "overhead_ms": (fuzzy - exact) * 1000, "corrected": len(engine.corrections(note)),
+        })
+    return rows
+
+def bench_reverse(args: argparse.Namespace) -> List[Dict[str, object]]:
+    """Etiology -> symptoms/treatments queries on KBs padded with synthetic etiologies."""
+    import random
+    import statistics
+
+    base = ClinicalData()
+    words = sorted({w for v in base.SYMPTOMS.values() for n in v for w in tokenize(n.lower()) if len(w) > 3})
+    keys = list(base.SYMPTOMS)
+    rows = []
+    for extra in args.etiologies:
+        rnd = random.Random(args.seed)
+        symptoms = {k: list(v) for k, v in base.SYMPTOMS.items()}
+        for i in range(extra):
+            name = f"{rnd.choice(words).title()} {rnd.choice(words).title()} Syndrome {i}"
+            for key in rnd.sample(keys, 3):
+                symptoms[key].append(name)
+        engine = ClinicalEngine(ClinicalData(SYMPTOMS=symptoms, ALERTS=base.ALERTS, MEDS=base.MEDS))
+        names = rnd.sample(engine.etiology_names, 200)
+        queries = [" ".join(w[:rnd.randint(3, 6)] for w in tokenize(n.lower())[:2]) for n in names]
+
+        def per_call(fn, items) -> float:
+            samples = []
+            for item in items:
+                started = time.perf_counter()
+                fn(item)
+                samples.append(time.perf_counter() - started)
+            return statistics.median(samples) * 1e6
+
+        rows.append({
+            "bench": "reverse", "etiologies": len(engine.etiology_names),
+            "profile_us": per_call(engine.etiology_profile, names),
+            "search_us": per_call(lambda q: engine.search_etiologies(q, 10), queries),
+            "scan_us": per_call(lambda n: [k for k, v in symptoms.items() if n in v], names[:20]),
+        })
+    return rows
+
+def bench_ranking(args: argparse.Namespace) -> List[Dict[str, object]]:
+    """Etiology ranking: per note vs one batch product, per backend, and heap top-k."""
+    kb = ClinicalData()
+    engine = ClinicalEngine(kb)
+    rows = []
+    for length in args.lengths or BENCH_LENGTHS:
+        generator = NoteGenerator(kb, args.seed)
+        notes = [generator.note(length) for _ in range(args.notes)]
+        results = engine.analyze_batch(notes).results
+        row: Dict[str, object] = {"bench": "ranking", "length": length, "notes": len(notes)}
+        for backend in ("python", "scipy"):
+            if backend == "scipy" and engine._incidence.csr() is None:
+                continue
+            row[f"{backend}_each_ms"] = _best_of(
+                lambda: [engine.rank_results([r], backend=backend) for r in results], args.repeat) * 1000
+            row[f"{backend}_batch_ms"] = _best_of(
+                lambda: engine.rank_results(results, backend=backend), args.repeat) * 1000
+        row["top_k_each_ms"] = _best_of(
+            lambda: [engine.rank_results([r], limit=args.top_k) for r in results], args.repeat) * 1000
+        rows.append(row)
+    return rows
+
+def bench_render(args: argparse.Namespace) -> List[Dict[str, object]]:
+    """
+    Streamlit page cost per analysis size, driven through AppTest: time of
+    the Analyze run and of a plain rerun with the whole differential shown,
+    the deltas (elements and blocks) each rerun sends, their payload, and
+    the payload a browser still receives once Streamlit's message cache
+    replaces cacheable deltas (global.minCachedMessageSize) with references.
+    """
+    try:
+        from streamlit import config
+        from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("bench: render needs streamlit; skipped", file=sys.stderr)
+        return []
+
+    sent: List[Tuple[int, bool]] = []
+    enqueue = ForwardMsgQueue.enqueue
+
+    def counting(queue, msg):
+        if msg.WhichOneof("type") == "delta":
+            sent.append((msg.ByteSize(), msg.metadata.cacheable))
+        enqueue(queue, msg)
+
+    # Run main() from an import: executing this file as __main__ would see
+    # the benchmark's own argv and re-enter the CLI.
+    page = (f"import sys; sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})\n"
+            "import consulthealth; consulthealth.main()\n")
+    kb = ClinicalData()
+    keys = [k for k in dict.fromkeys([*kb.ALERTS, *kb.SYMPTOMS]) if k == k.lower()]
+    delay = os.environ.get("CONSULTHEALTH_UX_DELAY")
+    os.environ["CONSULTHEALTH_UX_DELAY"] = "0"
+    tune_message_cache()
+    threshold = int(config.get_option("global.minCachedMessageSize"))
+    ForwardMsgQueue.enqueue = counting
+    rows = []
+    try:
+        for matched in args.render_keys:
+            note = ", ".join(keys[:matched])
+            at = AppTest.from_string(page, default_timeout=120)
+            at.run()
+            at.text_area[0].set_value(note)
+            at.button[0].click()
+            started = time.perf_counter()
+            at.run()
+            analyze = time.perf_counter() - started
+            at.session_state["etiology_limit"] = 1 << 30
+            at.run()
+
+            def rerun():
+                sent.clear()
+                at.run()
+
+            best = _best_of(rerun, args.repeat)
+            assert int(config.get_option("global.minCachedMessageSize")) == threshold
+            symptoms, etiologies, treatments, alerts = ClinicalEngine(kb).analyze(note)
+            refs = sum(1 for _, cacheable in sent if cacheable)
+            rows.append({
+                "bench": "render", "symptoms": len(symptoms), "etiologies": len(etiologies),
+                "treatments": len(treatments), "alerts": len(alerts),
+                "analyze_ms": analyze * 1000, "rerun_ms": best * 1000, "deltas": float(len(sent)),
+                "payload_kb": sum(size for size, _ in sent) / 1024,
+                "uncached_kb": (sum(size for size, cacheable in sent if not cacheable) + 64 * refs) / 1024,
+                "cached_deltas": float(refs),
+            })
+    finally:
+        ForwardMsgQueue.enqueue = enqueue
+        if delay is None:
+            os.environ.pop("CONSULTHEALTH_UX_DELAY", None)
+        else:
+            os.environ["CONSULTHEALTH_UX_DELAY"] = delay
+    print(f"bench: render message cache threshold {threshold} bytes", file=sys.stderr)
+    return rows
+
+def bench_metrics(args: argparse.Namespace) -> List[Dict[str, object]]:
+    """
+    Hot-path cost of EngineMetrics: one observe() per analyzed note for
+    results with 0 to 50 matched keys (per call and per metric recorded,
+    i.e. the histogram plus each key counter), and the added cost of a
+    cached lookup() with metrics on versus off.
+    """
+    engine = ClinicalEngine(ClinicalData())
+    metrics = EngineMetrics(engine.symptom_keys, engine.alert_keys)
+    loops = 100_000
+    rows = []
+    for keys in (0, 1, 10, 50):
+        symptoms = tuple(range(min(keys, len(engine.symptom_keys))))
+        alerts = tuple(range(min(keys // 5, len(engine.alert_keys))))
+        result = NoteResult(symptoms=symptoms, etiologies=(), treatments=(), alerts=alerts)
+        observe = metrics.observe
+        per_call = _best_of(lambda: [observe(result, 5e-5) for _ in range(loops)], args.repeat) / loops
+        rows.append({
+            "bench": "metrics", "operation": "observe", "keys": len(symptoms) + len(alerts),
+            "ns_per_call": per_call * 1e9, "ns_per_metric": per_call * 1e9 / (1 + len(symptoms) + len(alerts)),
+        })
+
+    note = synthetic_note(engine.data, 1000, args.seed)
+    engine.lookup(note)
+    timings = {}
+    for label, recorder in (("off", None), ("on", metrics)):
+        engine.metrics = recorder
+        timings[label] = _best_of(lambda: [engine.lookup(note) for _ in range(loops // 10)], args.repeat) / (loops // 10)
+    keys = len(engine.lookup(note).symptoms) + len(engine.lookup(note).alerts)
+    rows.append({
+        "bench": "metrics", "operation": "cached lookup", "keys": keys,
+        "ns_per_call": (timings["on"] - timings["off"]) * 1e9,
+        "ns_per_metric": (timings["on"] - timings["off"]) * 1e9 / (1 + keys),
+    })
+    return rows
+
+SCOPE_BENCH_SECTIONS = [
+    ["SECTION 15: PEDIATRICS SPECIFIC"],
+    ["SECTION 12: OPHTHALMOLOGY"],
+    ["SECTION 15: PEDIATRICS SPECIFIC", "SECTION 12: OPHTHALMOLOGY"],
+]
+
+def bench_sections(args: argparse.Namespace) -> List[Dict[str, object]]:
+    """
+    Section-scoped analysis against the full-KB scan, per KB size and note
+    length: scoped index build time, single-note latency, batch throughput,
+    and the average result per note (symptoms, etiologies, JSON size). Notes
+    draw on the whole KB, as a mixed ED caseload would.
+    """
+    import json
+
+    def label(names: Optional[List[str]]) -> str:
+        if names is None:
+            return "all"
+        return "+".join(n.split(":")[0].split()[-1] if n.startswith("SECTION ") else n for n in names)
+
+    rows = []
+    for keys in args.kb_keys:
+        kb = synthetic_kb(keys, args.seed)
+        engine = ClinicalEngine(kb)
+        for length in args.lengths or BENCH_LENGTHS:
+            generator = NoteGenerator(kb, args.seed)
+            notes = [generator.note(length) for _ in range(max(1, min(args.notes, 2_000_000 // length)))]
+            normalized = [normalize_note(n) for n in notes]
+            for names in [None] + ([args.sections] if args.sections else SCOPE_BENCH_SECTIONS):
+                scope = engine.scope(names)
+                build = _best_of(lambda: engine._build_scope(scope.sections), 1) if scope else 0.0
+                first = normalized[0]
+                single = _best_of(lambda: engine.analyze_ids(first, scope=scope), args.repeat)
+                batch = _best_of(lambda: [engine.analyze_ids(n, scope=scope) for n in normalized], min(args.repeat, 3))
+                results = [engine.analyze_ids(n, scope=scope) for n in normalized]
+                size = sum(len(json.dumps(engine.decode(r), ensure_ascii=False).encode("utf-8")) for r in results)
+                rows.append({
+                    "bench": "sections", "symptoms": len(engine.symptom_keys), "length": length,
+                    "scope": label(names), "scope_keys": len(scope.trie.keywords if scope else engine._token_trie.keywords),
+                    "build_ms": build * 1000, "single_ms": single * 1000, "notes_per_s": len(notes) / batch,
+                    "symptoms_per_note": sum(len(r.symptoms) for r in results) / len(results),
+                    "etiologies_per_note": sum(len(r.etiologies) for r in results) / len(results),
+                    "result_kb": size / len(results) / 1024,
+                })
+    return rows
+
+def bench_engine(args: argparse.Namespace) -> List[Dict[str, object]]:
+    """
+    End-to-end suite per KB size: build (cold start from source) and
+    snapshot load time, retained engine memory, then single-note latency and
+    batch throughput for each note length. KB size 0 is the shipped KB.
+    """
+    import tempfile
+    import tracemalloc
+
+    rows = []
+    for keys in args.kb_keys:
+        kb = synthetic_kb(keys, args.seed)
+        started = time.perf_counter()
+        engine = ClinicalEngine(kb)
+        build = time.perf_counter() - started
+
+        # Separate build under tracemalloc: memory still held once built
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        traced = ClinicalEngine(kb)
+        retained = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del traced
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.kb")
+            write_snapshot(engine, path)
+            snapshot_bytes = os.path.getsize(path)
+            load = _best_of(lambda: load_snapshot(path), min(args.repeat, 3))
+
+        for length in args.lengths or ENGINE_LENGTHS:
+            generator = NoteGenerator(kb, args.seed)
+            notes = [generator.note(length) for _ in range(max(1, min(args.notes, 2_000_000 // length)))]
+            first = notes[0]
+            single = _best_of(lambda: engine.decode(engine.analyze_ids(normalize_note(first))), args.repeat)
+            batch = _best_of(lambda: engine.analyze_batch(notes), min(args.repeat, 3))
+            rows.append({
+                "bench": "engine", "symptoms": len(engine.symptom_keys), "etiologies": len(engine.etiology_names),
+                "length": length, "single_ms": single * 1000, "batch_notes": len(notes),
+                "notes_per_s": len(notes) / batch, "build_s": build, "snapshot_load_s": load,
+                "snapshot_mb": snapshot_bytes / 2**20, "engine_mb": retained / 2**20,
+            })
+    return rows
+
+BENCHMARKS = {
+    "matchers": bench_matchers,
+    "spelling": bench_spelling,
+    "reverse": bench_reverse,
+    "ranking": bench_ranking,
+    "render": bench_render,
+    "sections": bench_sections,
+    "metrics": bench_metrics,
+    "engine": bench_engine,
+}
+
+def run_bench(args: argparse.Namespace) -> int:
+    unknown = [n for n in args.names if n not in BENCHMARKS]
+    if unknown:
+        print(f"bench: unknown benchmark(s) {', '.join(unknown)}; choose from {', '.join(BENCHMARKS)}", file=sys.stderr)
+        return 2
+    results: List[Dict[str, object]] = []
+    for name in args.names or list(BENCHMARKS):
+        rows = BENCHMARKS[name](args)
+        results.extend(rows)
+        if not rows:
+            continue
+        columns = list(rows[0])
+        print(" ".join(f"{c:>14}" for c in columns))
+        for row in rows:
+            print(" ".join(f"{row[c]:>14.3f}" if isinstance(row[c], float) else f"{row[c]!s:>14}" for c in columns))
+        print()
+
+    if args.json:
+        import json
+        import platform
+
+        meta = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "app_version": AppConfig.VERSION,
+            "kb_version": ClinicalData().version(),
+            "source": source_fingerprint().hex()[:12],
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k != "func"},
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=1)
+            f.write("\n")
+        print(f"bench: {len(results)} rows -> {args.json}", file=sys.stderr)
+    if args.baseline:
+        compare_bench(args.baseline, results)
+    return 0
+
+def compare_bench(path: str, results: List[Dict[str, object]]):
+    """Prints each measurement's change against a previous `bench --json` file."""
+    import json
+
+    def identity(row: Dict[str, object]) -> Tuple[object, ...]:
+        return tuple((k, v) for k, v in row.items() if not isinstance(v, float))
+
+    with open(path, encoding="utf-8") as f:
+        baseline = {identity(row): row for row in json.load(f)["results"]}
+    print(f"change vs {path} (time: negative is faster; rates: positive is faster)")
+    for row in results:
+        old = baseline.get(identity(row))
+        if old is None:
+            continue
+        label = " ".join(f"{k}={v}" for k, v in identity(row))
+        changes = [f"{k} {(v / old[k] - 1) * 100:+.1f}%" for k, v in row.items()
+                   if isinstance(v, float) and isinstance(old.get(k), float) and old[k]]
+        print(f"  {label}: {', '.join(changes)}")
+
+# -----------------------------------------------------------------------------
+# 8. HTTP API (asyncio, standard library only)
+# -----------------------------------------------------------------------------
+HTTP_REASONS = {
+    100: "Continue", 200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 431: "Request Header Fields Too Large",
+    500: "Internal Server Error", 501: "Not Implemented",
+}
+
+class HTTPError(Exception):
+    """An error response; `close` drops the connection (request body left unread)."""
+
+    def __init__(self, status: int, message: str, close: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.close = close
+
+class ClinicalApi:
+    """
+    Minimal HTTP/1.1 JSON API over one shared engine. Connections stay open
+    between requests until the client sends `Connection: close` or idles
+    for `keepalive` seconds. Analysis takes microseconds to milliseconds, so
+    it runs on the event loop directly rather than in a thread pool.
+
+    POST /analyze       {"text": ..., "mode", "top_k", "sections": optional}
+    POST /analyze/bulk  NDJSON notes in, NDJSON results out (?ids=1, ?field=, ?section=)
+    GET  /sections      KB section names and key counts
+    GET  /metrics       Prometheus text format (with --metrics)
+    GET  /health
+    """
+
+    def __init__(self, engine: ClinicalEngine, max_body: int = AppConfig.API_MAX_BODY,
+                 keepalive: float = AppConfig.API_KEEPALIVE_SECONDS, reloader: Optional[EngineReloader] = None):
+        self.reloader = reloader or EngineReloader(engine)
+        self.max_body = max_body
+        self.keepalive = keepalive
+        self.requests = 0
+        self.started = time.time()
+        self.routes = {
+            "/analyze": ("POST", self.analyze),
+            "/analyze/bulk": ("POST", self.bulk),
+            "/sections": ("GET", self.list_sections),
+            "/metrics": ("GET", self.metrics),
+            "/health": ("GET", self.health),
+        }
+        # Handlers that read the request body and write the response themselves
+        self.streaming = {self.bulk}
+
+    @property
+    def engine(self) -> ClinicalEngine:
+        """The current engine; handlers read it once so a KB swap never splits a request."""
+        return self.reloader.engine
+
+    async def start(self, host: str, port: int):
+        """Listening asyncio server (port 0 picks a free port)."""
+        import asyncio
+
+        return await asyncio.start_server(self.handle, host, port, limit=AppConfig.API_MAX_HEADER)
+
+    async def handle(self, reader, writer):
+        """Serves one connection: requests in sequence until close or idle timeout."""
+        import asyncio
+
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except (asyncio.LimitOverrunError, ValueError):
+                    await self._respond(writer, 431, {"error": "request headers too large"}, False)
+                    break
+
+                started = time.perf_counter()
+                keep_alive = False
+                stage, status = "api_request", None
+                try:
+                    method, path, version, headers = self._parse_head(head)
+                    keep_alive = (headers.get("connection", "").lower() != "close" if version == "HTTP/1.1"
+                                  else headers.get("connection", "").lower() == "keep-alive")
+                    allowed, handler = self.routes.get(path.split("?", 1)[0], (None, None))
+                    if handler in self.streaming and method == allowed:
+                        stage = "api_bulk"
+                        keep_alive = await handler(reader, writer, path, headers, keep_alive)
+                    else:
+                        body = await self._read_body(reader, writer, headers)
+                        if handler is None:
+                            raise HTTPError(404, f"no route for {path}")
+                        if method != allowed:
+                            raise HTTPError(405, f"{path} accepts {allowed} only")
+                        status, payload = 200, handler(body)
+                except HTTPError as exc:
+                    status, payload = exc.status, {"error": str(exc)}
+                    keep_alive = keep_alive and not exc.close
+                except Exception as exc:  # one bad request must not take down the connection loop
+                    status, payload = 500, {"error": f"{type(exc).__name__}: {exc}"}
+                self.requests += 1
+                if status is not None:
+                    await self._respond(writer, status, payload, keep_alive)
+                self.engine.timings.record(stage, time.perf_counter() - started)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head: bytes) -> Tuple[str, str, str, Dict[str, str]]:
+        try:
+            lines = head.decode("latin-1").split("\r\n")
+            method, path, version = lines[0].split(" ")
+            headers = {}
+            for line in lines[1:]:
+                if line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+        except ValueError:
+            raise HTTPError(400, "malformed request head", close=True) from None
+        return method, path, version, headers
+
+    async def _read_body(self, reader, writer, headers: Dict[str, str]) -> bytes:
+        import asyncio
+
+        if "transfer-encoding" in headers:
+            raise HTTPError(501, "chunked request bodies are not supported; send Content-Length", close=True)
+        length = self._content_length(headers)
+        if length > self.max_body:
+            raise HTTPError(413, f"request body over {self.max_body} bytes", close=True)
+        if not length:
+            return b""
+        if headers.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        try:
+            return await asyncio.wait_for(reader.readexactly(length), self.keepalive)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            raise HTTPError(400, "incomplete request body", close=True) from None
+
+    def _body_framing(self, headers: Dict[str, str]) -> Optional[int]:
+        """Content-Length of a streamed body, or None when it is chunked."""
+        encoding = headers.get("transfer-encoding", "").lower()
+        if encoding:
+            if encoding != "chunked":
+                raise HTTPError(501, f"unsupported Transfer-Encoding {encoding!r}", close=True)
+            return None
+        return self._content_length(headers)
+
+    @staticmethod
+    def _content_length(headers: Dict[str, str]) -> int:
+        """Content-Length as a byte count; only plain ASCII digits are accepted (no sign)."""
+        value = headers.get("content-length", "0")
+        if not (value.isascii() and value.isdigit()):
+            raise HTTPError(400, "invalid Content-Length", close=True)
+        return int(value)
+
+    async def _body_chunks(self, reader, length: Optional[int]) -> AsyncIterator[bytes]:
+        """
+        Yields a streamed request body in pieces of at most API_STREAM_CHUNK
+        bytes, de-chunking Transfer-Encoding: chunked when `length` is None.
+        Each read may idle for `keepalive` seconds before the body is dropped.
+        """
+        import asyncio
+
+        step = AppConfig.API_STREAM_CHUNK
+        if length is not None:
+            while length > 0:
+                data = await asyncio.wait_for(reader.read(min(step, length)), self.keepalive)
+                if not data:
+                    raise HTTPError(400, "incomplete request body", close=True)
+                length -= len(data)
+                yield data
+            return
+        while True:
+            size_line = await asyncio.wait_for(reader.readuntil(b"\r\n"), self.keepalive)
+            try:
+                size = int(size_line.split(b";", 1)[0], 16)
+            except ValueError:
+                raise HTTPError(400, "malformed chunk size", close=True) from None
+            if not size:
+                # Trailer fields up to the blank line are read and ignored
+                while await asyncio.wait_for(reader.readuntil(b"\r\n"), self.keepalive) != b"\r\n":
+                    pass
+                return
+            while size > 0:
+                data = await asyncio.wait_for(reader.readexactly(min(step, size)), self.keepalive)
+                size -= len(data)
+                yield data
+            if await asyncio.wait_for(reader.readexactly(2), self.keepalive) != b"\r\n":
+                raise HTTPError(400, "malformed chunk terminator", close=True)
+
+    @staticmethod
+    async def _write_chunk(writer, data: bytes):
+        """Sends one HTTP chunk, waiting while the client is slower than the engine."""
+        if data:
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        await writer.drain()
+
+    async def bulk(self, reader, writer, path: str, headers: Dict[str, str], keep_alive: bool) -> bool:
+        """
+        Analyzes an NDJSON request body note by note (one JSON string or
+        object per line, as for `batch`) and streams one NDJSON result per
+        note back, then a {"summary": ...} record. At most one read step plus
+        one partial line (up to `max_body` bytes) is held at a time, and
+        reading pauses while results wait in a full write buffer, so a slow
+        client slows the upload instead of growing memory. Returns whether
+        the connection can serve another request.
+        """
+        import asyncio
+        import json
+        from urllib.parse import parse_qs
+
+        query = parse_qs(path.partition("?")[2])
+        field = query.get("field", ["text"])[-1]
+        ids = query.get("ids", ["0"])[-1].lower() in ("1", "true", "yes")
+        engine = self.engine
+        try:
+            scope = engine.scope(query["section"]) if "section" in query else None
+        except ValueError as exc:
+            raise HTTPError(400, str(exc), close=True) from None
+        length = self._body_framing(headers)
+        if headers.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        writer.transport.set_write_buffer_limits(high=AppConfig.API_STREAM_CHUNK)
+        writer.write(
+            f"HTTP/1.1 200 {HTTP_REASONS[200]}\r\n"
+            f"Content-Type: application/x-ndjson; charset=utf-8\r\n"
+            f"Transfer-Encoding: chunked\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+        )
+
+        started = time.perf_counter()
+        histogram = LatencyHistogram()
+        errors = lineno = 0
+        failure: Optional[str] = None
+        pending = b""
+
+        def analyze_lines(lines: List[bytes]) -> bytes:
+            nonlocal errors, lineno
+            notes = []
+            for line in lines:
+                lineno += 1
+                note = parse_note(lineno, line.decode("utf-8", "replace"), field)
+                if note is not None:
+                    notes.append(note)
+            out = []
+            for record in analyze_stream(engine, notes, histogram, ids=ids, scope=scope):
+                if "error" in record:
+                    errors += 1
+                out.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            return "".join(out).encode("utf-8")
+
+        try:
+            async for data in self._body_chunks(reader, length):
+                lines = (pending + data).split(b"\n")
+                pending = lines.pop()
+                # Complete lines are checked too: a whole read step can hold one
+                over = next((i for i, line in enumerate(lines) if len(line) > self.max_body), None)
+                await self._write_chunk(writer, analyze_lines(lines[:over]))
+                if over is not None or len(pending) > self.max_body:
+                    raise HTTPError(413, f"note on line {lineno + 1} is over {self.max_body} bytes")
+            if pending:
+                await self._write_chunk(writer, analyze_lines([pending]))
+        except HTTPError as exc:
+            failure = str(exc)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            failure = "incomplete request body"
+        except ConnectionError:
+            return False
+
+        elapsed = time.perf_counter() - started
+        notes = histogram.count + errors
+        lat = histogram.summary()
+        summary: Dict[str, object] = {
+            "notes": notes, "errors": errors, "seconds": round(elapsed, 6),
+            "notes_per_s": round(notes / elapsed, 1) if elapsed else 0.0,
+            "latency_us": {q: round(lat[q] * 1e6, 1) for q in ("p50", "p95", "p99", "max")},
+            "kb_version": engine.kb_version, "complete": failure is None,
+        }
+        if scope is not None:
+            summary["sections"] = list(scope.sections)
+        if failure is not None:
+            summary["error"] = failure
+        try:
+            await self._write_chunk(writer, json.dumps({"summary": summary}).encode("utf-8") + b"\n")
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except ConnectionError:
+            return False
+        # After a failure the rest of the body is unread, so the connection cannot be reused
+        return keep_alive and failure is None
+
+    async def _respond(self, writer, status: int, payload: object, keep_alive: bool):
+        """Sends a JSON payload, or a str as-is (the metrics text format)."""
+        import json
+
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), METRICS_CONTENT_TYPE
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    def analyze(self, body: bytes) -> Dict[str, object]:
+        import json
+
+        try:
+            request = json.loads(body)
+        except ValueError:
+            raise HTTPError(400, "body must be a JSON object") from None
+        if not isinstance(request, dict) or not isinstance(request.get("text"), str):
+            raise HTTPError(400, "body must be a JSON object with a string 'text'")
+        mode = request.get("mode")
+        if mode is not None and mode not in MATCH_MODES:
+            raise HTTPError(400, f"'mode' must be one of {', '.join(MATCH_MODES)}")
+        top_k = request.get("top_k")
+        if top_k is not None and (not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 0):
+            raise HTTPError(400, "'top_k' must be a non-negative integer")
+        sections = request.get("sections")
+        if sections is not None and (not isinstance(sections, list) or not all(isinstance(s, str) for s in sections)):
+            raise HTTPError(400, "'sections' must be a list of section names (see /sections)")
+
+        engine = self.engine
+        try:
+            engine.scope(sections)
+        except ValueError as exc:
+            raise HTTPError(400, f"{exc} (see /sections)") from None
+        # One lookup serves both the lists and the ranking (and counts once)
+        result = engine.lookup(request["text"], mode, sections)
+        symptoms, etiologies, treatments, alerts = engine.decode(result)
+        response: Dict[str, object] = {
+            "symptoms": symptoms, "etiologies": etiologies, "treatments": treatments, "alerts": alerts,
+            "kb_version": engine.kb_version,
+        }
+        if top_k is not None:
+            response["ranked"] = [
+                {"name": r.name, "score": r.score, "symptoms": list(r.symptoms)}
+                for r in engine.rank_results([result], limit=top_k)[0]
+            ]
+        return response
+
+    def list_sections(self, body: bytes) -> Dict[str, object]:
+        engine = self.engine
+        return {
+            "sections": [{"name": c.name, "keys": len(c.keys)} for c in engine.sections],
+            "alerts": len(engine.alert_keys), "kb_version": engine.kb_version,
+        }
+
+    def metrics(self, body: bytes) -> str:
+        engine = self.engine
+        if engine.metrics is None:
+            raise HTTPError(404, "metrics are off; start with --metrics or CONSULTHEALTH_METRICS=1")
+        return metrics_text(engine, self.reloader, self.requests)
+
+    def health(self, body: bytes) -> Dict[str, object]:
+        engine, reloader = self.engine, self.reloader
+        return {
+            "status": "ok", "kb_version": engine.kb_version, "origin": engine.origin,
+            "requests": self.requests, "uptime_s": round(time.time() - self.started, 1),
+            "kb_reloads": reloader.reloads, "kb_reload_ms": round(reloader.last_reload_seconds * 1000, 1),
+            "kb_error": reloader.last_error,
+        }
+
+def run_serve(args: argparse.Namespace) -> int:
+    import asyncio
+
+    if args.kb:
+        AppConfig.KB_PATH = args.kb
+    if args.metrics:
+        AppConfig.METRICS = True
+    reloader = EngineReloader(load_engine(), AppConfig.KB_PATH, args.kb_poll).start()
+    engine = reloader.engine
+    api = ClinicalApi(engine, max_body=args.max_body, keepalive=args.keepalive, reloader=reloader)
+
+    async def serve():
+        server = await api.start(args.host, args.port)
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"serve: http://{host}:{port} (kb {engine.kb_version} from {engine.origin})", file=sys.stderr, flush=True)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def run_loadtest(args: argparse.Namespace) -> int:
+    """Drives POST /analyze over keep-alive connections and reports throughput and tail latency."""
+    import asyncio
+    import json
+    import subprocess
+
+    server = None
+    host, port = args.host, args.port
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve", "--host", host, "--port", "0"],
+                                  stderr=subprocess.PIPE, text=True)
+        banner = server.stderr.readline()
+        match = re.search(r"http://([^:]+):(\d+)", banner)
+        if match is None:
+            server.kill()
+            print(f"loadtest: server did not start: {banner.strip()}", file=sys.stderr)
+            return 1
+        host, port = match.group(1), int(match.group(2))
+
+    generator = NoteGenerator(ClinicalData(), args.seed)
+    bodies = [json.dumps({"text": generator.note(args.length)}).encode("utf-8")
+              for _ in range(min(args.requests, args.distinct))]
+    histogram = LatencyHistogram()
+    statuses: Dict[int, int] = {}
+
+    async def client(first: int, count: int):
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in range(first, first + count):
+                body = bodies[i % len(bodies)]
+                started = time.perf_counter()
+                writer.write(b"POST /analyze HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\n\r\n%s" % (host.encode(), len(body), body))
+                await writer.drain()
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = int(re.search(rb"(?i)content-length:\s*(\d+)", head).group(1))
+                await reader.readexactly(length)
+                histogram.observe(time.perf_counter() - started)
+                status = int(head.split(b" ", 2)[1])
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+
+    async def drive():
+        share, extra = divmod(args.requests, args.concurrency)
+        counts = [share + (1 if c < extra else 0) for c in range(args.concurrency)]
+        starts = [sum(counts[:c]) for c in range(args.concurrency)]
+        await asyncio.gather(*(client(s, n) for s, n in zip(starts, counts) if n))
+
+    try:
+        started = time.perf_counter()
+        asyncio.run(drive())
+        elapsed = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    lat = histogram.summary()
+    failed = sum(n for status, n in statuses.items() if status != 200)
+    print(
+        f"loadtest: {histogram.count} requests over {args.concurrency} keep-alive connection(s) in {elapsed:.2f}s "
+        f"= {histogram.count / elapsed if elapsed else 0:.0f} req/s | latency p50 {lat['p50'] * 1000:.2f}ms "
+        f"p95 {lat['p95'] * 1000:.2f}ms p99 {lat['p99'] * 1000:.2f}ms max {lat['max'] * 1000:.2f}ms | "
+        f"{failed} non-200 | {args.length}-char notes"
+    )
+    return 1 if failed else 0
+
+# -----------------------------------------------------------------------------
+# CLI
+# -----------------------------------------------------------------------------
+def build_cli() -> argparse.ArgumentParser:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="consulthealth.py",
+        description="Headless tools for the Consult Health engine (the UI runs via `streamlit run`).",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="analyze JSONL notes, stream JSONL results to stdout")
+    batch.add_argument("input", nargs="?", default="-", help="JSONL file (default: stdin)")
+    batch.add_argument("--field", default="text", help="JSON field holding the note text")
+    batch.add_argument("--ids", action="store_true", help="emit integer IDs instead of names")
+    batch.add_argument("--workers", type=int, default=1, help="worker processes (default: 1, in-process)")
+    batch.add_argument("--chunk-size", type=int, default=500, help="notes per work unit (default: 500)")
+    batch.add_argument("--mode", choices=MATCH_MODES, default=AppConfig.MATCH_MODE, help="keyword match mode")
+    batch.set_defaults(func=run_batch)
+
+    scale = commands.add_parser("scale", help="scaling report for the batch pipeline over 1..N workers")
+    scale.add_argument("input", help="JSONL file")
+    scale.add_argument("--field", default="text", help="JSON field holding the note text")
+    scale.add_argument("--max-workers", type=int, default=0, help="largest worker count (default: CPU count)")
+    scale.add_argument("--chunk-size", type=int, default=500, help="notes per work unit (default: 500)")
+    scale.set_defaults(func=run_scale)
+
+    compile_ = commands.add_parser("compile", help="write the precompiled KB snapshot")
+    compile_.add_argument("--output", default=AppConfig.SNAPSHOT_PATH or "consulthealth.kb")
+    compile_.set_defaults(func=run_compile)
+
+    coldstart = commands.add_parser("coldstart", help="measure cold start with and without the snapshot")
+    coldstart.add_argument("--snapshot", default=AppConfig.SNAPSHOT_PATH or "consulthealth.kb")
+    coldstart.add_argument("--runs", type=int, default=7)
+    coldstart.set_defaults(func=run_coldstart)
+
+    importtime = commands.add_parser("importtime", help="-X importtime breakdown of `import consulthealth`")
+    importtime.add_argument("--runs", type=int, default=5)
+    importtime.add_argument("--top", type=int, default=15, help="number of modules to list")
+    importtime.set_defaults(func=run_importtime)
+
+    generate = commands.add_parser("generate", help="write a seeded synthetic KB (JSON) or notes (JSONL)")
+    generate.add_argument("what", choices=("kb", "notes"))
+    generate.add_argument("--keys", type=int, default=0, help="symptom keys in the KB (default: shipped KB)")
+    generate.add_argument("--count", type=int, default=1000, help="notes to write")
+    generate.add_argument("--length", type=int, default=1000, help="characters per note")
+    generate.add_argument("--density", type=float, default=0.15, help="share of phrases that are KB keys")
+    generate.add_argument("--overlap", type=float, default=0.1, help="share of key mentions containing another key")
+    generate.add_argument("--seed", type=int, default=7)
+    generate.add_argument("--output", "-o", default="-", help="output file (default: stdout)")
+    generate.set_defaults(func=run_generate)
+
+    serve = commands.add_parser("serve", help="JSON HTTP API over one shared engine")
+    serve.add_argument("--host", default=AppConfig.API_HOST)
+    serve.add_argument("--port", type=int, default=AppConfig.API_PORT, help="0 picks a free port")
+    serve.add_argument("--max-body", type=int, default=AppConfig.API_MAX_BODY, help="request body limit in bytes")
+    serve.add_argument("--keepalive", type=float, default=AppConfig.API_KEEPALIVE_SECONDS,
+                       help="idle seconds before a keep-alive connection is closed")
+    serve.add_argument("--kb", default=AppConfig.KB_PATH,
+                       help="external KB file (JSON/YAML) to serve and hot-reload (default: built-in KB)")
+    serve.add_argument("--kb-poll", type=float, default=AppConfig.KB_POLL_SECONDS,
+                       help="seconds between checks of the KB file")
+    serve.add_argument("--metrics", action="store_true", default=AppConfig.METRICS,
+                       help="record metrics and serve them at GET /metrics (Prometheus text format)")
+    serve.set_defaults(func=run_serve)
+
+    loadtest = commands.add_parser("loadtest", help="load-test the HTTP API (req/s and tail latency)")
+    loadtest.add_argument("--host", default=AppConfig.API_HOST)
+    loadtest.add_argument("--port", type=int, default=AppConfig.API_PORT)
+    loadtest.add_argument("--spawn", action="store_true", help="start a server for the run instead of using one")
+    loadtest.add_argument("--requests", type=int, default=5000)
+    loadtest.add_argument("--concurrency", type=int, default=16, help="keep-alive connections")
+    loadtest.add_argument("--length", type=int, default=1000, help="characters per synthetic note")
+    loadtest.add_argument("--distinct", type=int, default=1000, help="distinct notes (the rest repeat)")
+    loadtest.add_argument("--seed", type=int, default=7)
+    loadtest.set_defaults(func=run_loadtest)
+
+    bench = commands.add_parser("bench", help="run engine micro-benchmarks")
+    bench.add_argument("names", nargs="*", metavar="name",
+                       help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    bench.add_argument("--lengths", type=int, nargs="+",
+                       help=f"note lengths in characters (default: {BENCH_LENGTHS}; engine: {ENGINE_LENGTHS})")
+    bench.add_argument("--repeat", type=int, default=5, help="best-of repeats per measurement")
+    bench.add_argument("--etiologies", type=int, nargs="+", default=[0, 10_000, 50_000],
+                       help="synthetic etiologies added to the KB (reverse)")
+    bench.add_argument("--notes", type=int, default=200, help="notes per batch (ranking)")
+    bench.add_argument("--kb-keys", type=int, nargs="+", default=[0, 10_000, 100_000],
+                       help="symptom keys in synthetic KBs, 0 = shipped KB (engine)")
+    bench.add_argument("--render-keys", type=int, nargs="+", default=[5, 40, 200],
+                       help="symptom/alert keys named in the analyzed note (render)")
+    bench.add_argument("--sections", nargs="+", metavar="SECTION",
+                       help="KB section names to scope to (sections; default: pediatrics, ophthalmology, both)")
+    bench.add_argument("--json", metavar="PATH", help="also write results and run metadata as JSON")
+    bench.add_argument("--baseline", metavar="PATH", help="compare with an earlier --json file")
+    bench.add_argument("--top-k", type=int, default=AppConfig.ETIOLOGY_PAGE_SIZE, help="etiologies kept (ranking)")
+    bench.add_argument("--seed", type=int, default=7)
+    bench.set_defaults(func=run_bench)
+    return parser
+
+CLI_COMMANDS = ("batch", "scale", "compile", "coldstart", "importtime", "generate", "serve", "loadtest", "bench")
+
+def cli(argv: List[str]) -> int:
+    args = build_cli().parse_args(argv)
+    return args.func(args)
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS + ("-h", "--help"):
+        sys.exit(cli(sys.argv[1:]))
     main()
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import consulthealth  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def kb():
+    return consulthealth.ClinicalData()
+
+
+@pytest.fixture(scope="session")
+def engine(kb):
+    return consulthealth.ClinicalEngine(kb)
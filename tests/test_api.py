@@ -0,0 +1,210 @@
+import asyncio
+import json
+
+import pytest
+
+from consulthealth import ClinicalApi
+
+
+def request(engine, raw: bytes, **kwargs) -> bytes:
+    """Sends raw HTTP bytes to a fresh ClinicalApi and returns everything it answers."""
+
+    async def run():
+        api = ClinicalApi(engine, **kwargs)
+        server = await api.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(raw)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), 10)
+            writer.close()
+            return response
+
+    return asyncio.run(run())
+
+
+def post(path: str, body: bytes, close: bool = True, chunked: bool = False) -> bytes:
+    connection = "Connection: close\r\n" if close else ""
+    if chunked:
+        framed = b"".join(b"%x\r\n%s\r\n" % (len(piece), piece) for piece in (body[:7], body[7:]) if piece)
+        return (f"POST {path} HTTP/1.1\r\nHost: t\r\n{connection}"
+                f"Transfer-Encoding: chunked\r\n\r\n").encode() + framed + b"0\r\n\r\n"
+    return f"POST {path} HTTP/1.1\r\nHost: t\r\n{connection}Content-Length: {len(body)}\r\n\r\n".encode() + body
+
+
+def parse(response: bytes):
+    head, _, body = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    if b"transfer-encoding: chunked" in head.lower():
+        data = b""
+        while True:
+            size, _, rest = body.partition(b"\r\n")
+            size = int(size, 16)
+            if not size:
+                break
+            data, body = data + rest[:size], rest[size + 2:]
+        body = data
+    return status, body
+
+
+def ndjson(body: bytes):
+    records = [json.loads(line) for line in body.decode().splitlines() if line]
+    return records[:-1], records[-1]["summary"]
+
+
+def test_analyze_matches_the_engine(engine):
+    status, body = parse(request(engine, post("/analyze", b'{"text": "Chest pain and fever"}')))
+    response = json.loads(body)
+    symptoms, etiologies, treatments, alerts = engine.analyze("Chest pain and fever")
+    assert status == 200
+    assert response == {"symptoms": symptoms, "etiologies": etiologies, "treatments": treatments,
+                        "alerts": alerts, "kb_version": engine.kb_version}
+
+
+def test_analyze_with_mode_and_top_k(engine):
+    payload = {"text": "feverish, cough", "mode": "substring", "top_k": 2}
+    status, body = parse(request(engine, post("/analyze", json.dumps(payload).encode())))
+    response = json.loads(body)
+    assert status == 200
+    assert "fever" in response["symptoms"]
+    assert [r["name"] for r in response["ranked"]] == [
+        r.name for r in engine.rank_etiologies("feverish, cough", mode="substring", limit=2)]
+
+
+@pytest.mark.parametrize("body, message", [
+    (b"not json", "JSON object"),
+    (b'{"text": 5}', "string 'text'"),
+    (b'{"text": "x", "mode": "fuzzy"}', "'mode'"),
+    (b'{"text": "x", "top_k": -1}', "'top_k'"),
+])
+def test_bad_requests_are_400(engine, body, message):
+    status, body = parse(request(engine, post("/analyze", body)))
+    assert status == 400
+    assert message in json.loads(body)["error"]
+
+
+def test_routing_errors(engine):
+    assert parse(request(engine, post("/nope", b"")))[0] == 404
+    assert parse(request(engine, b"GET /analyze HTTP/1.1\r\nConnection: close\r\n\r\n"))[0] == 405
+
+
+def test_body_over_limit_is_413(engine):
+    status, _ = parse(request(engine, post("/analyze", b'{"text": "' + b"x" * 100 + b'"}'), max_body=64))
+    assert status == 413
+
+
+@pytest.mark.parametrize("path", ["/analyze", "/analyze/bulk"])
+@pytest.mark.parametrize("length", ["-1", "+2", "abc", "1_0", ""])
+def test_bad_content_length_is_400(engine, path, length):
+    raw = f"POST {path} HTTP/1.1\r\nHost: t\r\nContent-Length: {length}\r\n\r\n{{}}".encode()
+    status, body = parse(request(engine, raw))
+    assert status == 400
+    assert b"invalid Content-Length" in body
+
+
+def test_keepalive_serves_requests_in_sequence(engine):
+    raw = post("/analyze", b'{"text": "rash"}', close=False) + b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n"
+    first, second = request(engine, raw).split(b"HTTP/1.1 ")[1:]
+    assert first.startswith(b"200") and b"keep-alive" in first
+    health = json.loads(parse(b"HTTP/1.1 " + second)[1])
+    assert health["status"] == "ok" and health["requests"] == 1
+
+
+NOTES = b'"fever and rash"\n{"id": "n2", "text": "chest pain"}\nnot json\n\n{"id": 4}\n"croup cough"'
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_bulk_streams_results_and_summary(engine, chunked):
+    status, body = parse(request(engine, post("/analyze/bulk", NOTES, chunked=chunked)))
+    results, summary = ndjson(body)
+    assert status == 200
+    assert [r["id"] for r in results] == [1, "n2", 3, 5, 6]
+    assert results[0]["symptoms"] == engine.analyze("fever and rash")[0]
+    assert results[1]["alerts"] == engine.analyze("chest pain")[3]
+    assert "invalid JSON" in results[2]["error"]
+    assert "expected a string" in results[3]["error"]
+    assert summary["notes"] == 5 and summary["errors"] == 2
+    assert summary["complete"] is True and "error" not in summary
+    assert summary["kb_version"] == engine.kb_version
+
+
+def test_bulk_ids_and_field(engine):
+    status, body = parse(request(engine, post("/analyze/bulk?ids=1&field=note", b'{"note": "croup cough"}\n')))
+    (result,), _ = ndjson(body)
+    assert status == 200
+    assert [engine.symptom_keys[i] for i in result["symptoms"]] == engine.analyze("croup cough")[0]
+
+
+def test_bulk_partial_line_over_limit_fails_the_stream(engine):
+    body = b'"fever"\n"' + b"x" * 200
+    status, body = parse(request(engine, post("/analyze/bulk", body), max_body=64))
+    results, summary = ndjson(body)
+    assert status == 200
+    assert [r["id"] for r in results] == [1]
+    assert summary["complete"] is False
+    assert summary["error"] == "note on line 2 is over 64 bytes"
+
+
+def test_bulk_complete_line_over_limit_fails_the_stream(engine):
+    body = b'"fever"\n"' + b"x" * 200 + b'"\n"rash"\n'
+    status, body = parse(request(engine, post("/analyze/bulk", body), max_body=64))
+    results, summary = ndjson(body)
+    assert status == 200
+    assert [r["id"] for r in results] == [1]
+    assert summary["complete"] is False
+    assert summary["error"] == "note on line 2 is over 64 bytes"
+
+
+def test_bulk_truncated_body_is_reported(engine):
+    raw = post("/analyze/bulk", b'"fever"\n"rash"\n')[:-3]
+    status, body = parse(request(engine, raw.replace(b"Content-Length: 15", b"Content-Length: 40"), keepalive=0.5))
+    _, summary = ndjson(body)
+    assert summary["complete"] is False
+    assert summary["error"] == "incomplete request body"
+
+
+def test_bulk_rejects_unsupported_transfer_encoding(engine):
+    raw = b"POST /analyze/bulk HTTP/1.1\r\nHost: t\r\nTransfer-Encoding: gzip\r\n\r\n"
+    status, _ = parse(request(engine, raw))
+    assert status == 501
+
+
+def test_analyze_with_sections_and_top_k(engine):
+    payload = {"text": "croup cough, blurred vision", "sections": ["SECTION 15: PEDIATRICS SPECIFIC"], "top_k": 1}
+    status, body = parse(request(engine, post("/analyze", json.dumps(payload).encode())))
+    response = json.loads(body)
+    assert status == 200
+    assert response["symptoms"] == ["croup cough"]
+    assert len(response["ranked"]) == 1
+
+
+@pytest.mark.parametrize("sections", [["nope"], "SECTION 15: PEDIATRICS SPECIFIC"])
+def test_analyze_rejects_bad_sections(engine, sections):
+    payload = {"text": "fever", "sections": sections}
+    status, body = parse(request(engine, post("/analyze", json.dumps(payload).encode())))
+    assert status == 400
+    assert "/sections" in json.loads(body)["error"]
+
+
+def test_sections_lists_the_kb_sections(engine, kb):
+    status, body = parse(request(engine, b"GET /sections HTTP/1.1\r\nConnection: close\r\n\r\n"))
+    response = json.loads(body)
+    assert status == 200
+    assert [s["name"] for s in response["sections"]] == list(kb.SECTIONS)
+    assert [s["keys"] for s in response["sections"]] == [len(t) for t in kb.SECTIONS.values()]
+
+
+def test_bulk_section_scope(engine):
+    path = "/analyze/bulk?ids=1&section=SECTION%2015%3A%20PEDIATRICS%20SPECIFIC"
+    status, body = parse(request(engine, post(path, b'"croup cough and blurred vision"\n')))
+    (result,), summary = ndjson(body)
+    assert status == 200
+    assert [engine.symptom_keys[i] for i in result["symptoms"]] == ["croup cough"]
+    assert summary["sections"] == ["SECTION 15: PEDIATRICS SPECIFIC"]
+
+
+def test_bulk_unknown_section_is_a_400(engine):
+    status, body = parse(request(engine, post("/analyze/bulk?section=nope", b'"fever"\n')))
+    assert status == 400
+    assert "unknown section" in json.loads(body)["error"]
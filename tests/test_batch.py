@@ -0,0 +1,37 @@
+NOTES = [
+    "Severe chest pain radiating to the left arm",
+    "fever, rash and sore throat",
+    "no complaints today",
+    "fever, rash and sore throat",
+    "Seizure with high fever in infant",
+]
+
+
+def test_batch_matches_single_analysis(engine):
+    report = engine.analyze_batch(NOTES)
+    assert report.notes == len(NOTES) and report.counts is None
+    assert [engine.decode(r) for r in report.results] == [engine.analyze(n) for n in NOTES]
+
+
+def test_batch_aggregate_counts_hits(engine):
+    report = engine.analyze_batch(NOTES, aggregate=True)
+    assert report.results is None
+    results = engine.analyze_batch(NOTES).results
+    for field, tally in report.counts.items():
+        expected = [0] * len(tally)
+        for result in results:
+            for i in getattr(result, field):
+                expected[i] += 1
+        assert tally == expected
+    assert report.counts["symptoms"][engine.symptom_keys.index("rash")] == 2
+
+
+def test_dedupe_is_opt_in_and_bounded(engine):
+    notes = ["fever", "rash", "cough", "fever"]
+    plain = engine.analyze_batch(notes).results
+    assert plain[0] == plain[3] and plain[0] is not plain[3]
+    deduped = engine.analyze_batch(notes, dedupe=4).results
+    assert deduped == plain and deduped[0] is deduped[3]
+    # Two remembered notes: "fever" was evicted by "rash" and "cough"
+    bounded = engine.analyze_batch(notes, dedupe=2).results
+    assert bounded == plain and bounded[0] is not bounded[3]
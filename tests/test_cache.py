@@ -0,0 +1,60 @@
+import consulthealth
+from consulthealth import ClinicalEngine, ResultCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(maxsize=2)
+    cache.put("v1", "a", 1)
+    cache.put("v1", "b", 2)
+    assert cache.get("v1", "a") == 1
+    cache.put("v1", "c", 3)
+    assert cache.get("v1", "b") is None
+    assert (cache.get("v1", "a"), cache.get("v1", "c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_new_kb_version_invalidates_entries():
+    cache = ResultCache(maxsize=4)
+    cache.put("v1", "a", 1)
+    assert cache.get("v2", "a") is None
+    cache.put("v2", "a", 2)
+    assert cache.get("v2", "a") == 2
+    stats = cache.stats()
+    assert (stats["size"], stats["invalidations"]) == (1, 1)
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(consulthealth.time, "monotonic", lambda: now[0])
+    cache = ResultCache(maxsize=4, ttl=5)
+    cache.put("v1", "a", 1)
+    assert cache.get("v1", "a") == 1
+    now[0] += 6
+    assert cache.get("v1", "a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_zero_size_cache_stores_nothing():
+    cache = ResultCache(maxsize=0)
+    cache.put("v1", "a", 1)
+    assert cache.get("v1", "a") is None
+
+
+def test_lookup_hits_on_whitespace_and_case_variants(kb):
+    engine = ClinicalEngine(kb, cache=ResultCache(maxsize=8))
+    first = engine.lookup("Fever and  rash")
+    assert engine.lookup("fever AND rash\n") is first
+    stats = engine.cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+    assert engine.decode(first) == engine.analyze("fever and rash")
+
+
+def test_cache_keys_are_fixed_size_digests(kb):
+    engine = ClinicalEngine(kb, cache=ResultCache(maxsize=8))
+    note = "fever and rash " * 20000
+    engine.lookup(note)
+    engine.lookup(note, sections=["SECTION 7: DERMATOLOGY"])
+    keys = list(engine.cache._entries)
+    assert len(keys) == 2
+    assert all("fever" not in key and len(key) < 100 for key in keys)
+    assert engine.lookup(" " + note.upper()) is engine.lookup(note)
@@ -0,0 +1,44 @@
+import json
+
+from consulthealth import cli
+
+NOTES = ['"fever and rash"', '{"id": "n2", "text": "chest pain"}', "not json", "", '{"id": 4}']
+
+
+def run_batch(capsys, tmp_path, *args):
+    path = tmp_path / "notes.jsonl"
+    path.write_text("\n".join(NOTES) + "\n", encoding="utf-8")
+    assert cli(["batch", str(path), *args]) == 0
+    out, err = capsys.readouterr()
+    return [json.loads(line) for line in out.splitlines()], err
+
+
+def test_batch_streams_one_record_per_note(engine, capsys, tmp_path):
+    records, err = run_batch(capsys, tmp_path)
+    assert [r["id"] for r in records] == [1, "n2", 3, 5]
+    symptoms, etiologies, treatments, alerts = engine.analyze("fever and rash")
+    assert records[0] == {"id": 1, "symptoms": symptoms, "etiologies": etiologies,
+                          "treatments": treatments, "alerts": alerts}
+    assert records[1]["alerts"] == engine.analyze("chest pain")[3]
+    assert "invalid JSON" in records[2]["error"]
+    assert "expected a string" in records[3]["error"]
+    assert err.startswith("batch: 4 notes (2 errors)")
+
+
+def test_batch_ids_decode_to_names(engine, capsys, tmp_path):
+    records, _ = run_batch(capsys, tmp_path, "--ids")
+    result = records[0]
+    assert [engine.symptom_keys[i] for i in result["symptoms"]] == engine.analyze("fever and rash")[0]
+    assert [engine.etiology_names[i] for i in result["etiologies"]] == engine.analyze("fever and rash")[1]
+
+
+def test_parallel_batch_keeps_input_order(capsys, tmp_path):
+    path = tmp_path / "notes.jsonl"
+    notes = [{"id": i, "text": text} for i, text in enumerate(["fever", "chest pain", "rash", "seizure", "cough"] * 8)]
+    path.write_text("".join(json.dumps(n) + "\n" for n in notes), encoding="utf-8")
+    assert cli(["batch", str(path)]) == 0
+    serial = capsys.readouterr().out
+    assert cli(["batch", str(path), "--workers", "3", "--chunk-size", "3"]) == 0
+    parallel = capsys.readouterr().out
+    assert parallel == serial
+    assert [json.loads(line)["id"] for line in parallel.splitlines()] == list(range(len(notes)))
@@ -0,0 +1,39 @@
+import pytest
+
+from consulthealth import MATCH_MODES, ClinicalData, ClinicalEngine, KBCompiler, merge_sections
+
+DERMATOLOGY = "SECTION 7: DERMATOLOGY"
+
+
+def edited(kb):
+    sections = {name: dict(table) for name, table in kb.SECTIONS.items()}
+    sections[DERMATOLOGY]["zorblax rash"] = ["Zorblax"]
+    return ClinicalData(SECTIONS=sections, ALERTS=kb.ALERTS, MEDS=kb.MEDS, ALIASES=kb.ALIASES)
+
+
+def test_sections_merge_into_the_symptom_table(kb):
+    assert kb.SYMPTOMS == merge_sections(kb.SECTIONS)
+    assert merge_sections({"a": {"x": ["1"]}, "b": {"x": ["2"], "y": ["3"]}}) == {"x": ["2"], "y": ["3"]}
+
+
+def test_unchanged_sections_are_reused(kb):
+    compiler = KBCompiler()
+    compiler.compile(kb)
+    assert all(r.rebuilt for r in compiler.report)
+    compiler.compile(kb)
+    assert not any(r.rebuilt for r in compiler.report)
+    compiler.compile(edited(kb))
+    assert [r.name for r in compiler.report if r.rebuilt] == [DERMATOLOGY]
+
+
+@pytest.mark.parametrize("mode", MATCH_MODES)
+def test_incremental_compile_matches_full_build(kb, mode):
+    compiler = KBCompiler()
+    compiler.compile(kb)
+    data = edited(kb)
+    incremental, full = compiler.compile(data), ClinicalEngine(data)
+    assert incremental.kb_version == full.kb_version == data.version()
+    note = "zorblax rash, high fever and chest pian"
+    assert incremental.analyze(note, mode) == full.analyze(note, mode)
+    assert incremental.corrections(note, mode) == full.corrections(note, mode)
+    assert incremental.rank_etiologies(note, mode=mode) == full.rank_etiologies(note, mode=mode)
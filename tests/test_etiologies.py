@@ -0,0 +1,75 @@
+import pytest
+
+from consulthealth import NameSearchIndex, tokenize
+
+
+def test_profiles_match_a_forward_scan(kb, engine):
+    for name in engine.etiology_names:
+        profile = engine.etiology_profile(name.upper())
+        symptoms = tuple(k for k in engine.symptom_keys if name in kb.SYMPTOMS[k])
+        assert profile.name == name
+        assert profile.symptoms == symptoms
+        assert profile.alerts == tuple(k for k in symptoms if k in kb.ALERTS)
+        assert len(profile.treatments) == sum(k in kb.MEDS for k in symptoms)
+    assert engine.etiology_profile("no such etiology") is None
+
+
+def test_search_matches_every_query_word_as_a_prefix(engine):
+    for query in ["pulm emb", "a", "my in", "zzz", ""]:
+        words = tokenize(query)
+        expected = [n for n in engine.etiology_names
+                    if words and all(any(w.startswith(q) for w in tokenize(n.lower())) for q in words)]
+        assert engine.search_etiologies(query, limit=len(engine.etiology_names)) == expected
+    assert len(engine.search_etiologies("a", limit=3)) == 3
+
+
+def test_name_index_short_and_long_prefixes():
+    index = NameSearchIndex(["Acute Otitis", "Acne", "Otitis Externa"])
+    assert index.search("ac") == 0b011
+    assert index.search("otit ext") == 0b100
+    assert index.search("acute otitis media") == 0
+
+
+NOTES = ["fever, cough and sore throat", "chest pain with shortness of breath and sweating", "rash", "nothing"]
+
+
+def brute_force_rank(kb, engine, text, weights):
+    symptoms = engine.analyze(text)[0]
+    scores = {}
+    for key in symptoms:
+        for name in set(kb.SYMPTOMS[key]):
+            scores[name] = scores.get(name, 0.0) + weights.get(key, 1.0)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+@pytest.mark.parametrize("weights", [{}, {"fever": 3.0, "chest pain": 0.5}])
+def test_ranking_matches_brute_force(kb, engine, weights):
+    for text in NOTES:
+        ranked = engine.rank_etiologies(text, weights)
+        assert [(r.name, r.score) for r in ranked] == brute_force_rank(kb, engine, text, weights)
+        for r in ranked:
+            assert set(r.symptoms) == {k for k in engine.analyze(text)[0] if r.name in kb.SYMPTOMS[k]}
+
+
+def test_rank_batch_matches_single_notes(engine):
+    assert engine.rank_batch(NOTES) == [engine.rank_etiologies(text) for text in NOTES]
+
+
+def test_rank_rejects_bad_weights_and_backends(engine):
+    with pytest.raises(ValueError, match="positive"):
+        engine.rank_etiologies("fever", {"fever": 0})
+    with pytest.raises(ValueError, match="unknown rank backend"):
+        engine.rank_results([engine.lookup("fever")], backend="gpu")
+
+
+@pytest.mark.parametrize("k", [0, 1, 3, 1000])
+def test_heap_top_k_is_the_sorted_prefix(engine, k):
+    for text in NOTES:
+        full = engine.rank_etiologies(text)
+        assert engine.rank_etiologies(text, limit=k) == full[:k]
+        assert engine.analyze(text, top_k=k)[1] == [r.name for r in full[:k]]
+
+
+def test_negative_limit_is_rejected(engine):
+    with pytest.raises(ValueError, match="non-negative"):
+        engine.rank_etiologies("fever", limit=-1)
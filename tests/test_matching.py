@@ -0,0 +1,124 @@
+import random
+
+import pytest
+
+from consulthealth import MATCH_MODES, KeywordMatcher, TokenTrie
+
+FILLER = ["patient", "reports", "since", "yesterday", "and", "with", "mild", "no", "history", "of", "the"]
+
+
+def per_key_scan(kb, text):
+    """The original analyze(): a substring test per key, in knowledge-base order."""
+    text = text.lower()
+    symptoms = [k for k in kb.SYMPTOMS if k in text]
+    etiologies = sorted({c for k in symptoms for c in kb.SYMPTOMS[k]})
+    treatments = [f"**{k.title()}**: {kb.MEDS[k]}" for k in symptoms if k in kb.MEDS]
+    alerts = [msg for k, msg in kb.ALERTS.items() if k in text]
+    return symptoms, etiologies, treatments, alerts
+
+
+def random_note(kb, seed, words=300):
+    rng = random.Random(seed)
+    keys = list(kb.SYMPTOMS) + list(kb.ALERTS)
+    picks = [rng.choice(keys) if rng.random() < 0.2 else rng.choice(FILLER) for _ in range(words)]
+    return " ".join(p.upper() if rng.random() < 0.1 else p for p in picks)
+
+
+def test_matcher_finds_overlapping_keywords():
+    matcher = KeywordMatcher(["he", "she", "his", "hers"])
+    assert {matcher.keywords[i] for i in matcher.find("ushers")} == {"he", "she", "hers"}
+    assert matcher.find("xyz") == set()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_substring_mode_matches_per_key_scan(kb, engine, seed):
+    note = random_note(kb, seed)
+    assert engine.analyze(note, mode="substring") == per_key_scan(kb, note)
+
+
+def test_only_substring_mode_matches_inside_words(kb, engine):
+    assert engine.analyze("Feverish", mode="substring") == per_key_scan(kb, "Feverish")
+    assert engine.analyze("Feverish", mode="longest") == ([], [], [], [])
+    assert engine.analyze("Feverish", mode="overlap") == ([], [], [], [])
+
+
+def test_trie_matches_whole_words_only():
+    trie = TokenTrie(["chest pain", "pain", "chest"])
+    spans = trie.scan(trie.encode("chest-pain, painful chest"), longest=False)
+    assert [(start, end) for start, end, _ in spans] == [(0, 1), (0, 2), (1, 2), (3, 4)]
+
+
+def test_longest_suppresses_nested_keys(engine):
+    assert engine.analyze("high fever", mode="longest")[0] == ["high fever"]
+    assert set(engine.analyze("high fever", mode="overlap")[0]) == {"high fever", "fever"}
+
+
+@pytest.mark.parametrize("mode", MATCH_MODES)
+def test_batch_modes_match_single_analysis(kb, engine, mode):
+    notes = [random_note(kb, seed) for seed in range(5)]
+    report = engine.analyze_batch(notes, mode=mode)
+    assert [engine.decode(r) for r in report.results] == [engine.analyze(n, mode) for n in notes]
+
+
+def test_unknown_mode_is_rejected(engine):
+    with pytest.raises(ValueError, match="unknown match mode"):
+        engine.analyze("fever", mode="fuzzy")
+
+
+def test_corrections_suggest_misspelled_keys_only(engine):
+    found = {(c.key, c.surface, c.distance) for c in engine.corrections("chest pian and fevr with rash")}
+    assert found == {("chest pain", "chest pian", 1), ("fever", "fevr", 1)}
+    # Suggestions never change analyze() results, and exact matches are not repeated
+    assert engine.analyze("chest pian and fevr with rash")[0] == ["rash"]
+    assert engine.corrections("fever and chest pain") == []
+
+
+def test_corrections_skip_common_words(engine):
+    assert engine.corrections("never felt like this before") == []
+
+
+@pytest.mark.parametrize("mode", ["longest", "overlap"])
+def test_alias_maps_to_canonical_key(engine, mode):
+    symptoms = engine.analyze("pt c/o SOB since morning", mode=mode)[0]
+    assert "shortness of breath" in symptoms
+    assert ("shortness of breath", "sob") in {(t.key, t.surface) for t in engine.terms("SOB", mode=mode)}
+
+
+@pytest.mark.parametrize("note", ["LOC: alert and oriented x3", "Patient: John Doe, seen today"])
+def test_ambiguous_abbreviations_are_not_aliases(engine, note):
+    assert engine.analyze(note) == ([], [], [], [])
+
+
+def test_aliases_never_raise_alerts(kb, engine):
+    symptoms, _, _, alerts = engine.analyze("pt c/o SOB and CP, one sz")
+    assert symptoms == [k for k in kb.SYMPTOMS if k in ("shortness of breath", "chest pain", "seizure")]
+    assert alerts == []
+    assert engine.analyze("shortness of breath")[3] == [kb.ALERTS["shortness of breath"]]
+    assert all(engine._alert_slot[i] < 0 for i in range(len(engine._keywords), len(engine._canonical)))
+
+
+def test_aliases_are_whole_words(engine):
+    assert "shortness of breath" not in engine.analyze("sobbing", mode="longest")[0]
+
+
+@pytest.mark.parametrize("note, symptoms, alerts", [
+    ("high fever in infant", ["high fever"], ["fever in infant"]),
+    ("fever in infant", ["fever"], ["fever in infant"]),
+    ("severe headache", ["headache"], ["severe headache"]),
+    ("worst headache of life", ["headache"], ["worst headache of life"]),
+    ("tearing chest pain", ["tearing chest pain", "chest pain"], ["chest pain", "tearing chest pain"]),
+])
+def test_longest_never_hides_alerts_or_symptoms_under_alerts(kb, engine, note, symptoms, alerts):
+    found, etiologies, treatments, messages = engine.analyze(note, mode="longest")
+    assert sorted(found) == sorted(symptoms)
+    assert etiologies == sorted({c for k in symptoms for c in kb.SYMPTOMS[k]})
+    assert len(treatments) == sum(k in kb.MEDS for k in symptoms)
+    assert messages == [kb.ALERTS[k] for k in kb.ALERTS if k in alerts]
+    assert {t.key for t in engine.terms(note, mode="longest")} == set(symptoms) | set(alerts)
+
+
+def test_longest_keeps_alerts_inside_longer_alerts():
+    trie = TokenTrie(["fever in infant", "high fever in infant", "fever"],
+                     covers=[False, False, True], coverable=[False, False, True])
+    assert trie.find("high fever in infant") == {0, 1, 2}
+    assert trie.find("high fever in infant", longest=False) == {0, 1, 2}
@@ -0,0 +1,66 @@
+import json
+
+import consulthealth
+from consulthealth import ClinicalData, ClinicalEngine, EngineMetrics, EngineReloader, ResultCache, metrics_text
+
+
+def metered(data):
+    engine = ClinicalEngine(data, cache=ResultCache(maxsize=16))
+    engine.metrics = EngineMetrics(engine.symptom_keys, engine.alert_keys)
+    return engine
+
+
+def samples(text):
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def test_metrics_count_notes_and_key_hits(kb):
+    engine = metered(kb)
+    engine.analyze("chest pain and fever")
+    engine.analyze("Chest pain and fever")
+    engine.analyze("rash")
+    values = samples(metrics_text(engine, requests=7))
+    assert values["consulthealth_analyze_total"] == "3"
+    assert values['consulthealth_analyze_seconds_bucket{le="+Inf"}'] == "3"
+    assert values['consulthealth_symptom_matches_total{key="fever"}'] == "2"
+    assert values['consulthealth_symptom_matches_total{key="rash"}'] == "1"
+    assert values['consulthealth_alert_hits_total{key="chest pain"}'] == "2"
+    assert values["consulthealth_cache_hits_total"] == "1"
+    assert values["consulthealth_api_requests_total"] == "7"
+    assert values[f'consulthealth_kb_info{{version="{engine.kb_version}",origin="source"}}'] == "1"
+    assert not any(k.startswith("consulthealth_symptom_matches_total") and "cough" in k for k in values)
+
+
+def test_histogram_buckets_are_cumulative(kb):
+    engine = metered(kb)
+    for text in ("fever", "cough", "rash"):
+        engine.analyze(text)
+    values = samples(metrics_text(engine))
+    counts = [int(v) for k, v in values.items() if k.startswith("consulthealth_analyze_seconds_bucket")]
+    assert counts == sorted(counts) and counts[-1] == 3
+
+
+def test_metrics_are_absent_when_off(kb):
+    engine = ClinicalEngine(kb)
+    engine.metrics = None
+    text = metrics_text(engine)
+    assert "consulthealth_analyze_total" not in text
+    assert "consulthealth_cache_entries" in text
+
+
+def test_label_values_are_escaped():
+    assert consulthealth._label('a "b"\\c\nd') == 'a \\"b\\"\\\\c\\nd'
+
+
+def test_totals_survive_a_reload(tmp_path):
+    path = tmp_path / "kb.json"
+    path.write_text(json.dumps({"SYMPTOMS": {"fever": ["Influenza"]}}), encoding="utf-8")
+    reloader = EngineReloader(metered(ClinicalData.from_file(str(path))), str(path))
+    reloader.engine.analyze("fever")
+    path.write_text(json.dumps({"SYMPTOMS": {"fever": ["Influenza"], "rash": ["Eczema"]}}), encoding="utf-8")
+    assert reloader.check()
+    reloader.engine.analyze("fever and rash")
+    values = samples(metrics_text(reloader.engine, reloader))
+    assert values["consulthealth_analyze_total"] == "2"
+    assert values['consulthealth_symptom_matches_total{key="fever"}'] == "2"
+    assert values["consulthealth_kb_reloads_total"] == "1"
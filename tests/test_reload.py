@@ -0,0 +1,60 @@
+import json
+
+from consulthealth import ClinicalData, ClinicalEngine, EngineReloader
+
+KB = {
+    "SYMPTOMS": {"fever": ["Influenza"], "chest pain": ["Angina"]},
+    "ALERTS": {"chest pain": "Possible ACS"},
+    "MEDS": {"fever": "Paracetamol"},
+    "ALIASES": {"cp": ["chest pain"]},
+}
+
+
+def write_kb(path, tables):
+    path.write_text(json.dumps(tables), encoding="utf-8")
+
+
+def make_reloader(tmp_path):
+    path = tmp_path / "kb.json"
+    write_kb(path, KB)
+    return path, EngineReloader(ClinicalEngine(ClinicalData.from_file(str(path))), str(path))
+
+
+def test_changed_file_is_swapped_in(tmp_path):
+    path, reloader = make_reloader(tmp_path)
+    old = reloader.engine
+    assert reloader.check() is False
+    write_kb(path, dict(KB, SYMPTOMS=dict(KB["SYMPTOMS"], rash=["Eczema"])))
+    assert reloader.check() is True
+    assert reloader.engine is not old and reloader.reloads == 1
+    assert reloader.engine.cache is old.cache and reloader.engine.timings is old.timings
+    assert reloader.engine.kb_version != old.kb_version
+    assert reloader.engine.analyze("rash and chest pain") == (["chest pain", "rash"], ["Angina", "Eczema"], [],
+                                                               ["Possible ACS"])
+    assert reloader.engine.analyze("rash and cp")[0] == ["chest pain", "rash"]
+    assert old.analyze("rash") == ([], [], [], [])
+
+
+def test_bad_file_keeps_the_current_engine(tmp_path):
+    path, reloader = make_reloader(tmp_path)
+    old = reloader.engine
+    for bad in ("{not json", json.dumps({"SYMPTOMS": {"fever": "Influenza"}}), json.dumps(["SYMPTOMS"])):
+        path.write_text(bad, encoding="utf-8")
+        assert reloader.reload() is False
+        assert reloader.engine is old
+        assert reloader.last_error
+    write_kb(path, KB)
+    assert reloader.reload() is True and reloader.last_error is None
+
+
+def test_capitalized_keys_are_rejected(tmp_path):
+    path, reloader = make_reloader(tmp_path)
+    old = reloader.engine
+    for bad in (dict(KB, SYMPTOMS=dict(KB["SYMPTOMS"], Rash=["Eczema"])),
+                dict(KB, ALERTS={"Chest Pain": "Possible ACS"}),
+                dict(KB, ALIASES={"cp": ["Chest pain"]}),
+                {"SECTIONS": {"SKIN": {"Rash": ["Eczema"]}}}):
+        write_kb(path, bad)
+        assert reloader.reload() is False
+        assert reloader.engine is old
+        assert "must be lowercase" in reloader.last_error
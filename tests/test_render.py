@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from consulthealth import AppConfig
+
+pytest.importorskip("streamlit")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROBE = ("import consulthealth; consulthealth.tune_message_cache()\n"
+         "from streamlit import config; print(config.get_option('global.minCachedMessageSize'))\n")
+ENV_KEY = "STREAMLIT_GLOBAL_MIN_CACHED_MESSAGE_SIZE"
+
+
+def threshold(cwd, override=None):
+    env = {k: v for k, v in os.environ.items() if k != ENV_KEY}
+    env["PYTHONPATH"] = ROOT
+    if override is not None:
+        env[ENV_KEY] = override
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=cwd, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return int(out.split()[-1])
+
+
+def test_message_cache_threshold_is_set_outside_the_repo(tmp_path):
+    assert threshold(tmp_path) == AppConfig.MIN_CACHED_MESSAGE_SIZE
+
+
+def test_message_cache_threshold_from_environment_is_kept(tmp_path):
+    assert threshold(tmp_path, "4096") == 4096
+
+
+def test_diagnostics_list_every_recorded_stage():
+    from streamlit.testing.v1 import AppTest
+
+    page = (f"import sys; sys.path.insert(0, {ROOT!r})\n"
+            "import consulthealth\n"
+            "engine = consulthealth.ClinicalEngine(consulthealth.ClinicalData())\n"
+            "for stage in ('match', 'rank', 'custom'):\n"
+            "    engine.timings.record(stage, 0.001)\n"
+            "consulthealth.render_diagnostics(engine)\n")
+    at = AppTest.from_string(page, default_timeout=60)
+    at.run()
+    at.sidebar.checkbox[0].check()
+    at.run()
+    table = at.sidebar.markdown[0].value
+    assert [row.split("|")[1].strip() for row in table.splitlines()[2:]] == ["match", "rank", "custom"]
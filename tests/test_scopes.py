@@ -0,0 +1,60 @@
+import pytest
+
+PEDIATRICS = "SECTION 15: PEDIATRICS SPECIFIC"
+OPHTHALMOLOGY = "SECTION 12: OPHTHALMOLOGY"
+
+
+@pytest.mark.parametrize("mode", ["longest", "overlap", "substring"])
+def test_scope_keeps_symptoms_of_chosen_sections(engine, kb, mode):
+    note = "croup cough, blurred vision and an itchy rash"
+    symptoms, etiologies, _, _ = engine.analyze(note, mode, sections=[PEDIATRICS, OPHTHALMOLOGY])
+    assert "rash" in engine.analyze(note, mode)[0]
+    assert set(symptoms) == {"croup cough", "blurred vision"}
+    assert set(etiologies) == {c for k in symptoms for c in kb.SYMPTOMS[k]}
+
+
+def test_alerts_outside_scope_add_no_symptoms(engine, kb):
+    symptoms, etiologies, treatments, alerts = engine.analyze(
+        "severe chest pain and seizure", sections=[OPHTHALMOLOGY]
+    )
+    assert (symptoms, etiologies, treatments) == ([], [], [])
+    assert alerts == [kb.ALERTS["chest pain"], kb.ALERTS["seizure"]]
+
+
+def test_alias_of_an_alert_outside_scope_adds_nothing(engine, kb):
+    symptoms, _, _, alerts = engine.analyze("SOB and croup cough", sections=[PEDIATRICS])
+    assert symptoms == ["croup cough"]
+    assert alerts == []
+
+
+@pytest.mark.parametrize("mode", ["longest", "overlap", "substring"])
+def test_scoped_symptoms_never_leave_the_scope(engine, kb, mode):
+    from consulthealth import synthetic_note
+
+    allowed = set(kb.SECTIONS[PEDIATRICS]) | set(kb.SECTIONS[OPHTHALMOLOGY])
+    for seed in range(10):
+        note = synthetic_note(kb, 3000, seed) + " croup cough, blurred vision"
+        symptoms, etiologies, _, alerts = engine.analyze(note, mode, sections=[PEDIATRICS, OPHTHALMOLOGY])
+        assert set(symptoms) <= allowed
+        assert {"croup cough", "blurred vision"} <= set(symptoms)
+        assert set(etiologies) == {c for k in symptoms for c in kb.SYMPTOMS[k]}
+        assert alerts == engine.analyze(note, mode)[3]
+
+
+def test_scope_names_are_case_insensitive_and_cached(engine):
+    first = engine.scope(["section 15: pediatrics specific"])
+    assert first is engine.scope([PEDIATRICS])
+    assert first.sections == (PEDIATRICS,)
+    assert engine.scope(None) is None
+
+
+def test_unknown_section_is_rejected(engine):
+    with pytest.raises(ValueError, match="unknown section"):
+        engine.analyze("fever", sections=["SECTION 99: NONE"])
+
+
+def test_scoped_results_are_cached_apart(engine):
+    full = engine.lookup("croup cough and fever")
+    scoped = engine.lookup("croup cough and fever", sections=[PEDIATRICS])
+    assert len(scoped.symptoms) < len(full.symptoms)
+    assert engine.lookup("croup cough and fever") == full
@@ -0,0 +1,43 @@
+import pickle
+import struct
+
+import consulthealth
+from consulthealth import (SNAPSHOT_FORMAT, SNAPSHOT_HEADER, SNAPSHOT_MAGIC, load_snapshot, source_fingerprint,
+                           write_snapshot)
+
+
+def test_snapshot_round_trip(engine, tmp_path):
+    path = str(tmp_path / "kb.snapshot")
+    write_snapshot(engine, path)
+    loaded = load_snapshot(path)
+    assert loaded.origin == "snapshot"
+    assert loaded.kb_version == engine.kb_version
+    assert loaded.analyze("chest pain, fever and rash") == engine.analyze("chest pain, fever and rash")
+
+
+def test_snapshot_rejects_module_functions(tmp_path):
+    class Payload:
+        def __reduce__(self):
+            return consulthealth.write_snapshot, (None, str(tmp_path / "written"))
+
+    Payload.__module__ = "consulthealth"
+    path = tmp_path / "crafted.snapshot"
+    header = struct.pack(SNAPSHOT_HEADER, SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, source_fingerprint())
+    path.write_bytes(header + pickle.dumps(Payload()))
+    assert load_snapshot(str(path)) is None
+    assert not (tmp_path / "written").exists()
+
+
+def test_stale_snapshot_is_ignored(engine, tmp_path):
+    path = tmp_path / "kb.snapshot"
+    write_snapshot(engine, str(path))
+    data = bytearray(path.read_bytes())
+    data[6] ^= 0xFF  # first fingerprint byte
+    path.write_bytes(bytes(data))
+    assert load_snapshot(str(path)) is None
+
+
+def test_missing_or_damaged_snapshot_is_ignored(tmp_path):
+    assert load_snapshot(str(tmp_path / "missing")) is None
+    (tmp_path / "short").write_bytes(b"CHKB")
+    assert load_snapshot(str(tmp_path / "short")) is None